@@ -1,6 +1,175 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+"""
+MongoDB client setup.
 
-# MongoDB setup
-MONGO_URI = "mongodb://localhost:27017/FRA_DB"
-client = AsyncIOMotorClient(MONGO_URI)
-db = client["FRA_DB"]
\ No newline at end of file
+Settings come from the environment (.env):
+- MONGO_DB_URL (mongodb://localhost:27017/FRA_DB; MONGO_URI is read as an alias),
+  MONGO_DB_NAME (database in the URL, else FRA_DB)
+- MONGO_MAX_POOL_SIZE (200), MONGO_MIN_POOL_SIZE (10), MONGO_MAX_IDLE_TIME_MS (300000)
+- MONGO_CONNECT_TIMEOUT_MS (5000), MONGO_SERVER_SELECTION_TIMEOUT_MS (5000),
+  MONGO_SOCKET_TIMEOUT_MS (30000), MONGO_WAIT_QUEUE_TIMEOUT_MS (10000)
+- MONGO_READ_PREFERENCE (primary), MONGO_COMPRESSORS (e.g. "zstd,snappy,zlib"; off when empty)
+- MONGO_WARMUP_PINGS (MONGO_MIN_POOL_SIZE)
+- MONGO_ANALYTICS_READ_PREFERENCE (secondaryPreferred),
+  MONGO_ANALYTICS_MAX_STALENESS_SECONDS (120; -1 for no limit, else at least 90)
+
+The client is created by `connect()` in the app lifespan, which also opens
+pool connections with concurrent pings, and closed by `close()` on shutdown.
+`db` is a proxy to the configured database, so routes can keep importing it
+at module level; used outside the lifespan (scripts, tests) it connects lazily.
+
+`analytics_db` is the same database with the analytics read preference, for
+dashboard and reporting reads that tolerate replication lag. Writes, and
+reads that feed them, use `db` and stay on the primary.
+"""
+import asyncio
+import logging
+import os
+import threading
+from typing import Callable, Dict, Optional
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import uri_parser
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+
+from app.services.metrics import mongo_command_listener, mongo_pool_listener
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+def _int_env(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+MONGO_URI = os.getenv("MONGO_DB_URL") or os.getenv("MONGO_URI") or "mongodb://localhost:27017/FRA_DB"
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME") or uri_parser.parse_uri(MONGO_URI, validate=False)["database"] or "FRA_DB"
+
+
+def client_options() -> Dict:
+    """Keyword arguments for AsyncIOMotorClient built from the environment."""
+    options = {
+        "maxPoolSize": _int_env("MONGO_MAX_POOL_SIZE", 200),
+        "minPoolSize": _int_env("MONGO_MIN_POOL_SIZE", 10),
+        "maxIdleTimeMS": _int_env("MONGO_MAX_IDLE_TIME_MS", 300000),
+        "connectTimeoutMS": _int_env("MONGO_CONNECT_TIMEOUT_MS", 5000),
+        "serverSelectionTimeoutMS": _int_env("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+        "socketTimeoutMS": _int_env("MONGO_SOCKET_TIMEOUT_MS", 30000),
+        "waitQueueTimeoutMS": _int_env("MONGO_WAIT_QUEUE_TIMEOUT_MS", 10000),
+        "readPreference": os.getenv("MONGO_READ_PREFERENCE", "primary"),
+        "appname": "fra-dss-backend",
+        "event_listeners": [mongo_command_listener, mongo_pool_listener],
+    }
+    compressors = os.getenv("MONGO_COMPRESSORS", "").strip()
+    if compressors:
+        options["compressors"] = compressors
+    return options
+
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+def analytics_read_preference():
+    mode = os.getenv("MONGO_ANALYTICS_READ_PREFERENCE", "secondaryPreferred")
+    if mode not in READ_PREFERENCES:
+        raise ValueError(f"Unknown MONGO_ANALYTICS_READ_PREFERENCE {mode!r}; expected one of {', '.join(READ_PREFERENCES)}")
+    if mode == "primary":
+        return Primary()
+    return READ_PREFERENCES[mode](max_staleness=_int_env("MONGO_ANALYTICS_MAX_STALENESS_SECONDS", 120))
+
+
+def settings() -> Dict:
+    """Effective database settings without credentials, for /system/database."""
+    options = {k: v for k, v in client_options().items() if k != "event_listeners"}
+    nodes = uri_parser.parse_uri(MONGO_URI, validate=False)["nodelist"]
+    return {
+        "hosts": [f"{host}:{port}" for host, port in nodes],
+        "database": MONGO_DB_NAME,
+        "connected": client is not None,
+        **options,
+        "analytics_read_preference": analytics_read_preference().document,
+    }
+
+
+client: Optional[AsyncIOMotorClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> AsyncIOMotorClient:
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                client = AsyncIOMotorClient(MONGO_URI, **client_options())
+    return client
+
+
+def get_database() -> AsyncIOMotorDatabase:
+    return get_client()[MONGO_DB_NAME]
+
+
+_analytics: Optional[tuple] = None
+
+
+def get_analytics_database() -> AsyncIOMotorDatabase:
+    global _analytics
+    mongo = get_client()
+    if _analytics is None or _analytics[0] is not mongo:
+        _analytics = (mongo, mongo[MONGO_DB_NAME].with_options(read_preference=analytics_read_preference()))
+    return _analytics[1]
+
+
+async def connect():
+    """Create the client and open pool connections before serving traffic."""
+    mongo = get_client()
+    pings = max(1, _int_env("MONGO_WARMUP_PINGS", client_options()["minPoolSize"]))
+    try:
+        # Concurrent pings each check out their own connection
+        await asyncio.gather(*(mongo.admin.command("ping") for _ in range(pings)))
+        logger.info("MongoDB connected", extra={"database": MONGO_DB_NAME, "warmup_pings": pings})
+    except Exception as e:
+        # Start anyway; requests fail individually until MongoDB is reachable
+        logger.warning("MongoDB warm-up failed", extra={"error": str(e)})
+
+
+async def close():
+    global client
+    with _client_lock:
+        mongo, client = client, None
+    if mongo is not None:
+        mongo.close()
+        logger.info("MongoDB client closed")
+
+
+def _reset_after_fork():
+    # MongoClient is not fork-safe: a worker forked from a process that already
+    # created one builds its own on first use
+    global client, _analytics, _client_lock
+    client, _analytics, _client_lock = None, None, threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class DatabaseProxy:
+    """Module-level stand-in for a database that resolves the client on use."""
+
+    def __init__(self, resolve: Callable[[], AsyncIOMotorDatabase]):
+        self._resolve = resolve
+
+    def __getitem__(self, name: str):
+        return self._resolve()[name]
+
+    def __getattr__(self, name: str):
+        return getattr(self._resolve(), name)
+
+
+db = DatabaseProxy(get_database)
+analytics_db = DatabaseProxy(get_analytics_database)
@@ -1,13 +1,45 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
+from prometheus_client import CONTENT_TYPE_LATEST
 import os
-from app.routes import claims, dss
+from app import database
+from app.routes import claims, dss, system
+from app.services.cache import recommendation_cache
+from app.services.claim_search import claim_search
+from app.services.log import RequestIdMiddleware, configure_logging, shutdown_logging
+from app.services.metrics import PrometheusMiddleware, register_cache, render
+from app.services.raster_stats import raster_stats_service
+from app.services.snapshots import claim_snapshots
+from app.services.tracing import TracingMiddleware, exporter
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="FRA DSS Backend", version="1.0.0")
+# JSON logs via a background queue listener
+configure_logging()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # MongoDB client and warm pool before the first request
+    await database.connect()
+    await claims.ensure_claim_indexes()
+    # Background workers draining POST /claims/ingest (INGEST_WORKERS=0 disables)
+    await claims.ingest_queue.start()
+    # Incremental Parquet snapshots of claims (CLAIMS_SNAPSHOT_INTERVAL_SECONDS=0 disables)
+    claim_snapshots.start()
+    # Claim search index loads in the background
+    claim_search.start()
+    yield
+    await claim_search.stop()
+    await claim_snapshots.stop()
+    await claims.ingest_queue.stop()
+    await database.close()
+    exporter.flush()
+    shutdown_logging()
+
+app = FastAPI(title="FRA DSS Backend", version="1.0.0", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -18,9 +50,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency histograms and in-flight gauges for /metrics
+app.add_middleware(PrometheusMiddleware)
+# Root span per request (sampled, continues W3C traceparent)
+app.add_middleware(TracingMiddleware)
+# Outermost: bind X-Request-ID for log correlation
+app.add_middleware(RequestIdMiddleware)
+
+register_cache("dss_recommendations", recommendation_cache.stats)
+register_cache("raster_stats", raster_stats_service.stats)
+
 @app.get("/")
 async def root():
     return {"message": "FRA DSS backend is live!"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(render(), media_type=CONTENT_TYPE_LATEST)
+
 app.include_router(claims.router)
-app.include_router(dss.router, prefix="/dss", tags=["Decision Support System"])
\ No newline at end of file
+app.include_router(dss.router, prefix="/dss", tags=["Decision Support System"])
+app.include_router(system.router, prefix="/system", tags=["System"])
\ No newline at end of file
@@ -1,22 +1,71 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, field_validator
+from typing import List, Dict, Any, Literal, Optional, Tuple, Union
+from contextlib import aclosing
+import asyncio
 import httpx
 import json
+import logging
 import os
+import time
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 from dotenv import load_dotenv
-from app.database import db
+from app.database import analytics_db
+from app.services.cache import fingerprint, recommendation_cache
+from app.services.eligibility import SCHEMES, columns_from_records, get_engine, validate_schemes
+from app.services.llm_json import InterventionSchema, JSONScanner, coerce_list, parse_list, parse_stats, validate_item
+from app.services.log import error_fields, summarize
+from app.services.metrics import observe_llm_call
+from app.services.model_router import model_router
+from app.services.rate_limit import estimate_tokens
+from app.services.raster_stats import AmbiguousVillage, raster_stats_service
+from app.services import shared_state
+from app.services.snapshots import CLAIMS_SCHEMA, SnapshotUnavailable, claim_snapshots
+from app.services.resilience import ProviderUnavailable, RetryableProviderError, get_provider, raise_for_retryable
+from app.services.tracing import span
+from app.services.village_index import normalize_name, village_index
 
 # Load environment variables
 load_dotenv()
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
+# Fallbacks used when no raster or census data covers a village
+DEFAULT_WATER_INDEX = 0.3
+DEFAULT_FOREST_COVER = 0.65
+DEFAULT_POPULATION = 850
+
+PRIORITY_WEIGHTS = {"High": 3, "Medium": 2, "Low": 1}
+# Village attributes the batch analysis broadcasts to every holder of the village
+VILLAGE_FIELDS = ("water_index", "forest_cover", "population")
+
+# Per-analyzer time budgets for /dss/analyze; a slow branch is dropped, not awaited
+SCHEME_ANALYSIS_TIMEOUT = float(os.getenv("DSS_SCHEME_TIMEOUT_SECONDS", "2"))
+INTERVENTION_ANALYSIS_TIMEOUT = float(os.getenv("DSS_INTERVENTION_TIMEOUT_SECONDS", "20"))
+
 class DSSAnalysisRequest(BaseModel):
     claim_data: Dict[str, Any]
     village_data: Optional[Dict[str, Any]] = None
     schemes_data: Optional[List[Dict[str, Any]]] = None
 
+    # Malformed client rules are a 422, not a failed analysis
+    _check_schemes = field_validator("schemes_data")(validate_schemes)
+
+class DSSBatchRequest(BaseModel):
+    district: Optional[str] = None
+    villages: Optional[List[str]] = None
+    schemes_data: Optional[List[Dict[str, Any]]] = None
+    # "snapshot" reads the Parquet claims snapshot instead of MongoDB
+    source: Literal["database", "snapshot"] = "database"
+
+    _check_schemes = field_validator("schemes_data")(validate_schemes)
+
 class DSSRecommendation(BaseModel):
     id: str
     type: str
@@ -26,66 +75,41 @@ class DSSRecommendation(BaseModel):
     priority: str
     confidence_score: float
     reasoning: str
+    matched_rule: Optional[str] = None
 
 class AIMLAPIService:
     def __init__(self):
-        self.api_key = os.getenv("AIMLAPI_KEY")
-        self.base_url = "https://api.aimlapi.com/v1"
-        self.model = "google/gemini-2.0-flash"  # or another model available on AIML API
+        # Candidate models are configured on the router (LLM_ROUTES_INTERVENTIONS)
+        self.task = "interventions"
+        # Bump when the intervention prompt changes so cached recommendations are not reused
+        self.prompt_version = "interventions-v1"
     
-    async def analyze_scheme_eligibility(self, fra_holder: Dict, schemes: List[Dict]) -> List[DSSRecommendation]:
+    async def analyze_scheme_eligibility(self, fra_holder: Dict, schemes: List[Dict],
+                                         village_data: Optional[Dict] = None) -> List[DSSRecommendation]:
         """
-        Use AIML API to analyze FRA holder eligibility for CSS schemes
+        Evaluate FRA holder eligibility for CSS schemes with the compiled rule engine
         """
         try:
-            # For now, provide rule-based recommendations as fallback
-            print("Generating rule-based scheme recommendations...")
-            recommendations = []
+            # Village attributes (water index, forest cover, ...) apply to every holder in the village
+            holder = dict(fra_holder)
+            for key, value in (village_data or {}).items():
+                holder.setdefault(key, value)
+            if "village" not in holder and (village_data or {}).get("name"):
+                holder["village"] = village_data["name"]
             
-            # Rule-based eligibility for DAJGUA
-            if fra_holder.get("claim_type") == "individual":
-                recommendations.append(DSSRecommendation(
-                    id="scheme-dajgua-1",
-                    type="Scheme Eligibility",
-                    title="DAJGUA Scheme Eligibility",
-                    description="Individual FRA holder eligible for Development of Antyodaya and Other Tribal Families scheme. Provides livelihood support and skill development.",
-                    action="Apply for DAJGUA",
-                    priority="High",
-                    confidence_score=0.85,
-                    reasoning="Individual FRA claim holders are primary beneficiaries of DAJGUA scheme"
-                ))
-            
-            # Rule-based eligibility for Jal Shakti
-            village_name = fra_holder.get("village", "").lower()
-            if any(keyword in village_name for keyword in ["dry", "drought", "water"]) or True:  # Mock condition
+            recommendations = []
+            for rule in get_engine(schemes).match_record(holder):
                 recommendations.append(DSSRecommendation(
-                    id="scheme-jalshakti-1",
-                    type="Priority Intervention",
-                    title="Jal Shakti Abhiyan Priority",
-                    description="Village shows indicators of water stress. High priority for borewell installation and water conservation under Jal Shakti Abhiyan.",
-                    action="Deploy Water Survey Team",
-                    priority="High",
-                    confidence_score=0.9,
-                    reasoning="Water scarcity indicators detected in village data"
+                    id=f"scheme-{rule.id}",
+                    matched_rule=rule.id,
+                    **rule.recommendation
                 ))
             
-            # Rule-based eligibility for MGNREGA
-            recommendations.append(DSSRecommendation(
-                id="scheme-mgnrega-1",
-                type="Scheme Eligibility",
-                title="MGNREGA Employment Guarantee",
-                description="FRA holder eligible for 100 days guaranteed employment under MGNREGA. Can participate in forest conservation and rural development works.",
-                action="Register for MGNREGA",
-                priority="Medium",
-                confidence_score=0.95,
-                reasoning="All rural households are eligible for MGNREGA employment guarantee"
-            ))
-            
-            print(f"Generated {len(recommendations)} rule-based recommendations")
+            logger.debug("Generated rule-based scheme recommendations", extra={"count": len(recommendations)})
             return recommendations
             
         except Exception as e:
-            print(f"Error in scheme analysis: {str(e)}")
+            logger.error("Error in scheme analysis", extra={"error": str(e)})
             # Return basic fallback
             return [DSSRecommendation(
                 id="scheme-basic-1",
@@ -98,10 +122,8 @@ class AIMLAPIService:
                 reasoning="Basic eligibility assessment"
             )]
     
-    async def prioritize_interventions(self, village_data: Dict, claims_data: List[Dict]) -> List[DSSRecommendation]:
-        """
-        Use AIML API to prioritize interventions based on village conditions
-        """
+    def _intervention_payload(self, village_data: Dict, claims_data: List[Dict], stream: bool = False) -> Dict:
+        """Chat completion payload for the intervention prioritisation prompt"""
         prompt = f"""
         You are an expert in rural development and government intervention planning in India.
         
@@ -133,108 +155,351 @@ class AIMLAPIService:
         Return response as a JSON array of intervention recommendations.
         """
         
-        try:
+        return {
+            "messages": [
+                {"role": "system", "content": "You are an expert in rural development planning and government intervention strategies."},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.4,
+            "max_tokens": 2000,
+            "stream": stream
+        }
+    
+    def _intervention_recommendation(self, i: int, intervention: Dict) -> DSSRecommendation:
+        return DSSRecommendation(
+            id=f"ai-intervention-{i}",
+            type="Priority Intervention",
+            title=intervention.get("title") or "Intervention Recommendation",
+            description=intervention.get("description") or "",
+            action=intervention.get("action") or "Implement Intervention",
+            priority=intervention.get("priority") or "Medium",
+            confidence_score=intervention.get("confidence_score") or 0.8,
+            reasoning=intervention.get("reasoning") or ""
+        )
+    
+    def rule_based_interventions(self, village_data: Dict) -> List[DSSRecommendation]:
+        """
+        Local intervention priorities from village indicators, used when the AI provider is unavailable
+        """
+        water_index = village_data.get("water_index", DEFAULT_WATER_INDEX)
+        forest_cover = village_data.get("forest_cover", DEFAULT_FOREST_COVER)
+        literacy_rate = village_data.get("literacy_rate")
+        
+        interventions = [DSSRecommendation(
+            id="rule-intervention-water",
+            type="Priority Intervention",
+            title="Water Management",
+            description="Water conservation, rainwater harvesting and borewell assessment for the village.",
+            action="Deploy Water Survey Team",
+            priority="High" if water_index < 0.4 else "Medium",
+            confidence_score=0.7,
+            reasoning=f"Water index is {water_index}"
+        )]
+        if forest_cover > 0.6:
+            interventions.append(DSSRecommendation(
+                id="rule-intervention-forest",
+                type="Priority Intervention",
+                title="Forest Conservation",
+                description="Community forest resource management and conservation works.",
+                action="Plan Conservation Works",
+                priority="High",
+                confidence_score=0.7,
+                reasoning=f"High forest cover ({forest_cover*100:.0f}%) requires conservation measures"
+            ))
+        if literacy_rate is not None and literacy_rate < 0.7:
+            interventions.append(DSSRecommendation(
+                id="rule-intervention-education",
+                type="Priority Intervention",
+                title="Education Infrastructure",
+                description="School infrastructure and adult literacy programmes.",
+                action="Review Education Facilities",
+                priority="High",
+                confidence_score=0.65,
+                reasoning=f"Literacy rate is {literacy_rate*100:.0f}%, below national average"
+            ))
+        return interventions
+    
+    async def prioritize_interventions(self, village_data: Dict, claims_data: List[Dict]) -> List[DSSRecommendation]:
+        """
+        Use the fastest healthy model to prioritize interventions based on village conditions
+        """
+        payload = self._intervention_payload(village_data, claims_data)
+        
+        async def send(candidate, timeout: float) -> httpx.Response:
             async with httpx.AsyncClient() as client:
                 response = await client.post(
-                    f"{self.base_url}/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.model,
-                        "messages": [
-                            {"role": "system", "content": "You are an expert in rural development planning and government intervention strategies."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        "temperature": 0.4,
-                        "max_tokens": 2000
-                    },
-                    timeout=30.0
+                    f"{candidate.base_url}/chat/completions",
+                    headers=candidate.headers(),
+                    json={**payload, "model": candidate.model},
+                    timeout=timeout
                 )
-                
-                if response.status_code != 200:
-                    raise HTTPException(status_code=500, detail=f"AIML API error: {response.text}")
-                
-                result = response.json()
-                ai_response = result["choices"][0]["message"]["content"]
-                
-                # Parse AI response and convert to recommendations
-                try:
-                    interventions_data = json.loads(ai_response)
-                    interventions = []
-                    
-                    for i, intervention in enumerate(interventions_data):
-                        interventions.append(DSSRecommendation(
-                            id=f"ai-intervention-{i}",
-                            type="Priority Intervention",
-                            title=intervention.get("title", "Intervention Recommendation"),
-                            description=intervention.get("description", ""),
-                            action=intervention.get("action", "Implement Intervention"),
-                            priority=intervention.get("priority", "Medium"),
-                            confidence_score=intervention.get("confidence_score", 0.8),
-                            reasoning=intervention.get("reasoning", "")
-                        ))
-                    
-                    return interventions
-                    
-                except json.JSONDecodeError:
-                    # Fallback: create single recommendation from text response
-                    return [DSSRecommendation(
-                        id="ai-intervention-fallback",
-                        type="Intervention Analysis",
-                        title="AI Intervention Analysis",
-                        description=ai_response[:200] + "...",
-                        action="Review Analysis",
-                        priority="High",
-                        confidence_score=0.6,
-                        reasoning="AI-generated intervention priority analysis"
-                    )]
-                    
+            raise_for_retryable(response)
+            return response
+        
+        try:
+            response = await model_router.call(self.task, send, tokens=estimate_tokens(payload))
+            
+            result = response.json()
+            ai_response = result["choices"][0]["message"]["content"]
+            
+            # Parse AI response (fenced, wrapped or truncated arrays included) into recommendations
+            interventions_data = parse_list(ai_response, InterventionSchema, self.task)
+            if interventions_data is not None:
+                return [self._intervention_recommendation(i, intervention)
+                        for i, intervention in enumerate(interventions_data)]
+            else:
+                # Fallback: create single recommendation from text response
+                return [DSSRecommendation(
+                    id="ai-intervention-fallback",
+                    type="Intervention Analysis",
+                    title="AI Intervention Analysis",
+                    description=ai_response[:200] + "...",
+                    action="Review Analysis",
+                    priority="High",
+                    confidence_score=0.6,
+                    reasoning="AI-generated intervention priority analysis"
+                )]
+        
+        except ProviderUnavailable as e:
+            logger.warning("No AI provider available, using rule-based interventions", extra={"error": e.detail})
+            return self.rule_based_interventions(village_data)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error in intervention analysis: {str(e)}")
 
+    async def stream_interventions(self, village_data: Dict, claims_data: List[Dict]):
+        """
+        Stream intervention recommendations as the model generates them.
+        Each array element is yielded as soon as its closing brace arrives.
+        Until the first one is sent, a failed model hands over to the next
+        candidate; rule-based interventions are used when none is available.
+        """
+        payload = self._intervention_payload(village_data, claims_data, stream=True)
+        count = 0
+        for candidate in model_router.rank(self.task):
+            parser = JSONScanner()
+            try:
+                async with aclosing(self._stream_candidate(candidate, payload, parser)) as elements:
+                    async for intervention in elements:
+                        yield self._intervention_recommendation(count, intervention)
+                        count += 1
+            except ProviderUnavailable as e:
+                if count:
+                    raise
+                logger.warning("Streaming model unavailable, trying the next candidate",
+                               extra={"model": candidate.id, "error": e.detail})
+                continue
+            
+            if not count:
+                # Nothing arrived as array elements, e.g. the array was wrapped in an object
+                value, _ = parser.finish()
+                for element in coerce_list(value) or []:
+                    intervention = validate_item(element, InterventionSchema)
+                    if intervention is not None:
+                        yield self._intervention_recommendation(count, intervention)
+                        count += 1
+            parse_stats.record(self.task, "failed" if not count else "ok" if parser.values else "partial")
+            return
+        
+        logger.warning("No AI provider available, using rule-based interventions")
+        for recommendation in self.rule_based_interventions(village_data):
+            yield recommendation
+
+    async def _stream_candidate(self, candidate, payload: Dict, parser: JSONScanner):
+        """
+        Stream one model's completion into `parser`, yielding validated
+        interventions. Any failure is raised as ProviderUnavailable.
+        """
+        resilience = get_provider(candidate.provider)
+        resilience.check()
+        await resilience.acquire(estimate_tokens(payload))
+        
+        start = time.monotonic()
+        try:
+            async with httpx.AsyncClient() as client:
+                async with client.stream(
+                    "POST",
+                    f"{candidate.base_url}/chat/completions",
+                    headers=candidate.headers(),
+                    json={**payload, "model": candidate.model},
+                    timeout=resilience.timeout()
+                ) as response:
+                    if response.status_code != 200:
+                        await response.aread()
+                        raise_for_retryable(response)
+                        # Rejected (e.g. 401, 400): not a breaker failure, but the next candidate gets the call
+                        resilience.breaker.release()
+                        candidate.record(False)
+                        observe_llm_call(candidate.provider, candidate.model, self.task,
+                                         time.monotonic() - start, "unavailable")
+                        raise ProviderUnavailable(candidate.provider, f"HTTP {response.status_code}: {response.text[:200]}")
+                    
+                    # OpenAI-compatible server-sent events: "data: {chunk}" lines, ending with "data: [DONE]"
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        try:
+                            delta = json.loads(data)["choices"][0].get("delta", {}).get("content") or ""
+                        except (json.JSONDecodeError, KeyError, IndexError):
+                            continue
+                        for element in parser.feed(delta):
+                            intervention = validate_item(element, InterventionSchema)
+                            if intervention is not None:
+                                yield intervention
+        except (httpx.TimeoutException, httpx.TransportError, RetryableProviderError) as e:
+            resilience.record_failure()
+            candidate.record(False)
+            observe_llm_call(candidate.provider, candidate.model, self.task, time.monotonic() - start, "error")
+            if isinstance(e, RetryableProviderError) and e.status_code == 429:
+                resilience.scheduler.pause(e.retry_after or resilience.backoff_cap)
+            raise ProviderUnavailable(candidate.provider, f"{type(e).__name__}: {e}") from e
+        except ProviderUnavailable:
+            raise
+        except BaseException:
+            resilience.breaker.release()
+            raise
+        elapsed = time.monotonic() - start
+        resilience.record_success(elapsed)
+        candidate.record(True, elapsed)
+        observe_llm_call(candidate.provider, candidate.model, self.task, elapsed, "ok", estimate_tokens(payload))
+
 # Initialize the AI service
 aiml_service = AIMLAPIService()
 
+def _village_cache_tag(claim_data: Dict, village_data: Optional[Dict]) -> str:
+    return normalize_name((village_data or {}).get("name") or claim_data.get("village"))
+
+def _sample_village_claims(village_data: Dict) -> List[Dict]:
+    # Mock village claims for now since database might not be connected
+    return [
+        {"village": village_data.get("name", ""), "type": "individual", "area": 2.5},
+        {"village": village_data.get("name", ""), "type": "community", "area": 15.0}
+    ]
+
+def _analysis_cache_key(request: DSSAnalysisRequest) -> str:
+    return fingerprint(
+        request.claim_data, request.village_data, request.schemes_data,
+        model_router.route_key(aiml_service.task), aiml_service.prompt_version
+    )
+
+def _is_degraded(recommendations: List[DSSRecommendation]) -> bool:
+    """Rule-based interventions or the raw-text placeholder for unparseable model output"""
+    return any(
+        r.id.startswith("rule-intervention-") or r.id == "ai-intervention-fallback"
+        for r in recommendations
+    )
+
+async def _run_analyzer(name: str, analyzer, timeout: float) -> Dict:
+    """Run one analyzer within its time budget and record how long it took."""
+    start = time.perf_counter()
+    with span(f"dss.analyzer.{name}", timeout_seconds=timeout) as analyzer_span:
+        try:
+            recommendations = await asyncio.wait_for(analyzer, timeout=timeout)
+            status = "ok"
+        except asyncio.TimeoutError:
+            logger.warning("DSS analyzer exceeded its time budget", extra={"analyzer": name, "timeout_seconds": timeout})
+            recommendations, status = [], "timeout"
+        except Exception as e:
+            logger.error("DSS analyzer failed", extra={"analyzer": name, **error_fields(e)})
+            analyzer_span.record_exception(e)
+            recommendations, status = [], "error"
+        analyzer_span.set_attribute("analyzer.status", status)
+        analyzer_span.set_attribute("recommendations", len(recommendations))
+    return {
+        "name": name,
+        "status": status,
+        "duration_ms": (time.perf_counter() - start) * 1000,
+        "recommendations": recommendations,
+    }
+
+async def _analyze_uncached(request: DSSAnalysisRequest, response: Response, cache_key: str) -> List[DSSRecommendation]:
+    """Run the analyzers for a cache miss and memoise complete results."""
+    analyzers = []
+    
+    # Get scheme eligibility recommendations
+    if request.schemes_data:
+        analyzers.append(_run_analyzer(
+            "schemes",
+            aiml_service.analyze_scheme_eligibility(
+                request.claim_data, 
+                request.schemes_data,
+                request.village_data
+            ),
+            SCHEME_ANALYSIS_TIMEOUT
+        ))
+    
+    # Get intervention priority recommendations
+    if request.village_data:
+        analyzers.append(_run_analyzer(
+            "interventions",
+            aiml_service.prioritize_interventions(
+                request.village_data,
+                _sample_village_claims(request.village_data)
+            ),
+            INTERVENTION_ANALYSIS_TIMEOUT
+        ))
+    
+    branches = await asyncio.gather(*analyzers)
+    
+    recommendations = []
+    for branch in branches:
+        recommendations.extend(branch["recommendations"])
+    
+    response.headers["Server-Timing"] = ", ".join(
+        f'{b["name"]};dur={b["duration_ms"]:.1f};desc="{b["status"]}"' for b in branches
+    )
+    incomplete = [b["name"] for b in branches if b["status"] != "ok"]
+    if _is_degraded(recommendations):
+        # Provider unavailable or its output unparseable; retry the AI next time
+        response.headers["X-DSS-Degraded"] = "interventions"
+    if incomplete:
+        response.headers["X-DSS-Partial"] = ",".join(incomplete)
+        if not recommendations:
+            raise RuntimeError(f"All DSS analyzers failed: {', '.join(incomplete)}")
+    elif not _is_degraded(recommendations):
+        # Only complete results are memoised
+        await recommendation_cache.set(
+            cache_key,
+            [r.model_dump() for r in recommendations],
+            tags=[_village_cache_tag(request.claim_data, request.village_data)]
+        )
+    
+    logger.info("DSS recommendations generated", extra={"count": len(recommendations), "partial": incomplete})
+    return recommendations
+
 @router.post("/analyze", response_model=List[DSSRecommendation])
-async def analyze_dss_recommendations(request: DSSAnalysisRequest):
+async def analyze_dss_recommendations(request: DSSAnalysisRequest, response: Response):
     """
-    Generate DSS recommendations using AI analysis
+    Generate DSS recommendations using AI analysis.
+    Independent analyzers run concurrently, each within its own time budget.
+    Response headers:
+    - X-DSS-Cache: HIT or MISS for the memoised result
+    - Server-Timing: per-analyzer duration and status
+    - X-DSS-Partial: analyzers that timed out or failed, when results are partial
+    - X-DSS-Degraded: analyzers that used a fallback because the AI provider is unavailable
+      or its output could not be parsed
     """
     try:
-        print(f"DSS Analysis request received: {request}")
-        recommendations = []
-        
-        # Get scheme eligibility recommendations
-        if request.schemes_data:
-            print("Analyzing scheme eligibility...")
-            scheme_recommendations = await aiml_service.analyze_scheme_eligibility(
-                request.claim_data, 
-                request.schemes_data
-            )
-            recommendations.extend(scheme_recommendations)
-        
-        # Get intervention priority recommendations
-        if request.village_data:
-            print(f"Analyzing village interventions for: {request.village_data.get('name', 'Unknown')}")
-            # Mock village claims for now since database might not be connected
-            village_claims = [
-                {"village": request.village_data.get("name", ""), "type": "individual", "area": 2.5},
-                {"village": request.village_data.get("name", ""), "type": "community", "area": 15.0}
-            ]
-            
-            intervention_recommendations = await aiml_service.prioritize_interventions(
-                request.village_data,
-                village_claims
-            )
-            recommendations.extend(intervention_recommendations)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("DSS analysis request", extra={"payload": summarize(request)})
+        cache_key = _analysis_cache_key(request)
+        response.headers["X-DSS-Cache-Key"] = cache_key[:16]
         
-        print(f"Generated {len(recommendations)} recommendations")
-        return recommendations
+        cached = await recommendation_cache.get(cache_key)
+        if cached is None:
+            # Concurrent identical requests, on any worker, wait for one analysis
+            async with shared_state.lock(f"dss:{cache_key}", timeout=INTERVENTION_ANALYSIS_TIMEOUT + 5):
+                cached = await recommendation_cache.get(cache_key, record_stats=False)
+                if cached is None:
+                    response.headers["X-DSS-Cache"] = "MISS"
+                    return await _analyze_uncached(request, response, cache_key)
+        response.headers["X-DSS-Cache"] = "HIT"
+        return [DSSRecommendation(**r) for r in cached]
         
-    except Exception as e:
-        print(f"Error in DSS analysis: {str(e)}")
+    except Exception:
+        logger.exception("Error in DSS analysis")
         # Return fallback recommendations instead of failing
         return [
             DSSRecommendation(
@@ -249,80 +514,110 @@ async def analyze_dss_recommendations(request: DSSAnalysisRequest):
             )
         ]
 
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@router.post("/analyze/stream")
+async def stream_dss_recommendations(request: DSSAnalysisRequest):
+    """
+    Server-Sent Events variant of /analyze. Rule-based recommendations are
+    sent immediately; LLM interventions follow one by one as they are parsed
+    from the streamed completion.
+    Events: "recommendation" (one DSSRecommendation), "error", and a final "done" summary.
+    """
+    cache_key = _analysis_cache_key(request)
+    
+    async def events():
+        start = time.perf_counter()
+        first_recommendation_ms = None
+        
+        cached = await recommendation_cache.get(cache_key)
+        if cached is not None:
+            for recommendation in cached:
+                yield _sse("recommendation", recommendation)
+            yield _sse("done", {"count": len(cached), "cache": "HIT", "partial": False,
+                                "duration_ms": round((time.perf_counter() - start) * 1000, 1)})
+            return
+        
+        recommendations = []
+        complete = True
+        
+        if request.schemes_data:
+            for recommendation in await aiml_service.analyze_scheme_eligibility(
+                request.claim_data, request.schemes_data, request.village_data
+            ):
+                recommendations.append(recommendation)
+                first_recommendation_ms = first_recommendation_ms or (time.perf_counter() - start) * 1000
+                yield _sse("recommendation", recommendation.model_dump())
+        
+        if request.village_data:
+            try:
+                async for recommendation in aiml_service.stream_interventions(
+                    request.village_data, _sample_village_claims(request.village_data)
+                ):
+                    recommendations.append(recommendation)
+                    first_recommendation_ms = first_recommendation_ms or (time.perf_counter() - start) * 1000
+                    yield _sse("recommendation", recommendation.model_dump())
+            except Exception as e:
+                complete = False
+                logger.error("Error streaming interventions", extra=error_fields(e))
+                yield _sse("error", {"analyzer": "interventions", "detail": str(e)})
+        
+        if complete and not _is_degraded(recommendations):
+            await recommendation_cache.set(
+                cache_key,
+                [r.model_dump() for r in recommendations],
+                tags=[_village_cache_tag(request.claim_data, request.village_data)]
+            )
+        
+        yield _sse("done", {
+            "count": len(recommendations),
+            "cache": "MISS",
+            "partial": not complete,
+            "first_recommendation_ms": round(first_recommendation_ms, 1) if first_recommendation_ms else None,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 1)
+        })
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.delete("/cache")
+async def invalidate_recommendation_cache(village: Optional[str] = None):
+    """
+    Invalidate memoised DSS recommendations for one village, or all of them
+    """
+    if village:
+        removed = await recommendation_cache.invalidate_tag(normalize_name(village))
+    else:
+        removed = recommendation_cache.stats()["entries"]
+        await recommendation_cache.clear()
+    return {"success": True, "invalidated": removed, "cache": recommendation_cache.stats()}
+
 @router.get("/schemes")
 async def get_available_schemes():
     """
-    Get list of available Central Sector Schemes
+    Get list of available Central Sector Schemes with their eligibility rules
     """
-    schemes = [
-        {
-            "id": "dajgua",
-            "name": "DAJGUA",
-            "full_name": "Development of Antyodaya and Other Tribal Families",
-            "ministry": "Ministry of Tribal Affairs",
-            "eligibility_criteria": {
-                "target_group": "Tribal families",
-                "income_limit": 50000,
-                "land_ownership": "FRA pattas preferred"
-            },
-            "benefits": ["Livelihood support", "Skill development", "Infrastructure development"]
-        },
-        {
-            "id": "pm_janman",
-            "name": "PM-JANMAN",
-            "full_name": "Pradhan Mantri Janjati Adivasi Nyaya Maha Abhiyan",
-            "ministry": "Ministry of Tribal Affairs",
-            "eligibility_criteria": {
-                "target_group": "Particularly Vulnerable Tribal Groups (PVTGs)",
-                "coverage": "All PVTG villages and habitations"
-            },
-            "benefits": ["Safe housing", "Clean drinking water", "Sanitation", "Healthcare", "Education"]
-        },
-        {
-            "id": "jal_shakti",
-            "name": "Jal Shakti Abhiyan",
-            "full_name": "Jal Shakti Abhiyan",
-            "ministry": "Ministry of Jal Shakti",
-            "eligibility_criteria": {
-                "target_group": "Water-stressed villages",
-                "priority": "Villages with low water index"
-            },
-            "benefits": ["Borewell installation", "Water conservation", "Rainwater harvesting"]
-        },
-        {
-            "id": "mgnrega",
-            "name": "MGNREGA",
-            "full_name": "Mahatma Gandhi National Rural Employment Guarantee Act",
-            "ministry": "Ministry of Rural Development",
-            "eligibility_criteria": {
-                "target_group": "Rural households",
-                "work_guarantee": "100 days per household per year"
-            },
-            "benefits": ["Guaranteed employment", "Asset creation", "Livelihood security"]
-        },
-        {
-            "id": "pmay",
-            "name": "PMAY-G",
-            "full_name": "Pradhan Mantri Awas Yojana - Gramin",
-            "ministry": "Ministry of Rural Development",
-            "eligibility_criteria": {
-                "target_group": "Houseless and households with kutcha houses",
-                "income_criteria": "Below poverty line"
-            },
-            "benefits": ["Pucca house construction", "Financial assistance up to Rs 1.30 lakh"]
-        }
-    ]
-    
-    return {"schemes": schemes}
+    return {"schemes": SCHEMES}
 
 @router.post("/village-analysis")
-async def analyze_village_conditions(village_name: str):
+async def analyze_village_conditions(village_name: str, district: Optional[str] = None):
     """
     Analyze village conditions for intervention prioritization
     """
     try:
-        # Get claims data for the village
-        village_claims = await db.claims.find({
+        # Resolve the free-text name to the village master record; claims are
+        # stored under the canonical name at ingestion
+        village_record = village_index.lookup(village_name, district=district)
+        if village_record:
+            village_name = village_record["village"]
+            district = district or village_record["district"]
+        
+        # Get claims data for the village (analytics read; may trail ingestion by the max staleness)
+        village_claims = await analytics_db.claims.find({
             "village": village_name
         }).to_list(length=None)
         
@@ -330,17 +625,25 @@ async def analyze_village_conditions(village_name: str):
         total_claims = len(village_claims)
         anomaly_claims = len([c for c in village_claims if c.get("is_anomaly", False)])
         
+        # Forest cover and water index from the local rasters (cached per raster version)
+        raster_stats = await run_in_threadpool(
+            raster_stats_service.get_village_stats, village_name, district
+        ) or {}
+        raster_stats = {k: v for k, v in raster_stats.items() if v is not None}
+        
         # Mock village data (in real implementation, this would come from GIS/survey data)
         village_data = {
             "name": village_name,
             "total_claims": total_claims,
             "anomaly_rate": (anomaly_claims / total_claims * 100) if total_claims > 0 else 0,
-            "water_index": 0.3,  # Mock data - would come from actual water survey
-            "forest_cover": 0.65,  # Mock data - would come from satellite imagery
-            "population": 850,  # Mock data - would come from census
+            "water_index": raster_stats.get("water_index", DEFAULT_WATER_INDEX),  # Mock fallback when no NDWI raster covers the village
+            "forest_cover": raster_stats.get("forest_cover", DEFAULT_FOREST_COVER),  # Mock fallback when no land cover raster covers the village
+            "lgd_code": village_record["lgd_code"] if village_record else None,
+            "population": (village_record or {}).get("population") or DEFAULT_POPULATION,  # Census population, mock fallback
             "literacy_rate": 0.68,  # Mock data - would come from census
             "healthcare_access": "Limited",  # Mock data - would come from surveys
-            "infrastructure_score": 3.2  # Mock data - composite score
+            "infrastructure_score": 3.2,  # Mock data - composite score
+            "raster_version": raster_stats.get("raster_version")
         }
         
         return {
@@ -364,5 +667,267 @@ async def analyze_village_conditions(village_name: str):
             ]
         }
         
+    except AmbiguousVillage as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error analyzing village conditions: {str(e)}")
+
+@router.get("/district-raster-stats")
+async def get_district_raster_stats(district: str):
+    """
+    Forest cover and water index for every village in a district, computed
+    in one pass over each raster
+    """
+    try:
+        village_stats = await run_in_threadpool(raster_stats_service.get_district_stats, district)
+        return {
+            "district": district,
+            "villages": village_stats,
+            "count": len(village_stats)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing raster statistics: {str(e)}")
+
+
+def _anomaly_rate(stats: Dict) -> float:
+    return stats["anomaly_claims"] / stats["total_claims"] * 100 if stats["total_claims"] else 0
+
+def _intervention_row(stats: Dict, context: Dict, intervention: str, scheme_id: Optional[str],
+                      matched_rule: Optional[str], priority: str, eligible_holders: int,
+                      score: float, reason: str) -> Dict:
+    return {
+        "village": stats["village"],
+        "intervention": intervention,
+        "scheme_id": scheme_id,
+        "matched_rule": matched_rule,
+        "priority": priority,
+        "eligible_holders": eligible_holders,
+        "total_claims": stats["total_claims"],
+        "total_area": round(stats["total_area"], 2),
+        "anomaly_rate": round(_anomaly_rate(stats), 2),
+        "water_index": context["water_index"],
+        "forest_cover": context["forest_cover"],
+        "population": context["population"],
+        "score": round(score, 3),
+        "reason": reason,
+    }
+
+def _dictionary_codes(array: pa.DictionaryArray, lookup: Dict[Any, int]) -> np.ndarray:
+    """Per-row lookup[value] (-1 when missing) from dictionary indices, without a Python object per row"""
+    codes = np.array([lookup.get(v, -1) for v in array.dictionary.to_pylist()] + [-1], dtype=np.int64)
+    return codes[array.indices.fill_null(len(array.dictionary)).to_numpy()]
+
+def _snapshot_column(column: pa.ChunkedArray) -> np.ndarray:
+    """
+    One snapshot column as a NumPy array. Dictionary columns are expanded
+    from their codes; numeric columns convert without a copy when a chunk has
+    no nulls.
+    """
+    if pa.types.is_dictionary(column.type):
+        values = sorted({v for chunk in column.chunks for v in chunk.dictionary.to_pylist() if v is not None})
+        value_ids = {value: i for i, value in enumerate(values)}
+        codes = [_dictionary_codes(chunk, value_ids) for chunk in column.chunks]
+        codes = np.concatenate(codes) if codes else np.zeros(0, dtype=np.int64)
+        return np.array(values + [None], dtype=object)[codes]
+    return column.to_numpy()
+
+def snapshot_holder_columns(holders: pa.Table, villages: List[str]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Village index and one eligibility column per snapshot column for each
+    holder. Holders outside `villages` are dropped.
+    """
+    village_ids = {name: i for i, name in enumerate(villages)}
+    holder_village = [_dictionary_codes(chunk, village_ids) for chunk in holders["village"].chunks]
+    holder_village = np.concatenate(holder_village) if holder_village else np.zeros(0, dtype=np.int64)
+
+    keep = holder_village >= 0
+    holder_village = holder_village[keep]
+    columns = {
+        name: _snapshot_column(holders[name])[keep]
+        for name in holders.column_names if name != "village"
+    }
+    columns["village"] = np.array(villages, dtype=object)[holder_village]
+    return holder_village, columns
+
+def snapshot_village_stats(holders: pa.Table) -> List[Dict]:
+    """The batch-analysis village aggregation, computed with np.bincount over a snapshot"""
+    holders = holders.filter(pc.is_valid(holders["village"]))
+    villages = sorted({v for chunk in holders["village"].chunks for v in chunk.dictionary.to_pylist()})
+    holder_village, columns = snapshot_holder_columns(holders, villages)
+    is_anomaly = holders["is_anomaly"].to_numpy()
+    n = len(villages)
+    total = np.bincount(holder_village, minlength=n)
+    anomalies = np.bincount(holder_village, weights=is_anomaly, minlength=n)
+    individual = np.bincount(holder_village, weights=columns["claim_type"] == "individual", minlength=n)
+    community = np.bincount(holder_village, weights=columns["claim_type"] == "community", minlength=n)
+    area = np.bincount(holder_village, weights=np.nan_to_num(columns["area"]), minlength=n)
+    return [
+        {
+            "village": village,
+            "total_claims": int(total[i]),
+            "anomaly_claims": int(anomalies[i]),
+            "individual_claims": int(individual[i]),
+            "community_claims": int(community[i]),
+            "total_area": float(area[i]),
+        }
+        for i, village in enumerate(villages) if total[i]
+    ]
+
+def batch_holder_fields(schemes: Optional[List[Dict]] = None) -> List[str]:
+    """Claim fields the batch analysis needs: the village stats fields and every claim field the rules read"""
+    fields = {"village", "claim_type", "area", "is_anomaly"} | set(get_engine(schemes).fields)
+    return sorted(fields - set(VILLAGE_FIELDS))
+
+def build_intervention_table(village_stats: List[Dict], holders: Union[List[Dict], pa.Table],
+                             village_context: Dict[str, Dict], schemes: Optional[List[Dict]] = None) -> List[Dict]:
+    """
+    Rank interventions across villages. Eligibility rules are evaluated for
+    every holder in one vectorised pass and counted per village and matched
+    rule with np.bincount. Holders are claim dicts or a claims snapshot table,
+    carrying the fields from batch_holder_fields(schemes).
+    """
+    villages = [v["village"] for v in village_stats]
+    village_ids = {name: i for i, name in enumerate(villages)}
+
+    if isinstance(holders, pa.Table):
+        holder_village, columns = snapshot_holder_columns(holders, villages)
+    else:
+        holders = [h for h in holders if h.get("village") in village_ids]
+        holder_village = np.array([village_ids[h["village"]] for h in holders], dtype=np.int64)
+        columns = columns_from_records(holders, batch_holder_fields(schemes), numeric_fields=["area"])
+    # Broadcast village attributes to their holders
+    for field in VILLAGE_FIELDS:
+        by_village = np.array([village_context[v][field] for v in villages], dtype=np.float64)
+        columns[field] = by_village[holder_village]
+
+    engine = get_engine(schemes)
+    rules = {rule.id: rule for rule in engine.rules}
+
+    table = []
+    for scheme_id, result in engine.evaluate_schemes(columns).items():
+        for rule_id in {r for r in result["matched_rule"] if r is not None}:
+            eligible_counts = np.bincount(
+                holder_village[result["matched_rule"] == rule_id], minlength=len(villages)
+            )
+            recommendation = rules[rule_id].recommendation
+            priority = recommendation.get("priority", "Medium")
+            for i, stats in enumerate(village_stats):
+                eligible = int(eligible_counts[i])
+                if not eligible:
+                    continue
+                # Anomalous claims discount the expected benefit of an intervention
+                score = PRIORITY_WEIGHTS.get(priority, 1) * eligible * (1 - _anomaly_rate(stats) / 100)
+                table.append(_intervention_row(
+                    stats, village_context[stats["village"]], recommendation.get("title", scheme_id),
+                    scheme_id, rule_id, priority, eligible, score, recommendation.get("reasoning", "")
+                ))
+
+    # Village-level forest conservation priority from land cover
+    for stats in village_stats:
+        context = village_context[stats["village"]]
+        if context["forest_cover"] > 0.6:
+            score = PRIORITY_WEIGHTS["High"] * context["forest_cover"] * stats["total_claims"]
+            table.append(_intervention_row(
+                stats, context, "Forest Conservation", None, None, "High", stats["total_claims"], score,
+                f"High forest cover ({context['forest_cover']*100:.0f}%) requires conservation measures"
+            ))
+
+    table.sort(key=lambda row: (-PRIORITY_WEIGHTS.get(row["priority"], 1), -row["score"]))
+    for rank, row in enumerate(table, start=1):
+        row["rank"] = rank
+    return table
+
+async def _database_village_claims(match: Dict[str, Any], fields: List[str]) -> Tuple[List[Dict], List[Dict]]:
+    """Per-village claim stats and the claims' eligibility fields, from MongoDB"""
+    village_stats = await analytics_db.claims.aggregate([
+        {"$match": match},
+        {"$group": {
+            "_id": "$village",
+            "total_claims": {"$sum": 1},
+            "anomaly_claims": {"$sum": {"$cond": [{"$eq": ["$is_anomaly", True]}, 1, 0]}},
+            "individual_claims": {"$sum": {"$cond": [{"$eq": ["$claim_type", "individual"]}, 1, 0]}},
+            "community_claims": {"$sum": {"$cond": [{"$eq": ["$claim_type", "community"]}, 1, 0]}},
+            "total_area": {"$sum": {"$ifNull": ["$area", 0]}},
+        }},
+        {"$project": {
+            "_id": 0, "village": "$_id", "total_claims": 1, "anomaly_claims": 1,
+            "individual_claims": 1, "community_claims": 1, "total_area": 1,
+        }},
+    ]).to_list(length=None)
+
+    projection = {"_id": 0, **{field: 1 for field in fields}}
+    holders = await analytics_db.claims.find(match, projection).to_list(length=None)
+    return village_stats, holders
+
+@router.post("/batch-analysis")
+async def analyze_district_batch(request: DSSBatchRequest):
+    """
+    DSS analysis for all villages of a district (or a list of villages) in one request.
+    Village stats come from one grouped aggregation; eligibility runs vectorised over all holders.
+    With source="snapshot" both come from the Parquet claims snapshot instead of MongoDB.
+    """
+    if not request.district and not request.villages:
+        raise HTTPException(status_code=400, detail="Provide a district or a list of villages")
+
+    try:
+        match: Dict[str, Any] = {}
+        if request.district:
+            match["district"] = request.district
+        if request.villages:
+            # Claims are stored under canonical village names
+            names = set()
+            for name in request.villages:
+                record = village_index.lookup(name, district=request.district)
+                names.add(record["village"] if record else name)
+            match["village"] = {"$in": sorted(names)}
+
+        fields = batch_holder_fields(request.schemes_data)
+        if request.source == "snapshot":
+            # Fields the snapshot does not store are missing for every holder
+            holders = await run_in_threadpool(
+                claim_snapshots.read, None, request.district,
+                match["village"]["$in"] if request.villages else None,
+                [field for field in fields if field in CLAIMS_SCHEMA.names],
+            )
+            village_stats = snapshot_village_stats(holders)
+        else:
+            village_stats, holders = await _database_village_claims(match, fields)
+
+        # One pass over each raster for the whole district
+        raster_stats = {}
+        if request.district:
+            raster_stats = await run_in_threadpool(
+                raster_stats_service.get_district_stats,
+                request.district,
+                [v["village"] for v in village_stats],
+            )
+
+        village_context = {}
+        for stats in village_stats:
+            raster = raster_stats.get((stats["village"] or "").strip().lower()) or {}
+            raster = {k: v for k, v in raster.items() if v is not None}
+            record = village_index.lookup(stats["village"], district=request.district) or {}
+            village_context[stats["village"]] = {
+                "water_index": raster.get("water_index", DEFAULT_WATER_INDEX),
+                "forest_cover": raster.get("forest_cover", DEFAULT_FOREST_COVER),
+                "population": record.get("population") or DEFAULT_POPULATION,
+            }
+
+        table = build_intervention_table(village_stats, holders, village_context, request.schemes_data)
+
+        return {
+            "success": True,
+            "district": request.district,
+            "villages_analyzed": len(village_stats),
+            "claims_analyzed": holders.num_rows if isinstance(holders, pa.Table) else len(holders),
+            "source": request.source,
+            "interventions": table,
+            "count": len(table)
+        }
+
+    except HTTPException:
+        raise
+    except SnapshotUnavailable as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error analyzing village conditions: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error in batch DSS analysis: {str(e)}")
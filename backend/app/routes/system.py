@@ -0,0 +1,83 @@
+from fastapi import APIRouter, HTTPException
+from app import database
+from app.routes.claims import ingest_queue
+from app.services.claim_search import claim_search
+from app.services.llm_json import parse_stats
+from app.services.model_router import model_router
+from app.services.rate_limit import scheduler_stats
+from app.services.resilience import provider_stats
+from app.services.snapshots import claim_snapshots
+
+router = APIRouter()
+
+@router.get("/providers")
+async def get_provider_status():
+    """
+    Circuit breaker state, latency percentiles, current timeouts and
+    rate limit queues per AI/ML provider, plus per-model routing health
+    """
+    return {
+        "providers": provider_stats(),
+        "schedulers": scheduler_stats(),
+        "models": model_router.stats()
+    }
+
+
+@router.get("/llm-parsing")
+async def get_llm_parsing_stats():
+    """
+    Share of model responses that parsed and validated, per task
+    """
+    return {"tasks": parse_stats.stats()}
+
+
+@router.get("/database")
+async def get_database_settings():
+    """
+    Effective MongoDB connection and pool settings (credentials omitted)
+    """
+    return database.settings()
+
+
+@router.get("/ingest")
+async def get_ingest_queue_status():
+    """
+    Queued ingestion jobs per status, plus this process's ingest workers
+    and per-stage concurrency
+    """
+    return {
+        "jobs": await ingest_queue.depth(),
+        "workers": ingest_queue.stats()
+    }
+
+
+@router.get("/search")
+async def get_search_index_status():
+    """
+    Claims, vocabulary words and posting entries in this process's claim
+    search index
+    """
+    return claim_search.stats()
+
+
+@router.get("/snapshots")
+async def get_snapshot_status():
+    """
+    Rows, watermark and last run of the Parquet claims snapshot
+    """
+    return {"claims": claim_snapshots.stats()}
+
+
+@router.post("/snapshots/claims")
+async def snapshot_claims(full: bool = False):
+    """
+    Append claims inserted since the last snapshot, or rebuild it with
+    full=true (picks up status and anomaly changes to older claims)
+    """
+    try:
+        result = await claim_snapshots.run(full=full)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error writing claims snapshot: {str(e)}")
+    if result is None:
+        raise HTTPException(status_code=409, detail="Another claims snapshot is still running")
+    return {"success": True, **result}
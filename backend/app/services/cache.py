@@ -0,0 +1,150 @@
+"""
+TTL cache with tag-based invalidation, used to memoise DSS recommendations
+keyed by a canonical fingerprint of the request inputs.
+
+In-process by default; with SHARED_STATE_URL set the entries live in the
+shared backend, so all workers see the same entries and invalidations.
+Both caches have the same coroutine interface (stats() excepted): shared
+backend calls can wait on another worker's write transaction, so they run
+in a thread rather than on the event loop.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from app.services import shared_state
+
+
+def fingerprint(*parts: Any) -> str:
+    """Stable hash of JSON-like inputs; dict key order and whitespace do not matter."""
+    canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tags: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str, record_stats: bool = True) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += record_stats
+                return None
+            self._entries.move_to_end(key)
+            self.hits += record_stats
+            return entry[1]
+
+    async def set(self, key: str, value: Any, tags: Iterable[str] = ()):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            tags = tuple(t for t in tags if t)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            # Evict least recently used entries
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    async def invalidate_tag(self, tag: str) -> int:
+        """Drop every entry stored with `tag`; returns the number removed."""
+        with self._lock:
+            keys = list(self._tags.get(tag, ()))
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    async def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class SharedTTLCache:
+    """TTLCache interface over the shared backend; values must be JSON-serialisable."""
+
+    def __init__(self, namespace: str, backend, ttl_seconds: float, max_entries: int = 1024):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # Hit counts are per worker
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str, record_stats: bool = True) -> Optional[Any]:
+        value = await asyncio.to_thread(self.backend.cache_get, self.namespace, key)
+        if value is None:
+            self.misses += record_stats
+        else:
+            self.hits += record_stats
+        return value
+
+    async def set(self, key: str, value: Any, tags: Iterable[str] = ()):
+        await asyncio.to_thread(
+            self.backend.cache_set,
+            self.namespace, key, value, self.ttl_seconds, [t for t in tags if t], self.max_entries
+        )
+
+    async def invalidate_tag(self, tag: str) -> int:
+        return await asyncio.to_thread(self.backend.invalidate_tag, self.namespace, tag)
+
+    async def clear(self):
+        await asyncio.to_thread(self.backend.cache_clear, self.namespace)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": self.backend.cache_count(self.namespace),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def create_cache(namespace: str, ttl_seconds: float, max_entries: int = 1024):
+    """Shared cache when a backend is configured, otherwise an in-process one."""
+    if shared_state.backend is not None:
+        return SharedTTLCache(namespace, shared_state.backend, ttl_seconds, max_entries)
+    return TTLCache(ttl_seconds, max_entries)
+
+
+# DSS recommendations, tagged by normalised village name
+recommendation_cache = create_cache(
+    "dss_recommendations",
+    ttl_seconds=float(os.getenv("DSS_CACHE_TTL_SECONDS", "3600")),
+    max_entries=int(os.getenv("DSS_CACHE_MAX_ENTRIES", "1024")),
+)
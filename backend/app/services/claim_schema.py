@@ -0,0 +1,71 @@
+"""
+Stored claim document layout.
+
+Version 1 (documents without schema_version) kept the full extraction output
+in `extracted_metadata`, repeating the mapped top-level fields, and embedded
+the latest anomaly record in `anomaly_details`.
+
+Version 2 stores in `extracted_metadata` only the extracted values that
+differ from the top-level fields (raw area text, unresolved village
+spellings, gram panchayat, tehsil, ...). `metadata_inherits` is a bit mask
+over INHERITED_FIELDS marking which extracted values equalled the
+top-level field and were dropped. Anomaly records live in the
+claim_anomalies collection, one document per detection.
+
+Readers call expand_claim() to get the full extracted_metadata back for
+either version; new documents are written compact by compact_metadata().
+`python -m migrations.compact_claims` rewrites version 1 documents.
+"""
+from typing import Any, Dict, Optional, Tuple
+
+CLAIM_SCHEMA_VERSION = 2
+
+# Bit i of metadata_inherits refers to INHERITED_FIELDS[i]; append only
+INHERITED_FIELDS = ("claimant_name", "village", "district", "state", "claim_type", "area")
+
+
+def _same(extracted: Any, stored: Any) -> bool:
+    # Exact type too, so expanding gives back 15 rather than 15.0
+    return type(extracted) is type(stored) and extracted == stored
+
+
+def compact_metadata(document: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], int]:
+    """(extracted values that differ from the top-level fields, metadata_inherits mask)"""
+    metadata = document.get("extracted_metadata")
+    if not isinstance(metadata, dict):
+        return metadata, 0
+    inherits = 0
+    diff = {}
+    for key, value in metadata.items():
+        if key in INHERITED_FIELDS and key in document and _same(value, document[key]):
+            inherits |= 1 << INHERITED_FIELDS.index(key)
+        else:
+            diff[key] = value
+    return diff, inherits
+
+
+def compact_claim(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Version 2 layout of a claim document (anomaly_details is dropped)."""
+    if document.get("schema_version", 1) >= CLAIM_SCHEMA_VERSION:
+        return document
+    compact = {key: value for key, value in document.items() if key != "anomaly_details"}
+    compact["extracted_metadata"], compact["metadata_inherits"] = compact_metadata(document)
+    compact["schema_version"] = CLAIM_SCHEMA_VERSION
+    return compact
+
+
+def expand_claim(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Claim document with the full extracted_metadata, whatever its version."""
+    if document.get("schema_version", 1) < 2:
+        return document
+    expanded = {key: value for key, value in document.items() if key != "metadata_inherits"}
+    inherits = document.get("metadata_inherits", 0)
+    diff = document.get("extracted_metadata")
+    if isinstance(diff, dict):
+        metadata = {
+            field: document.get(field)
+            for i, field in enumerate(INHERITED_FIELDS) if inherits & (1 << i)
+        }
+        metadata.update(diff)
+        expanded["extracted_metadata"] = metadata
+    return expanded
@@ -0,0 +1,426 @@
+"""
+Claim search by claimant name, village and gram panchayat.
+
+Search keys are written with each claim (`search_keys`): the field values
+transliterated to Latin when they are in Devanagari, normalised like
+village names (case folding, accents and punctuation stripped) and folded
+to a phonetic skeleton (long vowels, aspirates, doubled letters, f/p, w/v,
+z/j). "सीता गोंड", "Seeta Gond" and "SITA GOND" all get the key "sita gond",
+so a query in either script finds claims written in the other.
+
+The index lives in process memory and is organised by word:
+- every distinct key word gets a token id;
+- per field, each token has a posting list of claim row ids;
+- a character-trigram index over the vocabulary (not over claims) is used
+  for fuzzy matches.
+A query word is resolved against the vocabulary:
+- exactly;
+- by prefix, with a bisect over the sorted vocabulary;
+- fuzzily, scored with the trigram Dice coefficient via np.bincount.
+Then the posting lists of the matched tokens are scored. Claims matching
+more query words rank first, then by score. Only the top claims are read
+from MongoDB.
+
+A background task started with the app loads the index from the claims
+collection and picks up new claims every CLAIM_SEARCH_REFRESH_SECONDS.
+Searches never wait for it: they use whatever is indexed so far. Like the
+Parquet snapshots each refresh re-reads an overlap window before the newest
+_id, so claims inserted late with an older _id are not missed. Claims
+stored without search_keys (older app versions) are keyed while loading.
+
+Refreshes only add claims. Every CLAIM_SEARCH_REBUILD_SECONDS the index is
+rebuilt from the collection and swapped in, which drops the old keys of
+edited claims and the rows of deleted ones; until then a deleted claim is
+left out of results when its document is read, and an edited claim is found
+under its old keys.
+"""
+import asyncio
+import bisect
+import logging
+import os
+import re
+import time
+import unicodedata
+from array import array
+from collections import deque
+from datetime import timedelta
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from bson import ObjectId
+
+from app.database import analytics_db
+from app.services.village_index import normalize_name, trigrams
+
+logger = logging.getLogger(__name__)
+
+CLAIM_SEARCH_REFRESH_SECONDS = float(os.getenv("CLAIM_SEARCH_REFRESH_SECONDS", "2"))
+# Full reload that picks up edited and deleted claims (0 disables)
+CLAIM_SEARCH_REBUILD_SECONDS = float(os.getenv("CLAIM_SEARCH_REBUILD_SECONDS", "900"))
+# How far before the newest indexed _id each refresh looks for late inserts
+CLAIM_SEARCH_OVERLAP_SECONDS = float(os.getenv("CLAIM_SEARCH_OVERLAP_SECONDS", "300"))
+# Minimum trigram similarity for a fuzzy word match
+CLAIM_SEARCH_FUZZY_THRESHOLD = float(os.getenv("CLAIM_SEARCH_FUZZY_THRESHOLD", "0.5"))
+# Vocabulary words a single prefix or fuzzy query word may expand to
+CLAIM_SEARCH_MAX_EXPANSIONS = int(os.getenv("CLAIM_SEARCH_MAX_EXPANSIONS", "64"))
+
+# Searchable fields and their weight in the ranking
+SEARCH_FIELDS = {"claimant_name": 1.0, "village": 0.9, "gram_panchayat": 0.8}
+
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.85
+FUZZY_SCORE = 0.8
+
+# Devanagari to Latin (Hunterian-style, as names are usually spelled in English)
+_CONSONANTS = {
+    "क": "k", "ख": "kh", "ग": "g", "घ": "gh", "ङ": "n",
+    "च": "ch", "छ": "chh", "ज": "j", "झ": "jh", "ञ": "n",
+    "ट": "t", "ठ": "th", "ड": "d", "ढ": "dh", "ण": "n",
+    "त": "t", "थ": "th", "द": "d", "ध": "dh", "न": "n",
+    "प": "p", "फ": "ph", "ब": "b", "भ": "bh", "म": "m",
+    "य": "y", "र": "r", "ल": "l", "व": "v", "ळ": "l",
+    "श": "sh", "ष": "sh", "स": "s", "ह": "h",
+}
+# Nukta forms
+_NUKTA_CONSONANTS = {"क": "q", "ख": "kh", "ग": "g", "ज": "z", "ड": "r", "ढ": "rh", "फ": "f", "य": "y"}
+_PRECOMPOSED_NUKTA = {
+    "क़": "क", "ख़": "ख", "ग़": "ग", "ज़": "ज",
+    "ड़": "ड", "ढ़": "ढ", "फ़": "फ", "य़": "य",
+}
+_VOWELS = {
+    "अ": "a", "आ": "aa", "इ": "i", "ई": "ee", "उ": "u", "ऊ": "oo", "ऋ": "ri",
+    "ए": "e", "ऐ": "ai", "ओ": "o", "औ": "au", "ऑ": "o",
+}
+_VOWEL_SIGNS = {
+    "ा": "aa", "ि": "i", "ी": "ee", "ु": "u", "ू": "oo", "ृ": "ri",
+    "े": "e", "ै": "ai", "ो": "o", "ौ": "au", "ॉ": "o", "ॅ": "e",
+}
+_NASALS = {"ं": "n", "ँ": "n"}
+_VISARGA = "ः"
+_VIRAMA = "्"
+_NUKTA = "़"
+_DIGITS = {chr(0x0966 + d): str(d) for d in range(10)}
+
+# Latin spelling variants folded to one form: w/v, z/j, q/k, f/p, x/ks,
+# ee/i, oo/u, aspirates (bh -> b, chh -> c, sh -> s) and doubled letters
+_LATIN_LETTERS = str.maketrans({"w": "v", "z": "j", "q": "k", "f": "p", "x": "ks"})
+_ASPIRATES = re.compile(r"([bcdgjkpstr])h+")
+_DOUBLED = re.compile(r"(\w)\1+")
+
+_DEVANAGARI = re.compile("[\u0900-\u097F]")
+
+
+def _is_devanagari(ch: str) -> bool:
+    return "\u0900" <= ch <= "\u097F"
+
+
+def to_latin(value: str) -> str:
+    """
+    Romanise Devanagari text; other characters are kept. The inherent vowel
+    is dropped at the end of a word (unless it follows a conjunct) and where
+    Hindi speech drops it, between a vowel-final syllable and a consonant
+    with a vowel sign.
+    """
+    text = unicodedata.normalize("NFC", value)
+    for composed, base in _PRECOMPOSED_NUKTA.items():
+        text = text.replace(composed, base + _NUKTA)
+
+    # (kind, consonant, vowel): "C" consonant (vowel None for the inherent
+    # vowel, "" after a virama), "V" vowel, "N" nasal/visarga, "O" anything else
+    units: List[Tuple[str, str, Optional[str]]] = []
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch in _CONSONANTS:
+            consonant = _CONSONANTS[ch]
+            if i + 1 < len(text) and text[i + 1] == _NUKTA:
+                consonant = _NUKTA_CONSONANTS.get(ch, consonant)
+                i += 1
+            vowel = None
+            if i + 1 < len(text) and text[i + 1] == _VIRAMA:
+                vowel = ""
+                i += 1
+            elif i + 1 < len(text) and text[i + 1] in _VOWEL_SIGNS:
+                vowel = _VOWEL_SIGNS[text[i + 1]]
+                i += 1
+            units.append(("C", consonant, vowel))
+        elif ch in _VOWELS:
+            units.append(("V", "", _VOWELS[ch]))
+        elif ch in _NASALS:
+            units.append(("N", "", _NASALS[ch]))
+        elif ch == _VISARGA:
+            units.append(("N", "", "h"))
+        elif ch in _DIGITS:
+            units.append(("O", "", _DIGITS[ch]))
+        elif not _is_devanagari(ch):
+            units.append(("O", "", ch))
+        i += 1
+
+    out = []
+    for k, (kind, consonant, vowel) in enumerate(units):
+        if kind == "C" and vowel is None:
+            following = units[k + 1] if k + 1 < len(units) else None
+            previous = units[k - 1] if k > 0 else None
+            after_cluster = previous is not None and previous[0] == "C" and previous[2] == ""
+            if (following is None or following[0] == "O") and not after_cluster:
+                vowel = ""      # end of word (but महेंद्र -> mahendra)
+            elif (following is not None and following[0] == "C" and following[2] and previous is not None
+                  and (previous[0] in ("V", "N") or (previous[0] == "C" and previous[2] != ""))):
+                vowel = ""      # medial schwa deletion (मंडला -> mandlaa)
+            else:
+                vowel = "a"
+            units[k] = (kind, consonant, vowel)
+        elif kind == "N" and k + 1 < len(units) and units[k + 1][1] == "h":
+            vowel = "ng"        # सिंह -> singh
+        out.append(consonant + vowel)
+    return "".join(out)
+
+
+@lru_cache(maxsize=65536)
+def _key(text: str) -> str:
+    if _DEVANAGARI.search(text):
+        text = to_latin(text)
+    key = normalize_name(text).translate(_LATIN_LETTERS).replace("ee", "i").replace("oo", "u")
+    return _DOUBLED.sub(r"\1", _ASPIRATES.sub(r"\1", key))
+
+
+def search_key(value: Any) -> str:
+    """Script-independent, spelling-tolerant key of a name (see module docstring)"""
+    if value is None:
+        return ""
+    # Names repeat a lot across claims
+    return _key(str(value))
+
+
+def claim_search_keys(document: Dict[str, Any]) -> Dict[str, str]:
+    """search_keys of a claim document (gram panchayat from its extracted metadata)"""
+    metadata = document.get("extracted_metadata")
+    metadata = metadata if isinstance(metadata, dict) else {}
+    values = {
+        "claimant_name": document.get("claimant_name"),
+        "village": document.get("village"),
+        "gram_panchayat": metadata.get("gram_panchayat"),
+    }
+    keys = {field: search_key(value) for field, value in values.items()}
+    return {field: key for field, key in keys.items() if key}
+
+
+class ClaimSearchIndex:
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.clear()
+
+    def clear(self):
+        """Forget everything; the next refresh reloads from the collection"""
+        self._claim_ids = bytearray()                 # 12-byte ObjectIds by row id
+        self._tokens: List[str] = []
+        self._token_ids: Dict[str, int] = {}
+        self._sorted_tokens: List[str] = []
+        self._sorted_dirty = False
+        self._postings: Dict[Tuple[int, int], array] = {}   # (field, token) -> claim rows
+        self._gram_postings: Dict[str, array] = {}          # trigram -> token ids
+        self._token_gram_counts = array("H")
+        self._newest: Optional[ObjectId] = None
+        self._recent: Set[ObjectId] = set()
+        self._loaded = False
+
+    def __len__(self):
+        return len(self._claim_ids) // 12
+
+    def claim_id(self, row: int) -> ObjectId:
+        return ObjectId(bytes(self._claim_ids[row * 12:row * 12 + 12]))
+
+    def _token(self, word: str) -> int:
+        token = self._token_ids.get(word)
+        if token is None:
+            token = self._token_ids[word] = len(self._tokens)
+            self._tokens.append(word)
+            grams = trigrams(word)
+            self._token_gram_counts.append(len(grams))
+            for gram in grams:
+                self._gram_postings.setdefault(gram, array("i")).append(token)
+            self._sorted_dirty = True
+        return token
+
+    def add(self, claim_id: ObjectId, keys: Dict[str, str]):
+        """Index one claim (its search_keys) under a new row id"""
+        row = len(self)
+        self._claim_ids += claim_id.binary
+        for field_index, field in enumerate(SEARCH_FIELDS):
+            for word in set(keys.get(field, "").split()):
+                self._postings.setdefault((field_index, self._token(word)), array("i")).append(row)
+
+    async def refresh(self):
+        """Index claims inserted since the last refresh (all claims the first time)"""
+        async with self._lock:
+            started = time.perf_counter()
+            query: Dict[str, Any] = {}
+            if self._newest is not None:
+                since = self._newest.generation_time - timedelta(seconds=CLAIM_SEARCH_OVERLAP_SECONDS)
+                query["_id"] = {"$gte": ObjectId.from_datetime(since)}
+            projection = {"search_keys": 1, "claimant_name": 1, "village": 1, "extracted_metadata.gram_panchayat": 1}
+            overlap = timedelta(seconds=CLAIM_SEARCH_OVERLAP_SECONDS)
+            added = 0
+            # Ids within the overlap window of the newest one, so the next refresh skips them
+            recent: Deque[ObjectId] = deque()
+            async for document in analytics_db["claims"].find(query, projection).sort("_id", 1):
+                claim_id = document["_id"]
+                self._newest = claim_id
+                recent.append(claim_id)
+                while recent[0].generation_time < claim_id.generation_time - overlap:
+                    recent.popleft()
+                if claim_id in self._recent:
+                    continue
+                keys = document.get("search_keys")
+                self.add(claim_id, keys if isinstance(keys, dict) else claim_search_keys(document))
+                added += 1
+                if added % 1000 == 0:
+                    # A first load can take a while; let requests run in between
+                    await asyncio.sleep(0)
+            if recent:
+                self._recent = set(recent)
+            if not self._loaded or added > 1000:
+                logger.info("Claim search index refreshed", extra={
+                    "claims_added": added, "claims": len(self), "tokens": len(self._tokens),
+                    "seconds": round(time.perf_counter() - started, 3),
+                })
+            self._loaded = True
+
+    async def rebuild(self):
+        """Load every claim into a new index and switch to it (see module docstring)"""
+        fresh = ClaimSearchIndex()
+        await fresh.refresh()
+        async with self._lock:
+            # Everything but this index's own lock and background task
+            vars(self).update({k: v for k, v in vars(fresh).items() if k not in ("_lock", "_task")})
+
+    def _expand(self, word: str, prefix: bool, fuzzy: bool) -> Dict[int, float]:
+        """Vocabulary tokens matching one query word, with their match score"""
+        matches: Dict[int, float] = {}
+        exact = self._token_ids.get(word)
+        if exact is not None:
+            matches[exact] = EXACT_SCORE
+
+        if prefix:
+            if self._sorted_dirty:
+                self._sorted_tokens = sorted(self._tokens)
+                self._sorted_dirty = False
+            start = bisect.bisect_left(self._sorted_tokens, word)
+            expanded = 0
+            for candidate in self._sorted_tokens[start:]:
+                if not candidate.startswith(word) or expanded >= CLAIM_SEARCH_MAX_EXPANSIONS:
+                    break
+                token = self._token_ids[candidate]
+                # Shorter completions rank above long ones
+                matches.setdefault(token, PREFIX_SCORE * (0.5 + 0.5 * len(word) / len(candidate)))
+                expanded += 1
+
+        if fuzzy and self._tokens:
+            grams = trigrams(word)
+            lists = [np.frombuffer(self._gram_postings[g], dtype=np.int32) for g in grams if g in self._gram_postings]
+            if lists:
+                hits = np.bincount(np.concatenate(lists), minlength=len(self._tokens))
+                candidates = np.nonzero(hits)[0]
+                gram_counts = np.frombuffer(self._token_gram_counts, dtype=np.uint16)[candidates]
+                # Dice coefficient between the query word and candidate trigram sets
+                similarity = 2.0 * hits[candidates] / (len(grams) + gram_counts)
+                keep = similarity >= CLAIM_SEARCH_FUZZY_THRESHOLD
+                candidates, similarity = candidates[keep], similarity[keep]
+                for i in np.argsort(-similarity)[:CLAIM_SEARCH_MAX_EXPANSIONS]:
+                    matches.setdefault(int(candidates[i]), FUZZY_SCORE * float(similarity[i]))
+        return matches
+
+    def search(self, query: str, fields: Optional[List[str]] = None, limit: int = 20,
+               prefix: bool = True, fuzzy: bool = True) -> List[Tuple[ObjectId, float, List[str]]]:
+        """
+        (claim id, score, matched fields) of the best claims for a query.
+        The last query word is also matched as a prefix (search as you type).
+        """
+        words = search_key(query).split()
+        if not words or not len(self):
+            return []
+        field_indexes = [i for i, field in enumerate(SEARCH_FIELDS) if not fields or field in fields]
+        weights = list(SEARCH_FIELDS.values())
+
+        total = np.zeros(len(self), dtype=np.float32)
+        matched_words = np.zeros(len(self), dtype=np.int16)
+        matched_fields = np.zeros(len(self), dtype=np.uint8)
+        for position, word in enumerate(words):
+            is_last = position == len(words) - 1
+            tokens = self._expand(word, prefix=prefix and is_last, fuzzy=fuzzy)
+            best = np.zeros(len(self), dtype=np.float32)
+            for token, score in tokens.items():
+                for field_index in field_indexes:
+                    postings = self._postings.get((field_index, token))
+                    if postings is None:
+                        continue
+                    rows = np.frombuffer(postings, dtype=np.int32)
+                    best[rows] = np.maximum(best[rows], score * weights[field_index])
+                    matched_fields[rows] |= 1 << field_index
+            total += best
+            matched_words += best > 0
+
+        most = matched_words.max()
+        if most == 0:
+            return []
+        candidates = np.flatnonzero(matched_words == most)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-total[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.argsort(-total[candidates], kind="stable")]
+        names = list(SEARCH_FIELDS)
+        return [
+            (
+                self.claim_id(int(row)),
+                round(float(total[row]) / len(words), 3),
+                [names[i] for i in field_indexes if matched_fields[row] & (1 << i)],
+            )
+            for row in candidates
+        ]
+
+    async def _run_periodically(self):
+        rebuilt_at = time.monotonic()
+        while True:
+            try:
+                if self._loaded and CLAIM_SEARCH_REBUILD_SECONDS > 0 \
+                        and time.monotonic() - rebuilt_at >= CLAIM_SEARCH_REBUILD_SECONDS:
+                    await self.rebuild()
+                    rebuilt_at = time.monotonic()
+                else:
+                    await self.refresh()
+            except Exception:
+                logger.exception("Claim search index refresh failed")
+            await asyncio.sleep(CLAIM_SEARCH_REFRESH_SECONDS)
+
+    def start(self):
+        """
+        Load the index and keep it current in the background; searches
+        meanwhile use what is loaded so far
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_periodically())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "claims": len(self),
+            "tokens": len(self._tokens),
+            "postings": sum(len(p) for p in self._postings.values()),
+            "newest_id": str(self._newest) if self._newest else None,
+            "loaded": self._loaded,
+            "refresh_seconds": CLAIM_SEARCH_REFRESH_SECONDS,
+            "rebuild_seconds": CLAIM_SEARCH_REBUILD_SECONDS,
+        }
+
+
+# Loaded and refreshed by the task claim_search.start() runs with the app
+claim_search = ClaimSearchIndex()
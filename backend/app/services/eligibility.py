@@ -0,0 +1,453 @@
+"""
+Declarative scheme eligibility rules.
+
+Each scheme in SCHEMES publishes human-readable `eligibility_criteria` and
+machine-readable `rules`. A rule is a condition tree over claim holder and
+village attributes:
+
+    {"all": [cond, ...]} | {"any": [cond, ...]} | {"not": cond}
+    {"field": "claim_type", "op": "eq", "value": "individual"}
+
+Rules are compiled once into numpy predicates that take a dict of equal-length
+column arrays and return a boolean mask, so a whole district of holders is
+checked against every scheme in one vectorised pass.
+"""
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, List, Literal, Optional
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError, model_validator
+
+Columns = Dict[str, np.ndarray]
+Predicate = Callable[[Columns, int], np.ndarray]
+
+SCHEMES = [
+    {
+        "id": "dajgua",
+        "name": "DAJGUA",
+        "full_name": "Development of Antyodaya and Other Tribal Families",
+        "ministry": "Ministry of Tribal Affairs",
+        "eligibility_criteria": {
+            "target_group": "Tribal families",
+            "income_limit": 50000,
+            "land_ownership": "FRA pattas preferred"
+        },
+        "benefits": ["Livelihood support", "Skill development", "Infrastructure development"],
+        "rules": [
+            {
+                "id": "dajgua-individual-holder",
+                "when": {"field": "claim_type", "op": "eq", "value": "individual"},
+                "recommendation": {
+                    "type": "Scheme Eligibility",
+                    "title": "DAJGUA Scheme Eligibility",
+                    "description": "Individual FRA holder eligible for Development of Antyodaya and Other Tribal Families scheme. Provides livelihood support and skill development.",
+                    "action": "Apply for DAJGUA",
+                    "priority": "High",
+                    "confidence_score": 0.85,
+                    "reasoning": "Individual FRA claim holders are primary beneficiaries of DAJGUA scheme"
+                }
+            }
+        ]
+    },
+    {
+        "id": "pm_janman",
+        "name": "PM-JANMAN",
+        "full_name": "Pradhan Mantri Janjati Adivasi Nyaya Maha Abhiyan",
+        "ministry": "Ministry of Tribal Affairs",
+        "eligibility_criteria": {
+            "target_group": "Particularly Vulnerable Tribal Groups (PVTGs)",
+            "coverage": "All PVTG villages and habitations"
+        },
+        "benefits": ["Safe housing", "Clean drinking water", "Sanitation", "Healthcare", "Education"],
+        "rules": [
+            {
+                "id": "pm-janman-pvtg",
+                "when": {"any": [
+                    {"field": "is_pvtg", "op": "eq", "value": True},
+                    {"field": "pvtg_village", "op": "eq", "value": True}
+                ]},
+                "recommendation": {
+                    "type": "Scheme Eligibility",
+                    "title": "PM-JANMAN Coverage",
+                    "description": "PVTG household or habitation eligible for housing, drinking water, sanitation, healthcare and education under PM-JANMAN.",
+                    "action": "Enrol under PM-JANMAN",
+                    "priority": "High",
+                    "confidence_score": 0.9,
+                    "reasoning": "All PVTG villages and habitations are covered by PM-JANMAN"
+                }
+            }
+        ]
+    },
+    {
+        "id": "jal_shakti",
+        "name": "Jal Shakti Abhiyan",
+        "full_name": "Jal Shakti Abhiyan",
+        "ministry": "Ministry of Jal Shakti",
+        "eligibility_criteria": {
+            "target_group": "Water-stressed villages",
+            "priority": "Villages with low water index"
+        },
+        "benefits": ["Borewell installation", "Water conservation", "Rainwater harvesting"],
+        "rules": [
+            {
+                "id": "jal-shakti-low-water-index",
+                "when": {"field": "water_index", "op": "lt", "value": 0.4},
+                "recommendation": {
+                    "type": "Priority Intervention",
+                    "title": "Jal Shakti Abhiyan Priority",
+                    "description": "Village shows indicators of water stress. High priority for borewell installation and water conservation under Jal Shakti Abhiyan.",
+                    "action": "Deploy Water Survey Team",
+                    "priority": "High",
+                    "confidence_score": 0.9,
+                    "reasoning": "Village water index is below 0.4"
+                }
+            },
+            {
+                "id": "jal-shakti-drought-keyword",
+                "when": {"field": "village", "op": "contains_any", "value": ["dry", "drought", "water"]},
+                "recommendation": {
+                    "type": "Priority Intervention",
+                    "title": "Jal Shakti Abhiyan Priority",
+                    "description": "Village shows indicators of water stress. High priority for borewell installation and water conservation under Jal Shakti Abhiyan.",
+                    "action": "Deploy Water Survey Team",
+                    "priority": "High",
+                    "confidence_score": 0.7,
+                    "reasoning": "Village name indicates water scarcity"
+                }
+            }
+        ]
+    },
+    {
+        "id": "mgnrega",
+        "name": "MGNREGA",
+        "full_name": "Mahatma Gandhi National Rural Employment Guarantee Act",
+        "ministry": "Ministry of Rural Development",
+        "eligibility_criteria": {
+            "target_group": "Rural households",
+            "work_guarantee": "100 days per household per year"
+        },
+        "benefits": ["Guaranteed employment", "Asset creation", "Livelihood security"],
+        "rules": [
+            {
+                "id": "mgnrega-rural-household",
+                "when": {"all": []},
+                "recommendation": {
+                    "type": "Scheme Eligibility",
+                    "title": "MGNREGA Employment Guarantee",
+                    "description": "FRA holder eligible for 100 days guaranteed employment under MGNREGA. Can participate in forest conservation and rural development works.",
+                    "action": "Register for MGNREGA",
+                    "priority": "Medium",
+                    "confidence_score": 0.95,
+                    "reasoning": "All rural households are eligible for MGNREGA employment guarantee"
+                }
+            }
+        ]
+    },
+    {
+        "id": "pmay",
+        "name": "PMAY-G",
+        "full_name": "Pradhan Mantri Awas Yojana - Gramin",
+        "ministry": "Ministry of Rural Development",
+        "eligibility_criteria": {
+            "target_group": "Houseless and households with kutcha houses",
+            "income_criteria": "Below poverty line"
+        },
+        "benefits": ["Pucca house construction", "Financial assistance up to Rs 1.30 lakh"],
+        "rules": [
+            {
+                "id": "pmay-kutcha-or-houseless",
+                "when": {"any": [
+                    {"field": "house_type", "op": "in", "value": ["kutcha", "houseless"]},
+                    {"field": "is_bpl", "op": "eq", "value": True}
+                ]},
+                "recommendation": {
+                    "type": "Scheme Eligibility",
+                    "title": "PMAY-G Housing Assistance",
+                    "description": "Household eligible for pucca house construction assistance under Pradhan Mantri Awas Yojana - Gramin.",
+                    "action": "Apply for PMAY-G",
+                    "priority": "Medium",
+                    "confidence_score": 0.8,
+                    "reasoning": "Houseless, kutcha-house or BPL households are PMAY-G beneficiaries"
+                }
+            }
+        ]
+    }
+]
+
+
+# Client-supplied schemes are validated against these before compiling
+
+class ConditionSchema(BaseModel):
+    """One node of a rule condition tree: all/any/not, or a field comparison"""
+    model_config = ConfigDict(populate_by_name=True)
+
+    all: Optional[List["ConditionSchema"]] = None
+    any: Optional[List["ConditionSchema"]] = None
+    not_: Optional["ConditionSchema"] = Field(None, alias="not")
+    field: Optional[str] = None
+    op: Optional[Literal["lt", "lte", "gt", "gte", "eq", "ne", "in", "not_in", "exists", "contains_any"]] = None
+    value: Any = None
+
+    @model_validator(mode="after")
+    def _one_kind(self):
+        kinds = [k for k in ("all", "any", "not_", "field") if getattr(self, k) is not None]
+        if len(kinds) != 1:
+            raise ValueError("a condition needs exactly one of all, any, not or field")
+        if self.field is not None and self.op is None:
+            raise ValueError(f"condition on {self.field!r} has no op")
+        if self.op in ("in", "not_in", "contains_any") and not isinstance(self.value, (list, tuple)):
+            raise ValueError(f"op {self.op!r} needs a list value")
+        return self
+
+
+class RuleSchema(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    id: str
+    when: Optional[ConditionSchema] = None
+    recommendation: Dict[str, Any] = {}
+
+
+class SchemeSchema(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    id: Optional[str] = None
+    rules: Optional[List[RuleSchema]] = None
+
+    @model_validator(mode="after")
+    def _rules_need_id(self):
+        if self.rules and not self.id:
+            raise ValueError("a scheme with rules needs an id")
+        return self
+
+
+SCHEME_LIST = TypeAdapter(List[SchemeSchema])
+
+
+def validate_schemes(schemes: Optional[List[Dict]]) -> Optional[List[Dict]]:
+    """
+    Check client-supplied schemes (unknown ops, rules without ids, malformed
+    conditions) before they reach get_engine. Returns them unchanged, or
+    raises ValueError naming the offending rule.
+    """
+    if not schemes:
+        return schemes
+    try:
+        SCHEME_LIST.validate_python(schemes)
+    except ValidationError as e:
+        error = e.errors()[0]
+        path = "".join(f"[{part}]" if isinstance(part, int) else f".{part}" for part in error["loc"])
+        rule = ""
+        if len(error["loc"]) > 2 and error["loc"][1] == "rules":
+            scheme = schemes[error["loc"][0]]
+            rules = scheme.get("rules") or []
+            index = error["loc"][2]
+            if isinstance(index, int) and index < len(rules) and isinstance(rules[index], dict) \
+                    and rules[index].get("id"):
+                rule = f" (rule {rules[index]['id']!r})"
+        message = error["msg"].removeprefix("Value error, ")
+        raise ValueError(f"schemes_data{path}{rule}: {message}")
+    return schemes
+
+
+def _numeric(column: np.ndarray) -> np.ndarray:
+    if column.dtype.kind in "fiub":
+        return column.astype(np.float64, copy=False)
+    return np.array(
+        [v if isinstance(v, (int, float)) and not isinstance(v, bool) else np.nan for v in column],
+        dtype=np.float64,
+    )
+
+
+def _column(columns: Columns, field: str, size: int) -> np.ndarray:
+    column = columns.get(field)
+    if column is None:
+        return np.full(size, None, dtype=object)
+    return column
+
+
+def _compare(op: str, value) -> Predicate:
+    numeric_ops = {
+        "lt": np.less, "lte": np.less_equal, "gt": np.greater, "gte": np.greater_equal,
+    }
+
+    def predicate(columns: Columns, size: int, field: str) -> np.ndarray:
+        column = _column(columns, field, size)
+        if op in numeric_ops:
+            # NaN (missing) compares False
+            with np.errstate(invalid="ignore"):
+                return numeric_ops[op](_numeric(column), value)
+        if op == "eq":
+            return np.asarray(column == value, dtype=bool)
+        if op == "ne":
+            return np.asarray(column != value, dtype=bool)
+        if op == "in":
+            return np.isin(column, list(value))
+        if op == "not_in":
+            return ~np.isin(column, list(value))
+        if op == "exists":
+            return np.array([v is not None for v in column], dtype=bool) == bool(value)
+        if op == "contains_any":
+            # Text columns (village names) have few distinct values; test each once
+            keywords = [str(k).lower() for k in value]
+            seen = {}
+
+            def contains(v):
+                hit = seen.get(v)
+                if hit is None:
+                    hit = seen[v] = isinstance(v, str) and any(k in v.lower() for k in keywords)
+                return hit
+            return np.fromiter((contains(v) for v in column), dtype=bool, count=len(column))
+        raise ValueError(f"Unknown rule operator: {op}")
+
+    return predicate
+
+
+def compile_condition(condition: Dict) -> Predicate:
+    """Compile a condition tree into a function (columns, size) -> boolean mask."""
+    if "all" in condition:
+        parts = [compile_condition(c) for c in condition["all"]]
+
+        def all_of(columns: Columns, size: int) -> np.ndarray:
+            mask = np.ones(size, dtype=bool)
+            for part in parts:
+                mask &= part(columns, size)
+            return mask
+        return all_of
+
+    if "any" in condition:
+        parts = [compile_condition(c) for c in condition["any"]]
+
+        def any_of(columns: Columns, size: int) -> np.ndarray:
+            mask = np.zeros(size, dtype=bool)
+            for part in parts:
+                mask |= part(columns, size)
+            return mask
+        return any_of
+
+    if "not" in condition:
+        part = compile_condition(condition["not"])
+        return lambda columns, size: ~part(columns, size)
+
+    field = condition["field"]
+    compare = _compare(condition["op"], condition.get("value"))
+    return lambda columns, size: compare(columns, size, field)
+
+
+def condition_fields(condition: Dict) -> set:
+    """Names of the fields a condition tree compares"""
+    if "all" in condition or "any" in condition:
+        return set().union(*(condition_fields(c) for c in condition.get("all", condition.get("any"))))
+    if "not" in condition:
+        return condition_fields(condition["not"])
+    return {condition["field"]} if "field" in condition else set()
+
+
+class CompiledRule:
+    def __init__(self, scheme_id: str, rule: Dict):
+        self.scheme_id = scheme_id
+        self.id = rule["id"]
+        self.recommendation = rule.get("recommendation", {})
+        self.predicate = compile_condition(rule.get("when", {"all": []}))
+        self.fields = condition_fields(rule.get("when", {"all": []}))
+
+
+class EligibilityEngine:
+    def __init__(self, schemes: List[Dict]):
+        self.rules = [
+            CompiledRule(scheme["id"], rule)
+            for scheme in schemes
+            for rule in scheme.get("rules", [])
+        ]
+        self.scheme_ids = [scheme["id"] for scheme in schemes]
+        # Every field a rule reads, so batch callers can build a column for each
+        self.fields = sorted(set().union(*(rule.fields for rule in self.rules)))
+
+    def evaluate_schemes(self, columns: Columns) -> Dict[str, Dict]:
+        """
+        Per scheme: `eligible` mask (any rule matched) and `matched_rule`, the
+        id of the first matching rule for each row (None where none matched).
+        """
+        size = len(next(iter(columns.values()))) if columns else 0
+        results = {}
+        for rule in self.rules:
+            mask = rule.predicate(columns, size)
+            entry = results.setdefault(rule.scheme_id, {
+                "eligible": np.zeros(size, dtype=bool),
+                "matched_rule": np.full(size, None, dtype=object),
+            })
+            first_match = mask & ~entry["eligible"]
+            entry["matched_rule"][first_match] = rule.id
+            entry["eligible"] |= mask
+        return results
+
+    def match_record(self, record: Dict) -> List[CompiledRule]:
+        """Rules matched by a single holder; the first matching rule per scheme."""
+        columns = {key: np.array([value], dtype=object) for key, value in record.items()}
+        for key, value in record.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                columns[key] = np.array([value], dtype=np.float64)
+
+        matched, seen_schemes = [], set()
+        for rule in self.rules:
+            if rule.scheme_id in seen_schemes:
+                continue
+            if rule.predicate(columns, 1)[0]:
+                matched.append(rule)
+                seen_schemes.add(rule.scheme_id)
+        return matched
+
+
+def columns_from_records(records: List[Dict], fields: List[str], numeric_fields: Optional[List[str]] = None) -> Columns:
+    """Build column arrays from a list of dicts (numeric fields as float64 with NaN for missing)."""
+    numeric_fields = set(numeric_fields or [])
+    columns = {}
+    for field in fields:
+        values = [record.get(field) for record in records]
+        if field in numeric_fields:
+            columns[field] = np.array(
+                [float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else np.nan for v in values],
+                dtype=np.float64,
+            )
+        else:
+            columns[field] = np.array(values, dtype=object)
+    return columns
+
+
+_default_engine = EligibilityEngine(SCHEMES)
+_compiled_engines: Dict[str, EligibilityEngine] = {}
+MAX_COMPILED_ENGINES = 32
+_compiled_lock = threading.Lock()
+
+
+def get_engine(schemes: Optional[List[Dict]] = None) -> EligibilityEngine:
+    """
+    Engine for the given scheme list. Schemes that publish their own `rules`
+    are compiled once per distinct rule set; schemes without rules use the
+    built-in rules for the same scheme ids.
+    """
+    if not schemes:
+        return _default_engine
+
+    by_id = {scheme["id"]: scheme for scheme in SCHEMES}
+    resolved = []
+    for scheme in schemes:
+        if scheme.get("rules"):
+            resolved.append(scheme)
+        elif scheme.get("id") in by_id:
+            resolved.append(by_id[scheme["id"]])
+
+    fingerprint = hashlib.sha256(
+        json.dumps([(s["id"], s["rules"]) for s in resolved], sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+    with _compiled_lock:
+        engine = _compiled_engines.get(fingerprint)
+        if engine is None:
+            if len(_compiled_engines) >= MAX_COMPILED_ENGINES:
+                _compiled_engines.clear()
+            engine = EligibilityEngine(resolved)
+            _compiled_engines[fingerprint] = engine
+    return engine
@@ -0,0 +1,364 @@
+"""
+Durable ingestion queue: claim submissions are stored in the `ingest_queue`
+collection and processed by a pool of async workers, so the HTTP request
+only pays for one insert.
+
+Each job runs through an ordered list of stages (extraction, mapping,
+validation, insert for claims). Every stage has its own semaphore, so the
+slow LLM stage can be limited independently of the cheap ones while the
+workers keep the other stages busy.
+
+Jobs are claimed with an atomic find_one_and_update and hold a lease under
+a per-claim owner id. The worker renews the lease while the job runs, so a
+long LLM stage keeps it; a job whose worker died is picked up again once
+the lease expires. Every claim, including such a reclaim, counts as an
+attempt, and a job whose lease expires on its last attempt is marked
+failed. Status updates only apply while the worker still owns the lease.
+Transient failures (provider unavailable, timeouts, lost database
+connections) are retried with backoff, anything else marks the job failed. Several app
+processes can drain the same queue. A unique index on idempotency_key keeps
+a resubmitted payload from being queued twice.
+"""
+import asyncio
+import inspect
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import ConnectionFailure, DuplicateKeyError
+
+from app.database import db
+from app.services.log import error_fields, summarize
+from app.services.metrics import observe_ingest_stage
+from app.services.resilience import RETRYABLE_STATUS_CODES
+from app.services.tracing import span
+
+INGEST_COLLECTION = "ingest_queue"
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "8"))
+INGEST_POLL_SECONDS = float(os.getenv("INGEST_POLL_SECONDS", "1.0"))
+INGEST_LEASE_SECONDS = float(os.getenv("INGEST_LEASE_SECONDS", "300"))
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+INGEST_RETRY_BACKOFF_SECONDS = float(os.getenv("INGEST_RETRY_BACKOFF_SECONDS", "5"))
+INGEST_SHUTDOWN_GRACE_SECONDS = float(os.getenv("INGEST_SHUTDOWN_GRACE_SECONDS", "10"))
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyConflict(Exception):
+    """An idempotency key was reused for a different payload."""
+
+
+class LeaseLost(Exception):
+    """The job's lease expired and another worker may have claimed it."""
+
+
+@dataclass
+class Stage:
+    """
+    One processing step. `run` receives the job's working state (a dict with
+    "ingest_id", the stored "payload", "idempotency_key" and "request_hash")
+    and adds its outputs to it; it may be a plain or an async function.
+    """
+    name: str
+    run: Callable[[Dict[str, Any]], Union[None, Awaitable[None]]]
+    concurrency: int
+
+
+def is_retryable(error: Exception) -> bool:
+    """Provider/timeouts/connection errors are worth retrying, bad input is not."""
+    if isinstance(error, (asyncio.TimeoutError, ConnectionFailure)):
+        return True
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+class IngestQueue:
+    def __init__(self, stages: List[Stage], workers: int = INGEST_WORKERS):
+        self.stages = stages
+        self.workers = workers
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._active = {stage.name: 0 for stage in stages}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+
+    @property
+    def collection(self):
+        return db[INGEST_COLLECTION]
+
+    async def enqueue(self, payload: Any, idempotency_key: Optional[str] = None,
+                      request_hash: Optional[str] = None) -> Tuple[str, bool]:
+        """
+        Persist a submission. Returns (tracking id, created); a job already
+        queued under the same idempotency key is returned instead of a new
+        one, or IdempotencyConflict raised if its request hash differs. A
+        failed job is queued again under its tracking id (created is True).
+        """
+        now = datetime.now()
+        document = {
+            "payload": payload,
+            "status": "queued",
+            "stage": None,
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now,
+            "available_at": now,
+        }
+        if idempotency_key:
+            document["idempotency_key"] = idempotency_key
+            document["request_hash"] = request_hash
+        try:
+            with span("ingest.enqueue", collection=INGEST_COLLECTION):
+                result = await self.collection.insert_one(document)
+        except DuplicateKeyError:
+            existing = await self.collection.find_one(
+                {"idempotency_key": idempotency_key}, {"request_hash": 1, "status": 1}
+            )
+            if existing is None:
+                raise
+            if existing.get("request_hash") != request_hash:
+                raise IdempotencyConflict(idempotency_key)
+            if existing.get("status") != "failed":
+                return str(existing["_id"]), False
+            # Resubmitting a failed claim retries it instead of replaying the failure
+            requeued = await self.collection.update_one(
+                {"_id": existing["_id"], "status": "failed"},
+                {"$set": {"status": "queued", "stage": None, "error": None, "attempts": 0,
+                          "updated_at": now, "available_at": now}},
+            )
+            if not requeued.modified_count:
+                # Another resubmission re-queued it first
+                return str(existing["_id"]), False
+            inserted_id = existing["_id"]
+        else:
+            inserted_id = result.inserted_id
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return str(inserted_id), True
+
+    async def get(self, ingest_id: str) -> Optional[Dict[str, Any]]:
+        """Job status without the payload, or None for unknown ids."""
+        if not ObjectId.is_valid(ingest_id):
+            return None
+        job = await self.collection.find_one({"_id": ObjectId(ingest_id)}, {"payload": 0})
+        if job is not None:
+            job["ingest_id"] = str(job.pop("_id"))
+        return job
+
+    async def depth(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        counts = {"queued": 0, "processing": 0, "done": 0, "failed": 0}
+        async for row in self.collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            counts[row["_id"]] = row["count"]
+        return counts
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._tasks),
+            "stages": {
+                stage.name: {"concurrency": stage.concurrency, "active": self._active[stage.name]}
+                for stage in self.stages
+            },
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+        }
+
+    async def start(self):
+        """Create indexes and start the worker tasks (none with 0 workers)."""
+        if self._tasks:
+            return
+        try:
+            await self.collection.create_index([("status", ASCENDING), ("available_at", ASCENDING)])
+            await self.collection.create_index("idempotency_key", unique=True, sparse=True)
+        except Exception as e:
+            # Unreachable database at startup: workers retry when they poll
+            logger.warning("Could not create ingest queue index", extra={"error": str(e)})
+        if self.workers <= 0:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._semaphores = {stage.name: asyncio.Semaphore(stage.concurrency) for stage in self.stages}
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info("Ingest workers started", extra={"workers": self.workers})
+
+    async def stop(self):
+        """Let in-flight jobs finish within the grace period, then cancel."""
+        if not self._tasks:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        _, pending = await asyncio.wait(self._tasks, timeout=INGEST_SHUTDOWN_GRACE_SECONDS)
+        for task in pending:
+            # Their jobs are picked up again when the lease expires
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks = []
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        now = datetime.now()
+        return await self.collection.find_one_and_update(
+            {"$or": [
+                {"status": "queued", "available_at": {"$lte": now}},
+                # Reclaimed after its worker died; that run counted as an attempt
+                {"status": "processing", "lease_expires_at": {"$lte": now}, "attempts": {"$lt": INGEST_MAX_ATTEMPTS}},
+            ]},
+            {
+                "$set": {
+                    "status": "processing",
+                    "updated_at": now,
+                    "lease_owner": uuid.uuid4().hex,
+                    "lease_expires_at": now + timedelta(seconds=INGEST_LEASE_SECONDS),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("available_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _fail_abandoned(self) -> int:
+        """Fail jobs whose lease expired on their last attempt, so they are not reclaimed forever"""
+        now = datetime.now()
+        result = await self.collection.update_many(
+            {"status": "processing", "lease_expires_at": {"$lte": now}, "attempts": {"$gte": INGEST_MAX_ATTEMPTS}},
+            {"$set": {"status": "failed", "error": "lease expired on the last attempt", "updated_at": now}},
+        )
+        self.failed += result.modified_count
+        return result.modified_count
+
+    async def _renew_lease(self, job: Dict[str, Any], stage_name: Optional[str] = None) -> bool:
+        """Extend the job's lease; False if this worker no longer owns it"""
+        update = {"lease_expires_at": datetime.now() + timedelta(seconds=INGEST_LEASE_SECONDS)}
+        if stage_name is not None:
+            update["stage"] = stage_name
+        result = await self.collection.update_one(
+            {"_id": job["_id"], "status": "processing", "lease_owner": job["lease_owner"]},
+            {"$set": update},
+        )
+        return result.matched_count == 1
+
+    async def _keep_lease(self, job: Dict[str, Any], lost: asyncio.Event):
+        while True:
+            await asyncio.sleep(INGEST_LEASE_SECONDS / 3)
+            try:
+                if not await self._renew_lease(job):
+                    lost.set()
+                    return
+            except Exception as e:
+                logger.warning("Ingest lease renewal failed", extra={"ingest_id": str(job["_id"]), "error": str(e)})
+
+    async def _worker(self, number: int):
+        while not self._stopping:
+            try:
+                job = await self._claim()
+                if job is None:
+                    await self._fail_abandoned()
+            except Exception as e:
+                logger.warning("Ingest queue poll failed", extra={"worker": number, "error": str(e)})
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), INGEST_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._process(job)
+            except Exception:
+                # Status update lost; the lease expiry hands the job out again
+                logger.exception("Ingest job status update failed", extra={"ingest_id": str(job["_id"])})
+
+    async def _process(self, job: Dict[str, Any]):
+        # One trace per job, with a child span per stage
+        with span("ingest.job", ingest_id=str(job["_id"]), attempt=job["attempts"]) as job_span:
+            lost = asyncio.Event()
+            keeper = asyncio.create_task(self._keep_lease(job, lost))
+            try:
+                await self._run_job(job, lost, job_span)
+            finally:
+                keeper.cancel()
+                await asyncio.gather(keeper, return_exceptions=True)
+
+    async def _run_job(self, job: Dict[str, Any], lost: asyncio.Event, job_span):
+        state = {
+            "ingest_id": str(job["_id"]),
+            "payload": job["payload"],
+            "idempotency_key": job.get("idempotency_key"),
+            "request_hash": job.get("request_hash"),
+        }
+        stage_name = None
+        try:
+            for stage in self.stages:
+                stage_name = stage.name
+                if lost.is_set() or not await self._renew_lease(job, stage_name):
+                    raise LeaseLost(state["ingest_id"])
+                await self._run_stage(stage, state)
+        except LeaseLost:
+            logger.warning("Ingest job lease lost; left to the worker that reclaimed it",
+                           extra={"ingest_id": state["ingest_id"], "stage": stage_name})
+            job_span.set_attribute("lease_lost", True)
+            return
+        except Exception as e:
+            job_span.record_exception(e)
+            await self._record_failure(job, stage_name, e)
+            return
+        result = await self.collection.update_one(
+            {"_id": job["_id"], "lease_owner": job["lease_owner"]},
+            {"$set": {
+                "status": "done",
+                "stage": None,
+                "result": state.get("result"),
+                "error": None,
+                "updated_at": datetime.now(),
+                "queue_seconds": (job["updated_at"] - job["created_at"]).total_seconds(),
+            }},
+        )
+        if result.matched_count:
+            self.completed += 1
+        else:
+            logger.warning("Ingest job finished after its lease was lost", extra={"ingest_id": state["ingest_id"]})
+
+    async def _run_stage(self, stage: Stage, state: Dict[str, Any]):
+        async with self._semaphores[stage.name]:
+            self._active[stage.name] += 1
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                with span(f"ingest.{stage.name}", ingest_id=state["ingest_id"]):
+                    result = stage.run(state)
+                    if inspect.isawaitable(result):
+                        await result
+                outcome = "ok"
+            finally:
+                self._active[stage.name] -= 1
+                observe_ingest_stage(stage.name, time.perf_counter() - started, outcome)
+
+    async def _record_failure(self, job: Dict[str, Any], stage_name: Optional[str], error: Exception):
+        detail = getattr(error, "detail", None) or str(error) or type(error).__name__
+        retry = is_retryable(error) and job["attempts"] < INGEST_MAX_ATTEMPTS
+        now = datetime.now()
+        update = {"stage": stage_name, "error": str(summarize(detail)), "updated_at": now}
+        if retry:
+            self.retried += 1
+            delay = INGEST_RETRY_BACKOFF_SECONDS * 2 ** (job["attempts"] - 1)
+            update.update(status="queued", available_at=now + timedelta(seconds=delay))
+        else:
+            self.failed += 1
+            update["status"] = "failed"
+        logger.warning("Ingest job failed", extra={
+            "ingest_id": str(job["_id"]),
+            "stage": stage_name,
+            "attempts": job["attempts"],
+            "retrying": retry,
+            **error_fields(error),
+        })
+        await self.collection.update_one({"_id": job["_id"], "lease_owner": job["lease_owner"]}, {"$set": update})
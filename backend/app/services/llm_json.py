@@ -0,0 +1,245 @@
+"""
+Robust JSON extraction from LLM output.
+
+Models wrap JSON in markdown fences, add prose before or after it, and get
+cut off at max_tokens. JSONScanner walks the text once (and can be fed
+incrementally while a completion streams), skipping everything outside the
+first JSON object or array, emitting each array element as soon as it
+closes, and repairing a truncated value at the last complete member.
+
+parse_object / parse_list validate the result against a per-task pydantic
+schema and record a parse success rate per task.
+"""
+import json
+import threading
+from typing import Any, Dict, List, Optional, Type, Union
+
+from pydantic import BaseModel, ConfigDict, ValidationError, field_validator
+
+CLOSERS = {"{": "}", "[": "]"}
+
+
+class JSONScanner:
+    """
+    Single-pass, incremental scanner for the JSON values in model output.
+    feed() returns the elements of a top-level array completed by that chunk;
+    complete top-level values are collected in `values`.
+    """
+    def __init__(self):
+        self.values: List[Any] = []
+        self.elements: List[Any] = []
+        self._reset()
+
+    def _reset(self):
+        self.stack: List[str] = []
+        self.in_string = False
+        self.escaped = False
+        self.buffer: List[str] = []
+        self.element_start: Optional[int] = None
+        # Last point where the value can be cut and closed: (buffer length, open brackets)
+        self.cut: Optional[tuple] = None
+
+    @property
+    def root(self) -> Optional[str]:
+        return self.stack[0] if self.stack else None
+
+    def feed(self, text: str) -> List[Any]:
+        completed = []
+        for ch in text:
+            if not self.stack:
+                # Outside any value: skip prose and fences until a value starts
+                if ch in CLOSERS:
+                    self.stack.append(ch)
+                    self.buffer = [ch]
+                continue
+
+            self.buffer.append(ch)
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch in CLOSERS:
+                if len(self.stack) == 1 and self.root == "[":
+                    self.element_start = len(self.buffer) - 1
+                self.stack.append(ch)
+            elif ch in "}]":
+                if CLOSERS[self.stack[-1]] != ch:
+                    # Mismatched bracket: not JSON after all, start over
+                    self._reset()
+                    continue
+                self.stack.pop()
+                if len(self.stack) == 1 and self.root == "[" and self.element_start is not None:
+                    element = self._loads("".join(self.buffer[self.element_start:]))
+                    if element is not None:
+                        self.elements.append(element)
+                        completed.append(element)
+                    self.element_start = None
+                    self.cut = (len(self.buffer), tuple(self.stack))
+                elif not self.stack:
+                    value = self._loads("".join(self.buffer))
+                    if value is not None:
+                        self.values.append(value)
+                    self.elements = []
+                    self._reset()
+            elif ch == ",":
+                self.cut = (len(self.buffer) - 1, tuple(self.stack))
+        return completed
+
+    @staticmethod
+    def _loads(text: str) -> Any:
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            return None
+
+    def finish(self) -> tuple:
+        """
+        The first complete value, or a repaired one if the output was cut off.
+        Returns (value, complete); value is None when nothing usable was found.
+        """
+        if self.values:
+            return self.values[0], True
+        if not self.stack:
+            return None, False
+        if self.root == "[":
+            # Keep the elements that did close
+            return list(self.elements), False
+        text = "".join(self.buffer)
+        repaired = text + ('"' if self.in_string else "") + "".join(CLOSERS[b] for b in reversed(self.stack))
+        value = self._loads(repaired)
+        if value is None and self.cut:
+            length, stack = self.cut
+            value = self._loads(text[:length] + "".join(CLOSERS[b] for b in reversed(stack)))
+        return value, False
+
+
+def extract_json(content: str) -> tuple:
+    """Scan `content` once; returns (value, complete) as JSONScanner.finish does."""
+    scanner = JSONScanner()
+    scanner.feed(content or "")
+    return scanner.finish()
+
+
+# Per-task schemas. Extra keys are kept; missing ones default to None.
+
+class ExtractedClaimSchema(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    claimant_name: Optional[str] = None
+    spouse_name: Optional[str] = None
+    father_mother_name: Optional[str] = None
+    address: Optional[str] = None
+    village: Optional[str] = None
+    gram_panchayat: Optional[str] = None
+    tehsil_taluka: Optional[str] = None
+    district: Optional[str] = None
+    state: Optional[str] = None
+    claim_type: Optional[str] = None
+    area: Optional[Union[float, str]] = None
+
+
+class BatchExtractedClaimSchema(ExtractedClaimSchema):
+    index: int
+
+
+class AnomalyReportSchema(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    anomalies: Optional[List[Any]] = None
+
+
+class InterventionSchema(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    title: Optional[str] = None
+    description: Optional[str] = None
+    action: Optional[str] = None
+    priority: Optional[str] = None
+    confidence_score: Optional[float] = None
+    reasoning: Optional[str] = None
+
+    @field_validator("confidence_score", mode="before")
+    @classmethod
+    def _score(cls, value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+
+class ParseStats:
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, task: str, outcome: str):
+        with self._lock:
+            counts = self._counts.setdefault(task, {"ok": 0, "partial": 0, "failed": 0})
+            counts[outcome] += 1
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            counts = {task: dict(c) for task, c in self._counts.items()}
+        for c in counts.values():
+            total = sum(c.values())
+            c["success_rate"] = round((c["ok"] + c["partial"]) / total, 3) if total else None
+        return counts
+
+
+parse_stats = ParseStats()
+
+
+def validate_item(item: Any, schema: Type[BaseModel]) -> Optional[Dict]:
+    """`item` validated against `schema` as a plain dict, or None if it does not fit."""
+    if not isinstance(item, dict):
+        return None
+    try:
+        return schema.model_validate(item).model_dump()
+    except ValidationError:
+        return None
+
+
+def parse_object(content: str, schema: Type[BaseModel], task: str) -> Optional[Dict]:
+    """Extract and validate a single JSON object; None if there is none."""
+    value, complete = extract_json(content)
+    if isinstance(value, list) and len(value) == 1:
+        value = value[0]
+    result = validate_item(value, schema)
+    parse_stats.record(task, "failed" if result is None else "ok" if complete else "partial")
+    return result
+
+
+def coerce_list(value: Any) -> Optional[List]:
+    """An array, an object wrapping one array (e.g. {"items": [...]}), or a lone object."""
+    if isinstance(value, list):
+        return value
+    if isinstance(value, dict):
+        lists = [v for v in value.values() if isinstance(v, list) and v and all(isinstance(i, dict) for i in v)]
+        if len(lists) == 1:
+            return lists[0]
+        return [value]
+    return None
+
+
+def parse_list(content: str, schema: Type[BaseModel], task: str) -> Optional[List[Dict]]:
+    """
+    Extract a JSON array and validate each element; invalid elements are
+    dropped. None if no array (or object) was found at all.
+    """
+    value, complete = extract_json(content)
+    items = coerce_list(value)
+    if items is None:
+        parse_stats.record(task, "failed")
+        return None
+    valid = [v for v in (validate_item(item, schema) for item in items) if v is not None]
+    if not valid and items:
+        outcome = "failed"
+    else:
+        outcome = "ok" if complete and len(valid) == len(items) else "partial"
+    parse_stats.record(task, outcome)
+    return valid
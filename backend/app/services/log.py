@@ -0,0 +1,209 @@
+"""
+Structured JSON logging.
+
+Records are put on an in-memory queue by the request path and formatted and
+written to stdout by a background listener thread, so logging never blocks
+the event loop on I/O. Each line carries the request id of the HTTP request
+that produced it (X-Request-ID, generated when missing) and, for sampled
+traces, the trace id.
+
+Payloads go through `summarize`, which redacts claimant PII and truncates
+long strings and collections. Errors whose message can quote claim text or
+model output are logged with `error_fields`: their class and message length
+only. DEBUG records are sampled (LOG_DEBUG_SAMPLE_RATE).
+
+Tracebacks are formatted before a record is queued and written as their own
+"exception" field, not appended to "message".
+
+Environment: LOG_LEVEL (INFO), LOG_DEBUG_SAMPLE_RATE (0.01), LOG_MAX_FIELD_CHARS (200)
+"""
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from app.services.tracing import current_trace_id
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.01"))
+MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "200"))
+MAX_ITEMS = 10
+
+# Fields holding personal details of claimants; never written to logs
+PII_FIELDS = {
+    "claimant_name", "spouse_name", "father_mother_name", "address",
+    "extracted_text", "holder_name", "name_of_claimant",
+}
+
+request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id", "trace_id"}
+
+
+def summarize(value: Any, depth: int = 0) -> Any:
+    """Log-safe copy of a payload: PII redacted, strings and collections truncated."""
+    if isinstance(value, dict):
+        items = list(value.items())
+        result = {
+            str(k): "[redacted]" if k in PII_FIELDS and v else summarize(v, depth + 1)
+            for k, v in items[:MAX_ITEMS]
+        }
+        if len(items) > MAX_ITEMS:
+            result["..."] = f"{len(items) - MAX_ITEMS} more keys"
+        return result
+    if isinstance(value, (list, tuple)):
+        result = [summarize(v, depth + 1) for v in value[:MAX_ITEMS]]
+        if len(value) > MAX_ITEMS:
+            result.append(f"... {len(value) - MAX_ITEMS} more items")
+        return result
+    if hasattr(value, "model_dump"):
+        return summarize(value.model_dump(), depth)
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    text = str(value)
+    if len(text) > MAX_FIELD_CHARS:
+        return text[:MAX_FIELD_CHARS] + f"... ({len(text)} chars)"
+    return text
+
+
+def error_fields(error: BaseException) -> Dict[str, Any]:
+    """Log fields for an error without its message, which may quote claim text or model output"""
+    detail = getattr(error, "detail", None) or str(error)
+    return {"error_type": type(error).__name__, "error_chars": len(str(detail))}
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if getattr(record, "trace_id", None):
+            entry["trace_id"] = record.trace_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # Formatted by StructuredQueueHandler before the record was queued
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """Attach the current request and trace ids and sample DEBUG records."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno == logging.DEBUG and random.random() >= DEBUG_SAMPLE_RATE:
+            return False
+        record.request_id = request_id.get()
+        record.trace_id = current_trace_id()
+        return True
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that keeps the traceback out of the message. The stock
+    prepare() formats the record on the calling thread, folding the
+    traceback into `msg`, and clears exc_info; here the traceback is kept
+    in exc_text for JSONFormatter.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Traceback objects do not cross the queue to the listener thread
+            record.exc_text = _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_traceback_formatter = logging.Formatter()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging():
+    """Route the root logger through a queue to a JSON stdout handler (idempotent)."""
+    global _listener
+    if _listener is not None:
+        return
+    log_queue: queue.Queue = queue.Queue(-1)
+    queue_handler = StructuredQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JSONFormatter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+    # httpx logs every outbound request at INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_after_fork():
+    # The listener thread does not survive fork (gunicorn --preload); start one in the child
+    global _listener
+    if _listener is not None:
+        _listener = None
+        configure_logging()
+
+
+os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware that binds X-Request-ID (or a new id) to the request's
+    context for log correlation and echoes it on the response.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")[:64]
+        rid = incoming or uuid.uuid4().hex
+        token = request_id.set(rid)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", rid.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id.reset(token)
@@ -0,0 +1,264 @@
+"""
+Prometheus metrics for the backend, served at /metrics.
+
+- HTTP latency histograms per route template and in-flight gauges
+  (PrometheusMiddleware, added in app/main.py)
+- MongoDB command timings and connection pool usage (pymongo listeners
+  passed to the Motor client in app/database.py)
+- Outbound LLM call latency and tokens by provider, model and task, and
+  time spent waiting for rate limit capacity by provider and priority
+- Queued ingestion stage latency
+- Cache hit ratios, circuit breaker state, rate limit queue depth and LLM
+  parse success, read from the services' own stats at scrape time
+
+Under gunicorn (PROMETHEUS_MULTIPROC_DIR set, see gunicorn.conf.py) the
+counters and histograms of all workers are aggregated; the scrape-time
+service stats are those of the worker that answers the scrape.
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from prometheus_client.core import REGISTRY, CounterMetricFamily, GaugeMetricFamily
+from pymongo import monitoring
+
+from app.services.llm_json import parse_stats
+from app.services.rate_limit import scheduler_stats, wait_observers
+from app.services.resilience import provider_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LLM_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+RATE_LIMIT_WAIT_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served", ["method"],
+    multiprocess_mode="livesum",
+)
+MONGO_COMMAND_DURATION = Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency",
+    ["command", "collection", "status"], buckets=LATENCY_BUCKETS,
+)
+MONGO_POOL_CONNECTIONS = Gauge(
+    "mongodb_pool_connections", "Open MongoDB pool connections", ["address"],
+    multiprocess_mode="livesum",
+)
+MONGO_POOL_IN_USE = Gauge(
+    "mongodb_pool_connections_in_use", "MongoDB pool connections checked out", ["address"],
+    multiprocess_mode="livesum",
+)
+MONGO_POOL_WAITING = Gauge(
+    "mongodb_pool_wait_queue", "Operations waiting to check out a MongoDB connection", ["address"],
+    multiprocess_mode="livesum",
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "mongodb_pool_checkout_failures", "Failed MongoDB connection checkouts", ["address", "reason"],
+)
+LLM_REQUEST_DURATION = Histogram(
+    "llm_request_duration_seconds", "Outbound LLM call latency including retries",
+    ["provider", "model", "task", "outcome"], buckets=LLM_BUCKETS,
+)
+INGEST_STAGE_DURATION = Histogram(
+    "ingest_stage_duration_seconds", "Queued ingestion stage latency",
+    ["stage", "outcome"], buckets=LATENCY_BUCKETS,
+)
+LLM_RATE_LIMIT_WAIT = Histogram(
+    "llm_rate_limit_wait_seconds", "Time LLM calls waited in the rate limit queue before being sent",
+    ["provider", "priority"], buckets=RATE_LIMIT_WAIT_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "LLM tokens used (reported by the provider, else estimated)",
+    ["provider", "model", "task"],
+)
+
+
+def observe_llm_call(provider: str, model: str, task: str, seconds: float, outcome: str, tokens: int = 0):
+    LLM_REQUEST_DURATION.labels(provider, model, task, outcome).observe(seconds)
+    if tokens:
+        LLM_TOKENS.labels(provider, model, task).inc(tokens)
+
+
+def observe_rate_limit_wait(provider: str, priority: str, seconds: float):
+    LLM_RATE_LIMIT_WAIT.labels(provider, priority).observe(seconds)
+
+
+wait_observers.append(observe_rate_limit_wait)
+
+
+def observe_ingest_stage(stage: str, seconds: float, outcome: str):
+    INGEST_STAGE_DURATION.labels(stage, outcome).observe(seconds)
+
+
+class PrometheusMiddleware:
+    """
+    ASGI middleware timing each request until its response body is fully
+    sent, so streaming endpoints are measured end to end. Routes are labelled
+    by their template (/dss/village-analysis/{village_name}), not the raw path.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                method, getattr(route, "path", "unmatched"), str(status["code"])
+            ).observe(time.perf_counter() - start)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every MongoDB command by command name and collection."""
+
+    def __init__(self):
+        self._collections: Dict[tuple, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(event) -> tuple:
+        return (event.connection_id, event.request_id)
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        with self._lock:
+            self._collections[self._key(event)] = collection if isinstance(collection, str) else ""
+
+    def _observe(self, event, status: str):
+        with self._lock:
+            collection = self._collections.pop(self._key(event), "")
+        MONGO_COMMAND_DURATION.labels(event.command_name, collection, status).observe(event.duration_micros / 1e6)
+
+    def succeeded(self, event):
+        self._observe(event, "ok")
+
+    def failed(self, event):
+        self._observe(event, "error")
+
+
+mongo_command_listener = MongoCommandMetrics()
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """Tracks open, checked-out and waited-for connections per server."""
+
+    @staticmethod
+    def _address(event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        address = self._address(event)
+        for gauge in (MONGO_POOL_CONNECTIONS, MONGO_POOL_IN_USE, MONGO_POOL_WAITING):
+            gauge.labels(address).set(0)
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS.labels(self._address(event)).inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS.labels(self._address(event)).dec()
+
+    def connection_check_out_started(self, event):
+        MONGO_POOL_WAITING.labels(self._address(event)).inc()
+
+    def connection_check_out_failed(self, event):
+        address = self._address(event)
+        MONGO_POOL_WAITING.labels(address).dec()
+        MONGO_POOL_CHECKOUT_FAILURES.labels(address, str(event.reason)).inc()
+
+    def connection_checked_out(self, event):
+        address = self._address(event)
+        MONGO_POOL_WAITING.labels(address).dec()
+        MONGO_POOL_IN_USE.labels(address).inc()
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_IN_USE.labels(self._address(event)).dec()
+
+
+mongo_pool_listener = MongoPoolMetrics()
+
+_cache_sources: Dict[str, Callable[[], Dict]] = {}
+
+
+def register_cache(name: str, stats: Callable[[], Dict]):
+    """Export a cache's stats() (hits, misses, entries) under cache=<name>."""
+    _cache_sources[name] = stats
+
+
+class ServiceStatsCollector:
+    """Reads service-level stats at scrape time instead of mirroring them in counters."""
+
+    def collect(self):
+        hits = CounterMetricFamily("cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "Cache misses", labels=["cache"])
+        ratio = GaugeMetricFamily("cache_hit_ratio", "Cache hit ratio since start", labels=["cache"])
+        entries = GaugeMetricFamily("cache_entries", "Entries currently cached", labels=["cache"])
+        for name, source in list(_cache_sources.items()):
+            stats = source()
+            hits.add_metric([name], stats["hits"])
+            misses.add_metric([name], stats["misses"])
+            ratio.add_metric([name], stats["hit_ratio"])
+            entries.add_metric([name], stats["entries"])
+        yield from (hits, misses, ratio, entries)
+
+        circuit = GaugeMetricFamily("llm_circuit_open", "1 when the provider circuit is not closed", labels=["provider"])
+        for provider, stats in provider_stats().items():
+            circuit.add_metric([provider], 0 if stats["circuit_state"] == "closed" else 1)
+        yield circuit
+
+        queue = GaugeMetricFamily("llm_rate_limit_queue_depth", "LLM calls waiting for rate limit capacity", labels=["provider"])
+        for provider, stats in scheduler_stats().items():
+            queue.add_metric([provider], stats["queue_depth"])
+        yield queue
+
+        parses = CounterMetricFamily("llm_parse", "LLM responses by parse outcome", labels=["task", "outcome"])
+        for task, counts in parse_stats.stats().items():
+            for outcome in ("ok", "partial", "failed"):
+                parses.add_metric([task, outcome], counts[outcome])
+        yield parses
+
+
+REGISTRY.register(ServiceStatsCollector())
+
+
+def render() -> bytes:
+    """Exposition text for /metrics, across all workers in multiprocess mode."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(ServiceStatsCollector())
+        return generate_latest(registry)
+    return generate_latest()
@@ -0,0 +1,304 @@
+"""
+Latency-aware routing across LLM providers and models.
+
+Each task (claim extraction, anomaly review, intervention planning) has an
+ordered list of candidate models. Calls go to the fastest healthy candidate
+based on rolling latency and error rate, fail over down the list when a
+provider is unavailable, and can be hedged: if the first candidate has not
+answered within its usual latency, a second one is started and whichever
+answers first wins.
+
+Candidate lists are read from LLM_ROUTES_<TASK>, a comma-separated list of
+"provider:model" entries, e.g.
+LLM_ROUTES_EXTRACTION="openrouter:google/gemini-2.0-flash-exp:free,aimlapi:gpt-4o-mini"
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar
+
+import httpx
+from dotenv import load_dotenv
+
+from app.services.metrics import observe_llm_call
+from app.services.rate_limit import usage_tokens
+from app.services.resilience import LatencyTracker, ProviderUnavailable, get_provider
+from app.services.tracing import span
+
+load_dotenv()
+
+T = TypeVar("T")
+
+# Base URLs can be pointed elsewhere (e.g. the mock servers in benchmarks/)
+# with OPENROUTER_BASE_URL / AIMLAPI_BASE_URL
+PROVIDERS = {
+    "openrouter": {"base_url": "https://openrouter.ai/api/v1", "api_key_env": "OPENROUTER_API_KEY",
+                   "base_url_env": "OPENROUTER_BASE_URL"},
+    "aimlapi": {"base_url": "https://api.aimlapi.com/v1", "api_key_env": "AIMLAPI_KEY",
+                "base_url_env": "AIMLAPI_BASE_URL"},
+}
+
+DEFAULT_ROUTES = {
+    "extraction": "openrouter:google/gemini-2.0-flash-exp:free,aimlapi:gpt-4o-mini",
+    "anomaly_review": "aimlapi:gpt-4o-mini,openrouter:google/gemini-2.0-flash-exp:free",
+    "interventions": "aimlapi:google/gemini-2.0-flash,openrouter:google/gemini-2.0-flash-exp:free",
+}
+
+# A candidate is unhealthy when more than this share of its recent calls failed
+MAX_ERROR_RATE = float(os.getenv("LLM_ROUTER_MAX_ERROR_RATE", "0.5"))
+MIN_HEALTH_SAMPLES = 5
+# An unhealthy candidate gets one probe call this long after its last failure
+PROBE_COOLDOWN_SECONDS = float(os.getenv("LLM_ROUTER_PROBE_SECONDS", "60"))
+
+# Hedge after the primary's p90 latency (this default until it has samples)
+HEDGE_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DELAY_SECONDS", "3"))
+HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "0.5"))
+
+
+class ModelCandidate:
+    def __init__(self, provider: str, model: str):
+        self.provider = provider
+        self.model = model
+        config = PROVIDERS.get(provider, {})
+        self.base_url = os.getenv(config.get("base_url_env", ""), config.get("base_url", ""))
+        self.api_key = os.getenv(config.get("api_key_env", ""), None)
+        self.latency = LatencyTracker(window=100)
+        self.outcomes = deque(maxlen=20)
+        self.hedge_wins = 0
+        self.last_failure_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def id(self) -> str:
+        return f"{self.provider}:{self.model}"
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    def error_rate(self) -> Optional[float]:
+        if not self.outcomes:
+            return None
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def healthy(self) -> bool:
+        if len(self.outcomes) < MIN_HEALTH_SAMPLES:
+            return True
+        return self.error_rate() <= MAX_ERROR_RATE
+
+    def probe_due(self) -> bool:
+        """
+        Half-open: an unhealthy candidate is let through for one call once
+        PROBE_COOLDOWN_SECONDS have passed since its last failure. Taking the
+        probe restarts the cooldown so concurrent callers do not all pile on.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.healthy() or now - self.last_failure_at < PROBE_COOLDOWN_SECONDS:
+                return False
+            self.last_failure_at = now
+            return True
+
+    def record(self, ok: bool, seconds: Optional[float] = None):
+        if ok and not self.healthy():
+            # A successful probe: start over instead of waiting for the failures to age out
+            self.outcomes.clear()
+        elif not ok:
+            self.last_failure_at = time.monotonic()
+        self.outcomes.append(ok)
+        if ok and seconds is not None:
+            self.latency.record(seconds)
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    def stats(self) -> Dict:
+        p50 = self.latency.percentile(50)
+        p90 = self.latency.percentile(90)
+        error_rate = self.error_rate()
+        return {
+            "id": self.id,
+            "configured": self.configured,
+            "healthy": self.healthy(),
+            "calls": len(self.outcomes),
+            "error_rate": round(error_rate, 3) if error_rate is not None else None,
+            "latency_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "latency_p90_ms": round(p90 * 1000, 1) if p90 is not None else None,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+def parse_routes(spec: str) -> List[ModelCandidate]:
+    """Parse "provider:model,provider:model"; model names may contain ':'."""
+    candidates = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if ":" not in entry:
+            continue
+        provider, model = entry.split(":", 1)
+        candidates.append(ModelCandidate(provider.strip(), model.strip()))
+    return candidates
+
+
+class ModelRouter:
+    def __init__(self):
+        self.routes: Dict[str, List[ModelCandidate]] = {}
+        self.hedged_calls = 0
+        self._lock = threading.Lock()
+
+    def candidates(self, task: str) -> List[ModelCandidate]:
+        with self._lock:
+            if task not in self.routes:
+                spec = os.getenv(f"LLM_ROUTES_{task.upper()}", DEFAULT_ROUTES.get(task, ""))
+                self.routes[task] = parse_routes(spec)
+            return self.routes[task]
+
+    def available(self, task: str) -> bool:
+        """Whether any candidate for `task` has an API key configured."""
+        return any(c.configured for c in self.candidates(task))
+
+    def route_key(self, task: str) -> str:
+        """Stable identifier of a task's candidate list, for cache keys."""
+        return ",".join(c.id for c in self.candidates(task))
+
+    def rank(self, task: str) -> List[ModelCandidate]:
+        """
+        Configured candidates ordered by preference: closed circuit, healthy,
+        then fastest median latency. Candidates without samples yet sort first
+        (in configured order) so each gets measured. An unhealthy candidate
+        whose probe is due goes first so that the call tests it. Candidates
+        without an API key are left out.
+        """
+        def key(item):
+            position, candidate = item
+            p50 = candidate.latency.percentile(50)
+            probe = candidate in probes
+            return (
+                get_provider(candidate.provider).breaker.state == "open",
+                not (probe or candidate.healthy()),
+                not probe,
+                p50 if p50 is not None else 0.0,
+                position,
+            )
+        configured = [(i, c) for i, c in enumerate(self.candidates(task)) if c.configured]
+        probes = [c for _, c in configured if c.probe_due()]
+        return [c for _, c in sorted(configured, key=key)]
+
+    def hedge_delay(self, candidate: ModelCandidate) -> float:
+        p90 = candidate.latency.percentile(90)
+        if p90 is None:
+            return HEDGE_DELAY_SECONDS
+        return max(HEDGE_MIN_DELAY_SECONDS, p90)
+
+    async def _attempt(self, candidate: ModelCandidate, request: Callable[[ModelCandidate, float], Awaitable[T]],
+                       tokens: int, task: str = "") -> T:
+        resilience = get_provider(candidate.provider)
+
+        async def send(timeout: float) -> T:
+            result = await request(candidate, timeout)
+            if isinstance(result, httpx.Response) and not result.is_success:
+                # Rejected (e.g. 401, 400): not a success for the breaker or the
+                # latency stats, and the next candidate gets the call
+                raise ProviderUnavailable(candidate.provider, f"HTTP {result.status_code}: {result.text[:200]}")
+            return result
+
+        with span("llm.call", provider=candidate.provider, model=candidate.model, task=task) as call_span:
+            start = time.monotonic()
+            try:
+                result = await resilience.call(send, tokens=tokens)
+            except ProviderUnavailable:
+                candidate.record(False)
+                observe_llm_call(candidate.provider, candidate.model, task, time.monotonic() - start, "unavailable")
+                raise
+            elapsed = time.monotonic() - start
+            candidate.record(True, elapsed)
+            used = tokens
+            if isinstance(result, httpx.Response):
+                actual = usage_tokens(result)
+                resilience.scheduler.record_usage(tokens, actual)
+                used = actual or tokens
+                call_span.set_attribute("http.status_code", result.status_code)
+            call_span.set_attribute("llm.tokens", used)
+            observe_llm_call(candidate.provider, candidate.model, task, elapsed, "ok", used)
+            return result
+
+    async def call(
+        self,
+        task: str,
+        request: Callable[[ModelCandidate, float], Awaitable[T]],
+        tokens: int = 0,
+        hedge: bool = False,
+    ) -> T:
+        """
+        Run `request(candidate, timeout)` against the best candidate for `task`,
+        failing over to the next one on ProviderUnavailable. With `hedge`, a
+        backup request starts if the current one runs past its usual latency.
+        """
+        ranked = self.rank(task)
+        if not ranked:
+            raise ProviderUnavailable(task, "no models configured")
+        if hedge:
+            return await self._hedged(ranked, request, tokens, task)
+
+        error = None
+        for candidate in ranked:
+            try:
+                return await self._attempt(candidate, request, tokens, task)
+            except ProviderUnavailable as e:
+                error = e
+        raise error
+
+    async def _hedged(self, ranked: List[ModelCandidate], request, tokens: int, task: str):
+        remaining = list(ranked)
+        in_flight: Dict[asyncio.Task, ModelCandidate] = {}
+        error = None
+
+        def launch():
+            candidate = remaining.pop(0)
+            attempt = asyncio.ensure_future(self._attempt(candidate, request, tokens, task))
+            in_flight[attempt] = candidate
+            return candidate
+
+        try:
+            delay = self.hedge_delay(launch())
+            while in_flight:
+                done, _ = await asyncio.wait(
+                    in_flight, timeout=delay if remaining else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Primary is slower than usual: start a backup alongside it
+                    self.hedged_calls += 1
+                    delay = self.hedge_delay(launch())
+                    continue
+                for attempt in done:
+                    candidate = in_flight.pop(attempt)
+                    try:
+                        result = attempt.result()
+                    except ProviderUnavailable as e:
+                        error = e
+                        continue
+                    if candidate is not ranked[0]:
+                        candidate.hedge_wins += 1
+                    return result
+                if not in_flight and remaining:
+                    delay = self.hedge_delay(launch())
+            raise error
+        finally:
+            for attempt in in_flight:
+                attempt.cancel()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            routes = dict(self.routes)
+        return {
+            "hedged_calls": self.hedged_calls,
+            "routes": {task: [c.stats() for c in candidates] for task, candidates in routes.items()},
+        }
+
+
+model_router = ModelRouter()
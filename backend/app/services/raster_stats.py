@@ -0,0 +1,262 @@
+"""
+Zonal statistics over local GeoTIFF rasters for village-level DSS inputs.
+
+Per-village means are computed from a land cover raster (forest cover share)
+and an NDWI raster (water index) using windowed reads, so only the pixels
+under a village - or under a whole district in batch mode - are read.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import rasterio
+from rasterio.features import bounds as geometry_bounds
+from rasterio.features import rasterize
+from rasterio.errors import WindowError
+from rasterio.warp import transform_geom
+from rasterio.windows import Window, from_bounds
+
+RASTER_DATA_DIR = os.getenv("RASTER_DATA_DIR", "data/rasters")
+LAND_COVER_RASTER = os.getenv("LAND_COVER_RASTER", "land_cover.tif")
+NDWI_RASTER = os.getenv("NDWI_RASTER", "ndwi.tif")
+VILLAGE_BOUNDARIES_PATH = os.getenv("VILLAGE_BOUNDARIES_PATH", "data/village_boundaries.geojson")
+
+# Land cover classes counted as forest (ESA WorldCover: 10 = tree cover, 95 = mangroves)
+FOREST_COVER_CLASSES = [
+    int(c) for c in os.getenv("FOREST_COVER_CLASSES", "10,95").split(",") if c.strip()
+]
+
+# GDAL reads uncompressed GeoTIFF strips through a memory mapping when this is set
+RASTER_ENV_OPTIONS = {"GTIFF_VIRTUAL_MEM_IO": "IF_ENOUGH_RAM"}
+
+# Villages whose stats are kept for the current raster version, least recently used dropped first
+RASTER_STATS_CACHE_SIZE = int(os.getenv("RASTER_STATS_CACHE_SIZE", "20000"))
+
+
+class AmbiguousVillage(Exception):
+    """A village name exists in several districts and no district was given."""
+
+    def __init__(self, village: str, districts: List[str]):
+        super().__init__(f"Village '{village}' exists in several districts ({', '.join(districts)}); give the district")
+        self.village = village
+        self.districts = districts
+
+
+def _key(value: Optional[str]) -> str:
+    return (value or "").strip().lower()
+
+
+def raster_version(path: str) -> Optional[str]:
+    """Version string for a raster file; changes whenever the file is replaced."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def zonal_means(path: str, geometries: List[dict], values: str = "mean",
+                classes: Optional[List[int]] = None) -> List[Optional[float]]:
+    """
+    Compute one statistic per geometry from a single windowed read.
+
+    The read window is the union of all geometry bounds, so a district is
+    covered in one pass. Each geometry is burnt into a label raster and the
+    per-label statistic is taken with np.bincount.
+    - values="mean": mean pixel value
+    - values="class_share": share of pixels whose value is in `classes`
+    Geometries are GeoJSON-like dicts in EPSG:4326.
+    """
+    if not geometries:
+        return []
+
+    with rasterio.Env(**RASTER_ENV_OPTIONS), rasterio.open(path) as src:
+        if src.crs and src.crs.to_string() != "EPSG:4326":
+            geometries = [transform_geom("EPSG:4326", src.crs, g) for g in geometries]
+
+        boxes = np.array([geometry_bounds(g) for g in geometries])
+        left, bottom = boxes[:, 0].min(), boxes[:, 1].min()
+        right, top = boxes[:, 2].max(), boxes[:, 3].max()
+
+        window = from_bounds(left, bottom, right, top, transform=src.transform)
+        window = window.round_offsets().round_lengths()
+        try:
+            window = window.intersection(Window(0, 0, src.width, src.height))
+        except WindowError:
+            # None of the geometries overlap the raster
+            return [None] * len(geometries)
+
+        data = src.read(1, window=window, masked=True)
+        labels = rasterize(
+            [(g, i + 1) for i, g in enumerate(geometries)],
+            out_shape=data.shape,
+            transform=src.window_transform(window),
+            fill=0,
+            all_touched=True,
+            dtype="int32",
+        )
+
+    valid = (labels > 0) & ~np.ma.getmaskarray(data)
+    zone = labels[valid]
+    pixels = np.ma.getdata(data)[valid]
+
+    if values == "class_share":
+        weights = np.isin(pixels, classes or []).astype("float64")
+    else:
+        weights = pixels.astype("float64")
+
+    count = np.bincount(zone, minlength=len(geometries) + 1)
+    total = np.bincount(zone, weights=weights, minlength=len(geometries) + 1)
+
+    results = []
+    for i in range(1, len(geometries) + 1):
+        results.append(float(total[i] / count[i]) if count[i] else None)
+    return results
+
+
+class RasterStatsService:
+    def __init__(self, max_entries: int = RASTER_STATS_CACHE_SIZE):
+        self.land_cover_path = os.path.join(RASTER_DATA_DIR, LAND_COVER_RASTER)
+        self.ndwi_path = os.path.join(RASTER_DATA_DIR, NDWI_RASTER)
+        self.boundaries_path = VILLAGE_BOUNDARIES_PATH
+        self._boundaries = None
+        self.max_entries = max_entries
+        # Stats of the raster version in _cache_versions; replacing a raster clears them
+        self._cache: "OrderedDict[Tuple[str, str], Dict]" = OrderedDict()
+        self._cache_versions: Optional[Tuple[str, str]] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _load_boundaries(self) -> Dict[Tuple[str, str], dict]:
+        """Load village polygons keyed by (district, village), lower-cased."""
+        if self._boundaries is None:
+            boundaries = {}
+            if os.path.exists(self.boundaries_path):
+                with open(self.boundaries_path, encoding="utf-8") as f:
+                    collection = json.load(f)
+                for feature in collection.get("features", []):
+                    props = feature.get("properties") or {}
+                    key = (_key(props.get("district")), _key(props.get("village")))
+                    if key[1] and feature.get("geometry"):
+                        boundaries[key] = feature["geometry"]
+            self._boundaries = boundaries
+        return self._boundaries
+
+    def _versions(self) -> Optional[Tuple[str, str]]:
+        land_cover = raster_version(self.land_cover_path)
+        ndwi = raster_version(self.ndwi_path)
+        if not land_cover or not ndwi:
+            return None
+        return land_cover, ndwi
+
+    def _find_villages(self, district: Optional[str] = None,
+                       villages: Optional[List[str]] = None) -> List[Tuple[Tuple[str, str], dict]]:
+        wanted = {_key(v) for v in villages} if villages else None
+        matches = []
+        for key, geometry in self._load_boundaries().items():
+            if district and key[0] != _key(district):
+                continue
+            if wanted is not None and key[1] not in wanted:
+                continue
+            matches.append((key, geometry))
+        return matches
+
+    def _compute(self, villages: List[Tuple[Tuple[str, str], dict]], versions: Tuple[str, str]) -> Dict[Tuple[str, str], Dict]:
+        """Compute and cache stats for villages that are not cached for this raster version."""
+        results = {}
+        missing = []
+        with self._lock:
+            if versions != self._cache_versions:
+                self._cache.clear()
+                self._cache_versions = versions
+            for key, geometry in villages:
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    results[key] = cached
+                else:
+                    missing.append((key, geometry))
+            self.hits += len(results)
+            self.misses += len(missing)
+
+        if missing:
+            geometries = [g for _, g in missing]
+            forest = zonal_means(self.land_cover_path, geometries, "class_share", FOREST_COVER_CLASSES)
+            ndwi = zonal_means(self.ndwi_path, geometries, "mean")
+
+            with self._lock:
+                for (key, _), forest_cover, ndwi_mean in zip(missing, forest, ndwi):
+                    stats = {
+                        "forest_cover": round(forest_cover, 4) if forest_cover is not None else None,
+                        # NDWI is in [-1, 1]; the DSS water index is on a 0-1 scale
+                        "water_index": round(min(max((ndwi_mean + 1) / 2, 0.0), 1.0), 4) if ndwi_mean is not None else None,
+                        "ndwi_mean": round(ndwi_mean, 4) if ndwi_mean is not None else None,
+                        "raster_version": "/".join(versions),
+                    }
+                    results[key] = stats
+                    # Not kept if a raster was replaced while these were computed
+                    if versions == self._cache_versions:
+                        self._cache[key] = stats
+                        self._cache.move_to_end(key)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+
+        return results
+
+    def get_village_stats(self, village: str, district: Optional[str] = None) -> Optional[Dict]:
+        """
+        Forest cover and water index for one village, or None when the rasters
+        or the village boundary are not available. Raises AmbiguousVillage
+        when no district is given and the name exists in several districts.
+        """
+        versions = self._versions()
+        if not versions:
+            return None
+
+        villages = self._find_villages(district=district, villages=[village])
+        if not villages:
+            return None
+
+        if len(villages) > 1:
+            raise AmbiguousVillage(village, sorted(key[0] for key, _ in villages))
+        key, geometry = villages[0]
+        return self._compute([(key, geometry)], versions).get(key)
+
+    def get_district_stats(self, district: str, villages: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """
+        Batch mode: stats for every village of a district from one windowed
+        read per raster. Returns {village_name (lower-cased): stats}.
+        """
+        versions = self._versions()
+        if not versions:
+            return {}
+
+        matches = self._find_villages(district=district, villages=villages)
+        results = self._compute(matches, versions)
+        return {key[1]: stats for key, stats in results.items()}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._cache),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+    def invalidate(self):
+        """Drop cached stats and reload boundaries (e.g. after replacing data files)."""
+        with self._lock:
+            self._cache.clear()
+            self._cache_versions = None
+            self._boundaries = None
+
+
+# Initialize the service
+raster_stats_service = RasterStatsService()
@@ -0,0 +1,233 @@
+"""
+Client-side rate limiting for LLM providers.
+
+Each provider has two token buckets, one for requests per minute and one
+for tokens per minute. Outbound calls wait in a priority queue until both
+buckets can cover them, so bursts are paced instead of answered with 429s.
+Interactive (single-claim) calls are served before background batch work.
+"""
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+# Priority for LLM calls made in the current task; batch jobs lower it
+llm_priority: contextvars.ContextVar[int] = contextvars.ContextVar("llm_priority", default=PRIORITY_INTERACTIVE)
+
+# Per-provider limits: <PROVIDER>_RPM and <PROVIDER>_TPM environment variables
+DEFAULT_LIMITS = {
+    "openrouter": {"rpm": 20, "tpm": 100000},
+    "aimlapi": {"rpm": 60, "tpm": 200000},
+}
+
+# Called with (provider, priority name, seconds waited) for each granted call; metrics.py adds one
+wait_observers: List[Callable[[str, str, float], None]] = []
+
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "60"))
+
+# Under gunicorn each worker paces its own calls, so it gets an equal share of the limits
+WORKER_COUNT = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+
+
+class RateLimitQueueTimeout(Exception):
+    """A call waited longer than the queue timeout for rate limit capacity."""
+
+
+@contextmanager
+def batch_priority():
+    """Mark LLM calls made inside this block as background batch work."""
+    token = llm_priority.set(PRIORITY_BATCH)
+    try:
+        yield
+    finally:
+        llm_priority.reset(token)
+
+
+def priority_name(priority: int) -> str:
+    return {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BATCH: "batch"}.get(priority, str(priority))
+
+
+def estimate_tokens(payload: Dict) -> int:
+    """Rough prompt + completion token estimate (about 4 characters per token)."""
+    prompt_chars = sum(len(str(m.get("content", ""))) for m in payload.get("messages", []))
+    return prompt_chars // 4 + int(payload.get("max_tokens", 0))
+
+
+def usage_tokens(response: httpx.Response) -> Optional[int]:
+    """Total tokens reported by an OpenAI-compatible response, if any."""
+    try:
+        return int(response.json()["usage"]["total_tokens"])
+    except Exception:
+        return None
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` is available (0 if available now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount: float):
+        """Return (positive) or charge (negative) tokens after the fact; may go into debt."""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+
+class ProviderScheduler:
+    def __init__(self, provider: str, rpm: float, tpm: float):
+        self.provider = provider
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._queue = []
+        self._sequence = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._paused_until = 0.0
+        self.wait_samples = deque(maxlen=500)
+        self.granted = 0
+        self.timed_out = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for entry in self._queue if not entry[3].done())
+
+    async def acquire(self, tokens: int, priority: Optional[int] = None):
+        """Wait until the provider's request and token budgets allow this call."""
+        if priority is None:
+            priority = llm_priority.get()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(self._queue, (priority, next(self._sequence), tokens, future))
+        self._ensure_dispatcher()
+
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=QUEUE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            future.cancel()
+            self.timed_out += 1
+            raise RateLimitQueueTimeout(f"{self.provider}: waited {QUEUE_TIMEOUT_SECONDS}s for rate limit capacity")
+        finally:
+            if not future.done():
+                future.cancel()
+        waited = time.monotonic() - start
+        self.wait_samples.append(waited)
+        for observer in wait_observers:
+            observer(self.provider, priority_name(priority), waited)
+
+    def record_usage(self, estimated: int, actual: Optional[int]):
+        """Correct the token bucket once the provider reports real usage."""
+        if actual is not None:
+            self.tokens.adjust(estimated - actual)
+
+    def pause(self, seconds: float):
+        """Stop dispatching for a while, e.g. after a 429 with Retry-After."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        if self._wakeup:
+            self._wakeup.set()
+
+    def _ensure_dispatcher(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Bound to the running event loop (one per worker process)
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._dispatcher = None
+            self._queue = [entry for entry in self._queue if entry[3].get_loop() is loop]
+            heapq.heapify(self._queue)
+        self._wakeup.set()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = loop.create_task(self._dispatch())
+
+    async def _dispatch(self):
+        while self._queue:
+            priority, _, tokens, future = self._queue[0]
+            if future.done():
+                heapq.heappop(self._queue)
+                continue
+
+            wait = max(
+                self._paused_until - time.monotonic(),
+                self.requests.wait_time(1),
+                self.tokens.wait_time(tokens),
+            )
+            if wait > 0:
+                # Wake early if a higher-priority call arrives or limits change
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._queue)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.granted += 1
+            future.set_result(None)
+
+    def stats(self) -> Dict:
+        waits = np.fromiter(self.wait_samples, dtype=float) if self.wait_samples else None
+        return {
+            "provider": self.provider,
+            "queue_depth": self.queue_depth,
+            "granted": self.granted,
+            "queue_timeouts": self.timed_out,
+            "wait_avg_ms": round(float(waits.mean()) * 1000, 1) if waits is not None else None,
+            "wait_p95_ms": round(float(np.percentile(waits, 95)) * 1000, 1) if waits is not None else None,
+            "requests_available": round(self.requests.level, 2),
+            "tokens_available": round(self.tokens.level),
+        }
+
+
+_schedulers: Dict[str, ProviderScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(provider: str) -> ProviderScheduler:
+    with _schedulers_lock:
+        if provider not in _schedulers:
+            defaults = DEFAULT_LIMITS.get(provider, {"rpm": 60, "tpm": 100000})
+            _schedulers[provider] = ProviderScheduler(
+                provider,
+                rpm=float(os.getenv(f"{provider.upper()}_RPM", defaults["rpm"])) / WORKER_COUNT,
+                tpm=float(os.getenv(f"{provider.upper()}_TPM", defaults["tpm"])) / WORKER_COUNT,
+            )
+        return _schedulers[provider]
+
+
+def scheduler_stats() -> Dict[str, Dict]:
+    with _schedulers_lock:
+        schedulers = list(_schedulers.values())
+    return {s.provider: s.stats() for s in schedulers}
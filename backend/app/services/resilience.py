@@ -0,0 +1,262 @@
+"""
+Shared resilience layer for outbound AI/ML provider calls.
+
+Each provider (OpenRouter, AIMLAPI) gets:
+- a circuit breaker that opens after consecutive failures, so callers fall
+  back to local paths immediately instead of waiting for timeouts
+- an adaptive timeout derived from recent latency percentiles
+- retries with full-jitter exponential backoff, limited by a retry budget so
+  retries cannot multiply load during an outage
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+import httpx
+import numpy as np
+
+from app.services.rate_limit import RateLimitQueueTimeout, get_scheduler
+
+T = TypeVar("T")
+
+# Status codes worth retrying: rate limited or a transient upstream failure
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class ProviderUnavailable(Exception):
+    """The provider's circuit is open or the call failed after all retries."""
+
+    def __init__(self, provider: str, detail: str):
+        super().__init__(f"{provider} unavailable: {detail}")
+        self.provider = provider
+        self.detail = detail
+
+
+class RetryableProviderError(Exception):
+    """Transient provider error (timeout, 429, 5xx) that counts against the breaker."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def raise_for_retryable(response: httpx.Response):
+    """Turn rate-limit and 5xx responses into RetryableProviderError."""
+    if response.status_code in RETRYABLE_STATUS_CODES:
+        try:
+            retry_after = float(response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            retry_after = None
+        raise RetryableProviderError(response.status_code, response.text[:500], retry_after)
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies."""
+
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self.samples:
+                return None
+            return float(np.percentile(np.fromiter(self.samples, dtype=float), q))
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go out now. In half-open state one trial call is let through."""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def release(self):
+        """Give back a half-open trial slot after a call that neither succeeded nor failed transiently."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class RetryBudget:
+    """
+    Token bucket for retries: every successful call earns `ratio` tokens (up
+    to `max_tokens`) and every retry spends one, so retries stay a bounded
+    fraction of traffic.
+    """
+
+    def __init__(self, ratio: float = 0.2, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class ProviderResilience:
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+            reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30")),
+        )
+        self.latency = LatencyTracker()
+        self.scheduler = get_scheduler(provider)
+        self.retry_budget = RetryBudget(ratio=float(os.getenv("LLM_RETRY_BUDGET_RATIO", "0.2")))
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES", "2"))
+        self.min_timeout = float(os.getenv("LLM_TIMEOUT_MIN_SECONDS", "5"))
+        self.max_timeout = float(os.getenv("LLM_TIMEOUT_MAX_SECONDS", "30"))
+        self.backoff_base = 0.5
+        self.backoff_cap = 4.0
+
+    def timeout(self) -> float:
+        """Twice the recent p95 latency, clamped; the maximum until enough samples exist."""
+        if len(self.latency.samples) < 20:
+            return self.max_timeout
+        p95 = self.latency.percentile(95)
+        return min(self.max_timeout, max(self.min_timeout, p95 * 2))
+
+    def check(self):
+        """Raise ProviderUnavailable right away when the circuit is open."""
+        if not self.breaker.allow():
+            raise ProviderUnavailable(self.provider, "circuit open")
+
+    def record_success(self, seconds: float):
+        self.breaker.record_success()
+        self.latency.record(seconds)
+        self.retry_budget.deposit()
+
+    def record_failure(self):
+        self.breaker.record_failure()
+
+    async def acquire(self, tokens: int):
+        """
+        Wait for rate limit capacity; raises ProviderUnavailable if the queue wait is too long.
+        Call after check(): a half-open trial slot is given back if the wait
+        ends in an error or the caller is cancelled while queued.
+        """
+        try:
+            await self.scheduler.acquire(tokens)
+        except RateLimitQueueTimeout as e:
+            self.breaker.release()
+            raise ProviderUnavailable(self.provider, str(e))
+        except BaseException:
+            self.breaker.release()
+            raise
+
+    async def call(self, request: Callable[[float], Awaitable[T]], tokens: int = 0) -> T:
+        """
+        Run `request(timeout)` with breaker, rate limiting, adaptive timeout
+        and budgeted retries. `tokens` is the estimated token cost of one attempt.
+        `request` should raise RetryableProviderError for transient HTTP failures;
+        any other exception is passed through without a retry.
+        """
+        attempt = 0
+        while True:
+            self.check()
+            # Queue time for rate limits does not count against the request timeout
+            await self.acquire(tokens)
+            timeout = self.timeout()
+            start = time.monotonic()
+            try:
+                result = await asyncio.wait_for(request(timeout), timeout=timeout)
+            except (asyncio.TimeoutError, httpx.TimeoutException, httpx.TransportError, RetryableProviderError) as e:
+                self.record_failure()
+                if isinstance(e, RetryableProviderError) and e.status_code == 429:
+                    self.scheduler.pause(e.retry_after or self.backoff_cap)
+                detail = str(e) or type(e).__name__
+                if attempt >= self.max_retries or not self.retry_budget.withdraw():
+                    raise ProviderUnavailable(self.provider, detail)
+                attempt += 1
+                # Full jitter keeps retries from many workers from synchronising
+                await asyncio.sleep(random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt)))
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            self.record_success(time.monotonic() - start)
+            return result
+
+    def stats(self) -> Dict:
+        p50 = self.latency.percentile(50)
+        p95 = self.latency.percentile(95)
+        return {
+            "provider": self.provider,
+            "circuit_state": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "latency_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "timeout_seconds": round(self.timeout(), 2),
+            "retry_budget": round(self.retry_budget.tokens, 2),
+        }
+
+
+_providers: Dict[str, ProviderResilience] = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(provider: str) -> ProviderResilience:
+    """Shared resilience state for a provider name, e.g. "openrouter" or "aimlapi"."""
+    with _providers_lock:
+        if provider not in _providers:
+            _providers[provider] = ProviderResilience(provider)
+        return _providers[provider]
+
+
+def provider_stats() -> Dict[str, Dict]:
+    with _providers_lock:
+        providers = list(_providers.values())
+    return {p.provider: p.stats() for p in providers}
@@ -0,0 +1,229 @@
+"""
+State shared between worker processes.
+
+With several gunicorn workers each process has its own memory, so caches
+would be duplicated and invalidations would only reach one worker. Setting
+SHARED_STATE_URL=sqlite:////var/run/fra-dss/shared.db gives every worker on
+the host the same cache entries and locks through one SQLite file (WAL mode).
+It is a local stand-in for a network store such as Redis. Unset, caches and
+locks are per process.
+
+Backend calls may wait on other workers' write transactions, so callers
+on the event loop run them in a thread (SharedTTLCache and lock() do).
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+SHARED_STATE_URL = os.getenv("SHARED_STATE_URL", "")
+LOCK_TIMEOUT_SECONDS = float(os.getenv("SHARED_LOCK_TIMEOUT_SECONDS", "30"))
+# A held lock is renewed every third of this; it expires this long after its holder died
+LOCK_TTL_SECONDS = float(os.getenv("SHARED_LOCK_TTL_SECONDS", "30"))
+LOCK_POLL_SECONDS = 0.05
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS cache_entries_expiry ON cache_entries (namespace, expires_at);
+CREATE TABLE IF NOT EXISTS cache_tags (
+    namespace TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (namespace, tag, key)
+);
+CREATE INDEX IF NOT EXISTS cache_tags_key ON cache_tags (namespace, key);
+CREATE TABLE IF NOT EXISTS locks (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class SQLiteBackend:
+    """Cache entries with tags, and expiring locks, in one SQLite database."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # One connection per thread, and a new one after fork
+        if getattr(self._local, "pid", None) != os.getpid():
+            self._local.conn = self._connect()
+            self._local.pid = os.getpid()
+        return self._local.conn
+
+    def cache_get(self, namespace: str, key: str) -> Optional[Any]:
+        row = self.conn.execute(
+            "SELECT value FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, key, time.time()),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def cache_set(self, namespace: str, key: str, value: Any, ttl_seconds: float,
+                  tags: Iterable[str], max_entries: int):
+        conn = self.conn
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM cache_tags WHERE namespace = ? AND key = ?", (namespace, key))
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, expires_at, value) VALUES (?, ?, ?, ?)",
+                (namespace, key, now + ttl_seconds, json.dumps(value, default=str)),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO cache_tags (namespace, tag, key) VALUES (?, ?, ?)",
+                [(namespace, tag, key) for tag in tags],
+            )
+            # Drop expired entries, then the ones closest to expiry beyond the size limit
+            conn.execute(
+                """DELETE FROM cache_entries WHERE namespace = ? AND (expires_at <= ? OR key IN (
+                       SELECT key FROM cache_entries WHERE namespace = ?
+                       ORDER BY expires_at DESC LIMIT -1 OFFSET ?))""",
+                (namespace, now, namespace, max_entries),
+            )
+            conn.execute(
+                """DELETE FROM cache_tags WHERE namespace = ? AND key NOT IN (
+                       SELECT key FROM cache_entries WHERE namespace = ?)""",
+                (namespace, namespace),
+            )
+
+    def invalidate_tag(self, namespace: str, tag: str) -> int:
+        conn = self.conn
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            removed = conn.execute(
+                """DELETE FROM cache_entries WHERE namespace = ? AND key IN (
+                       SELECT key FROM cache_tags WHERE namespace = ? AND tag = ?)""",
+                (namespace, namespace, tag),
+            ).rowcount
+            conn.execute("DELETE FROM cache_tags WHERE namespace = ? AND tag = ?", (namespace, tag))
+        return removed
+
+    def cache_clear(self, namespace: str):
+        conn = self.conn
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+            conn.execute("DELETE FROM cache_tags WHERE namespace = ?", (namespace,))
+
+    def cache_count(self, namespace: str) -> int:
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM cache_entries WHERE namespace = ? AND expires_at > ?",
+            (namespace, time.time()),
+        ).fetchone()[0]
+
+    def try_lock(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        conn = self.conn
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM locks WHERE name = ? AND expires_at <= ?", (name, now))
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO locks (name, owner, expires_at) VALUES (?, ?, ?)",
+                (name, owner, now + ttl_seconds),
+            ).rowcount
+        return inserted == 1
+
+    def renew_lock(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        """Extend a held lock; False if it expired and was taken by someone else."""
+        with self.conn as conn:
+            return conn.execute(
+                "UPDATE locks SET expires_at = ? WHERE name = ? AND owner = ?",
+                (time.time() + ttl_seconds, name, owner),
+            ).rowcount == 1
+
+    def unlock(self, name: str, owner: str):
+        with self.conn as conn:
+            conn.execute("DELETE FROM locks WHERE name = ? AND owner = ?", (name, owner))
+
+
+def _backend_from_url(url: str) -> Optional[SQLiteBackend]:
+    if not url:
+        return None
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported SHARED_STATE_URL {url!r}; expected sqlite:///<path>")
+
+
+backend = _backend_from_url(SHARED_STATE_URL)
+
+# Entries disappear once no task holds or waits for the lock
+_local_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+async def _renew(name: str, owner: str, ttl: float):
+    while True:
+        await asyncio.sleep(ttl / 3)
+        if not await asyncio.to_thread(backend.renew_lock, name, owner, ttl):
+            logger.warning("Shared lock lost while held", extra={"lock": name})
+            return
+
+
+@asynccontextmanager
+async def lock(name: str, timeout: float = LOCK_TIMEOUT_SECONDS, ttl: float = LOCK_TTL_SECONDS):
+    """
+    Hold `name` across all workers (or within this process when no backend is
+    configured). Yields whether the lock was acquired: after waiting
+    `timeout` the caller proceeds without it rather than failing. A held
+    lock is renewed for as long as the caller holds it, and expires `ttl`
+    after a crashed holder's last renewal.
+    """
+    if backend is None:
+        local = _local_locks.get(name)
+        if local is None:
+            local = _local_locks[name] = asyncio.Lock()
+        try:
+            await asyncio.wait_for(local.acquire(), timeout)
+            acquired = True
+        except asyncio.TimeoutError:
+            acquired = False
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                local.release()
+        return
+
+    owner = uuid.uuid4().hex
+    deadline = time.monotonic() + timeout
+    acquired = await asyncio.to_thread(backend.try_lock, name, owner, ttl)
+    while not acquired and time.monotonic() < deadline:
+        await asyncio.sleep(LOCK_POLL_SECONDS)
+        acquired = await asyncio.to_thread(backend.try_lock, name, owner, ttl)
+    renewal = asyncio.create_task(_renew(name, owner, ttl)) if acquired else None
+    try:
+        yield acquired
+    finally:
+        if renewal is not None:
+            renewal.cancel()
+            await asyncio.gather(renewal, return_exceptions=True)
+            await asyncio.to_thread(backend.unlock, name, owner)
@@ -0,0 +1,399 @@
+"""
+Columnar claim snapshots for analytics.
+
+ClaimSnapshots.run() copies the claims collection into a Parquet dataset
+under CLAIMS_SNAPSHOT_DIR, hive-partitioned by state and district
+(state=.../district=.../part-<run>-<n>.parquet) with typed Arrow columns:
+low-cardinality strings are dictionary encoded, area is float64 and
+submission_date a timestamp.
+
+Runs are incremental: only claims after the last snapshotted _id are
+appended. ObjectIds are generated by the writing process, so a claim can be
+inserted after one with a later _id; every run re-reads an overlap window
+before the watermark and skips the ids it already wrote. Claims changed
+after they were snapshotted (status, is_anomaly) are picked up by a full
+rebuild, which writes a new set of files next to the current ones.
+
+_manifest.json records the watermark and lists the files of the snapshot.
+It is replaced atomically once the files of a run are written, so it is the
+only pointer readers follow: files of a run that died before its manifest
+update, and files a rebuild replaced, are never read and are removed by the
+next run. Runs hold a shared_state lock, or a lock file next to the
+snapshot when no shared backend is configured, so only one worker on the
+host writes at a time.
+
+read() loads a (state, district) slice with partition pruning. Numeric
+columns convert to NumPy without copying, and dictionary columns give
+integer codes into a small dictionary instead of a Python string per row.
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+from bson import ObjectId
+
+from app.database import analytics_db
+from app.services import shared_state
+from app.services.claim_schema import expand_claim
+from app.services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+CLAIMS_SNAPSHOT_DIR = os.getenv("CLAIMS_SNAPSHOT_DIR", "data/snapshots/claims")
+CLAIMS_SNAPSHOT_BATCH_SIZE = int(os.getenv("CLAIMS_SNAPSHOT_BATCH_SIZE", "5000"))
+# How far before the watermark each incremental run looks for late inserts
+CLAIMS_SNAPSHOT_OVERLAP_SECONDS = float(os.getenv("CLAIMS_SNAPSHOT_OVERLAP_SECONDS", "300"))
+# Incremental snapshot from every app process on this interval (0 disables)
+CLAIMS_SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("CLAIMS_SNAPSHOT_INTERVAL_SECONDS", "0"))
+# Longest a run waits for another worker's run to finish (the lock is renewed while held)
+CLAIMS_SNAPSHOT_LOCK_SECONDS = float(os.getenv("CLAIMS_SNAPSHOT_LOCK_SECONDS", "900"))
+
+MANIFEST_NAME = "_manifest.json"
+UNKNOWN_PARTITION = "Unknown"
+
+_category = pa.dictionary(pa.int32(), pa.string())
+
+CLAIMS_SCHEMA = pa.schema([
+    ("claim_id", pa.string()),
+    ("claimant_name", pa.string()),
+    ("village", _category),
+    ("gram_panchayat", pa.string()),
+    ("tehsil_taluka", _category),
+    ("claim_type", _category),
+    ("area", pa.float64()),
+    ("submission_date", pa.timestamp("us")),
+    ("status", _category),
+    ("is_anomaly", pa.bool_()),
+    ("processing_method", _category),
+    ("lgd_code", pa.int64()),
+    ("state", pa.string()),
+    ("district", pa.string()),
+])
+
+PARTITIONING = ds.partitioning(pa.schema([("state", pa.string()), ("district", pa.string())]), flavor="hive")
+
+
+class SnapshotUnavailable(Exception):
+    """No snapshot has been written yet"""
+
+
+class _ChunkSink:
+    """Write target for pa.ipc streams that hands out what was written so far"""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _number(value: Any, cast) -> Optional[Any]:
+    if isinstance(value, bool) or value is None:
+        return None
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _timestamp(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    return None
+
+
+def _text(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def claims_table(documents: Iterable[Dict[str, Any]]) -> pa.Table:
+    """Arrow table (CLAIMS_SCHEMA) of stored claim documents, either layout version"""
+    columns: Dict[str, List[Any]] = {name: [] for name in CLAIMS_SCHEMA.names}
+    for document in documents:
+        document = expand_claim(document)
+        metadata = document.get("extracted_metadata")
+        metadata = metadata if isinstance(metadata, dict) else {}
+        columns["claim_id"].append(str(document["_id"]))
+        columns["claimant_name"].append(_text(document.get("claimant_name")))
+        columns["village"].append(_text(document.get("village")))
+        columns["gram_panchayat"].append(_text(metadata.get("gram_panchayat")))
+        columns["tehsil_taluka"].append(_text(metadata.get("tehsil_taluka")))
+        columns["claim_type"].append(_text(document.get("claim_type")))
+        columns["area"].append(_number(document.get("area"), float))
+        columns["submission_date"].append(_timestamp(document.get("submission_date")))
+        columns["status"].append(_text(document.get("status")))
+        columns["is_anomaly"].append(bool(document.get("is_anomaly", False)))
+        columns["processing_method"].append(_text(document.get("processing_method")))
+        columns["lgd_code"].append(_number(document.get("lgd_code"), int))
+        columns["state"].append(_text(document.get("state")) or UNKNOWN_PARTITION)
+        columns["district"].append(_text(document.get("district")) or UNKNOWN_PARTITION)
+    return pa.Table.from_pydict(columns, schema=CLAIMS_SCHEMA)
+
+
+class ClaimSnapshots:
+    def __init__(self, base_dir: str = CLAIMS_SNAPSHOT_DIR):
+        self.base_dir = base_dir
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.base_dir, MANIFEST_NAME)
+
+    def manifest(self) -> Dict[str, Any]:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest: Dict[str, Any]):
+        os.makedirs(self.base_dir, exist_ok=True)
+        path = self.manifest_path
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, path)
+
+    def _write(self, documents: List[Dict[str, Any]], run_id: str, part: int) -> Tuple[int, List[str]]:
+        """Write one batch of documents; returns the row count and the new files relative to base_dir"""
+        table = claims_table(documents)
+        files: List[str] = []
+        ds.write_dataset(
+            table, self.base_dir, format="parquet", partitioning=PARTITIONING,
+            basename_template=f"part-{run_id}-{part}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            file_visitor=lambda written: files.append(os.path.relpath(written.path, self.base_dir)),
+        )
+        return table.num_rows, files
+
+    def _remove_unlisted(self, manifest: Dict[str, Any]):
+        """Delete files the manifest does not list: from runs that died, or replaced by a rebuild"""
+        listed = set(manifest.get("files", []))
+        for root, _, files in os.walk(self.base_dir):
+            for name in files:
+                path = os.path.relpath(os.path.join(root, name), self.base_dir)
+                if name.endswith(".parquet") and path not in listed:
+                    os.remove(os.path.join(root, name))
+
+    def _try_file_lock(self):
+        """Open file holding an exclusive lock on the snapshot's lock file, or None if another process has it"""
+        path = f"{os.path.abspath(self.base_dir)}.lock"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle = open(path, "a")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            handle.close()
+            return None
+        return handle
+
+    @asynccontextmanager
+    async def _lock(self):
+        """Yields whether this run may write; see shared_state.lock"""
+        if shared_state.backend is not None:
+            async with shared_state.lock("snapshot:claims", CLAIMS_SNAPSHOT_LOCK_SECONDS) as acquired:
+                yield acquired
+            return
+
+        # Without a shared backend the workers of this host coordinate through a lock file
+        deadline = time.monotonic() + CLAIMS_SNAPSHOT_LOCK_SECONDS
+        handle = self._try_file_lock()
+        while handle is None and time.monotonic() < deadline:
+            await asyncio.sleep(shared_state.LOCK_POLL_SECONDS)
+            handle = self._try_file_lock()
+        try:
+            yield handle is not None
+        finally:
+            if handle is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+                handle.close()
+
+    async def run(self, full: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Append claims inserted since the last run (or rebuild everything with
+        `full`, or when there is no snapshot yet). Returns a summary of the
+        run, or None when another run held the lock for too long.
+        """
+        async with self._lock() as acquired:
+            if not acquired:
+                return None
+            with span("snapshot.claims", full=full):
+                return await self._run(full)
+
+    async def _run(self, full: bool) -> Dict[str, Any]:
+        started = time.perf_counter()
+        run_id = uuid.uuid4().hex[:12]
+        manifest = await asyncio.to_thread(self.manifest)
+        await asyncio.to_thread(self._remove_unlisted, manifest)
+
+        # Manifests without a file list predate it and are rebuilt
+        full = full or not manifest.get("last_id") or "files" not in manifest
+        query: Dict[str, Any] = {}
+        already_written = set()
+        if full:
+            manifest = {"rows": 0}
+        else:
+            watermark = ObjectId(manifest["last_id"]).generation_time
+            since = watermark - timedelta(seconds=CLAIMS_SNAPSHOT_OVERLAP_SECONDS)
+            query["_id"] = {"$gte": ObjectId.from_datetime(since)}
+            already_written = set(manifest.get("recent_ids", []))
+
+        written, part = 0, 0
+        files: List[str] = []
+        last_id = ObjectId(manifest["last_id"]) if manifest.get("last_id") else None
+        seen: List[ObjectId] = []
+        batch: List[Dict[str, Any]] = []
+
+        async def flush():
+            nonlocal written, part, batch
+            rows, paths = await asyncio.to_thread(self._write, batch, run_id, part)
+            written += rows
+            files.extend(paths)
+            batch, part = [], part + 1
+
+        cursor = analytics_db["claims"].find(query).sort("_id", 1).batch_size(CLAIMS_SNAPSHOT_BATCH_SIZE)
+        async for document in cursor:
+            claim_id = document["_id"]
+            seen.append(claim_id)
+            if last_id is None or claim_id > last_id:
+                last_id = claim_id
+            if str(claim_id) in already_written:
+                continue
+            batch.append(document)
+            if len(batch) >= CLAIMS_SNAPSHOT_BATCH_SIZE:
+                await flush()
+        if batch:
+            await flush()
+
+        # Ids inside the next run's overlap window, so it does not write them again
+        recent_ids = []
+        if last_id is not None:
+            horizon = last_id.generation_time - timedelta(seconds=CLAIMS_SNAPSHOT_OVERLAP_SECONDS)
+            recent_ids = [str(i) for i in seen if i.generation_time >= horizon]
+
+        manifest.update(
+            last_id=str(last_id) if last_id else None,
+            recent_ids=recent_ids,
+            rows=manifest.get("rows", 0) + written,
+            files=manifest.get("files", []) + files,
+            last_run=run_id,
+            updated_at=datetime.now().isoformat(),
+        )
+        if full:
+            manifest["rebuilt_at"] = manifest["updated_at"]
+        # The commit point: readers switch to this run's files here
+        await asyncio.to_thread(self._save_manifest, manifest)
+
+        self.last_run = {
+            "run_id": run_id,
+            "mode": "full" if full else "incremental",
+            "rows_written": written,
+            "total_rows": manifest["rows"],
+            "last_id": manifest["last_id"],
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        logger.info("Claims snapshot written", extra=self.last_run)
+        return self.last_run
+
+    def dataset(self) -> ds.Dataset:
+        """The files listed in the committed manifest; files of other runs are never read"""
+        manifest = self.manifest()
+        if "files" not in manifest:
+            raise SnapshotUnavailable(f"No claims snapshot in {self.base_dir}")
+        return ds.dataset(
+            [os.path.join(self.base_dir, path) for path in manifest["files"]],
+            format="parquet", partitioning=PARTITIONING, partition_base_dir=self.base_dir, schema=CLAIMS_SCHEMA,
+        )
+
+    def scanner(self, state: Optional[str] = None, district: Optional[str] = None,
+                villages: Optional[List[str]] = None, columns: Optional[List[str]] = None) -> ds.Scanner:
+        """
+        Scan of the claims of one state and/or district. State and district
+        filters prune partitions, so other directories are not opened.
+        """
+        expression = None
+        for condition in (
+            ds.field("state") == state if state else None,
+            ds.field("district") == district if district else None,
+            ds.field("village").isin(villages) if villages else None,
+        ):
+            if condition is not None:
+                expression = condition if expression is None else expression & condition
+        return self.dataset().scanner(columns=columns, filter=expression)
+
+    def read(self, state: Optional[str] = None, district: Optional[str] = None,
+             villages: Optional[List[str]] = None, columns: Optional[List[str]] = None) -> pa.Table:
+        return self.scanner(state, district, villages, columns).to_table()
+
+    def ipc_stream(self, state: Optional[str] = None, district: Optional[str] = None) -> Iterator[bytes]:
+        """Arrow IPC stream of a slice, one chunk per record batch"""
+        # Raises SnapshotUnavailable here rather than on the first chunk
+        return self._ipc_chunks(self.scanner(state, district))
+
+    def _ipc_chunks(self, scanner: ds.Scanner) -> Iterator[bytes]:
+        sink = _ChunkSink()
+        with pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), scanner.projected_schema) as writer:
+            for batch in scanner.to_batches():
+                writer.write_batch(batch)
+                yield sink.take()
+        yield sink.take()
+
+    def stats(self) -> Dict[str, Any]:
+        manifest = self.manifest()
+        return {
+            "path": self.base_dir,
+            "rows": manifest.get("rows", 0),
+            "last_id": manifest.get("last_id"),
+            "updated_at": manifest.get("updated_at"),
+            "rebuilt_at": manifest.get("rebuilt_at"),
+            "interval_seconds": CLAIMS_SNAPSHOT_INTERVAL_SECONDS,
+            "last_run": self.last_run,
+        }
+
+    async def _run_periodically(self):
+        while True:
+            await asyncio.sleep(CLAIMS_SNAPSHOT_INTERVAL_SECONDS)
+            try:
+                await self.run()
+            except Exception:
+                logger.exception("Scheduled claims snapshot failed")
+
+    def start(self):
+        if CLAIMS_SNAPSHOT_INTERVAL_SECONDS > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run_periodically())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+claim_snapshots = ClaimSnapshots()
@@ -0,0 +1,271 @@
+"""
+Lightweight request tracing with OpenTelemetry-style spans.
+
+    with span("claims.insert", collection="claims"):
+        await db["claims"].insert_one(doc)
+
+TracingMiddleware starts a root span per HTTP request (continuing a W3C
+`traceparent` header when present) and decides once whether the trace is
+sampled (TRACE_SAMPLE_RATE). Unsampled requests get a shared no-op span, so
+instrumented code costs a context variable lookup. Finished spans of sampled
+traces are queued and written by a background thread:
+
+- TRACE_EXPORTER=file: JSON lines appended to TRACE_EXPORT_FILE
+- TRACE_EXPORTER=http: batches POSTed as JSON to TRACE_COLLECTOR_URL
+- TRACE_EXPORTER=none (default): spans are dropped
+"""
+import contextvars
+import json
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.05"))
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none").lower()
+TRACE_EXPORT_FILE = os.getenv("TRACE_EXPORT_FILE", "traces.jsonl")
+TRACE_COLLECTOR_URL = os.getenv("TRACE_COLLECTOR_URL", "http://localhost:4318/v1/traces")
+EXPORT_BATCH_SIZE = 256
+EXPORT_INTERVAL_SECONDS = 2.0
+
+
+class Span:
+    sampled = True
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None, attributes: Optional[Dict] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status = "ok"
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException):
+        self.status = "error"
+        self.attributes["exception.type"] = type(exc).__name__
+        self.attributes["exception.message"] = str(exc)[:500]
+
+    def end(self):
+        self.end_ns = time.time_ns()
+        exporter.export(self)
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3) if self.end_ns else None,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Stand-in for spans of unsampled traces; every operation is free."""
+    sampled = False
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def record_exception(self, exc: BaseException):
+        pass
+
+    def end(self):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+current_span: contextvars.ContextVar[Optional[Any]] = contextvars.ContextVar("current_span", default=None)
+
+
+def current_trace_id() -> Optional[str]:
+    active = current_span.get()
+    return active.trace_id if active is not None else None
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Child span of the current span. Outside a sampled trace this is a no-op;
+    background work with no request span is sampled on its own.
+    """
+    parent = current_span.get()
+    if parent is NOOP_SPAN or (parent is None and random.random() >= TRACE_SAMPLE_RATE):
+        yield NOOP_SPAN
+        return
+    new = Span(name, parent.trace_id if parent else secrets.token_hex(16), parent.span_id if parent else None, attributes)
+    token = current_span.set(new)
+    try:
+        yield new
+    except BaseException as e:
+        new.record_exception(e)
+        raise
+    finally:
+        current_span.reset(token)
+        new.end()
+
+
+def parse_traceparent(header: str) -> Optional[tuple]:
+    """W3C traceparent "00-<trace_id>-<parent_id>-<flags>" -> (trace_id, parent_id, sampled)."""
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None
+    return parts[1], parts[2], sampled
+
+
+class SpanExporter:
+    """Queues finished spans and ships them in batches from a background thread."""
+
+    def __init__(self, kind: str, path: str = TRACE_EXPORT_FILE, url: str = TRACE_COLLECTOR_URL):
+        self.kind = kind
+        self.path = path
+        self.url = url
+        self.exported = 0
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=10000)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def export(self, finished: Span):
+        if self.kind == "none":
+            return
+        try:
+            self._queue.put_nowait(finished.to_dict())
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                    self._thread.start()
+
+    def _drain(self, block: bool) -> List[Dict]:
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=EXPORT_INTERVAL_SECONDS) if block else self._queue.get_nowait())
+            while len(batch) < EXPORT_BATCH_SIZE:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write_batch(self, batch: List[Dict]):
+        try:
+            self._write(batch)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _run(self):
+        while True:
+            batch = self._drain(block=True)
+            if batch:
+                self._write_batch(batch)
+
+    def flush(self):
+        """Export everything queued, including a batch the background thread is writing."""
+        while True:
+            batch = self._drain(block=False)
+            if not batch:
+                break
+            self._write_batch(batch)
+        self._queue.join()
+
+    def _write(self, batch: List[Dict]):
+        try:
+            if self.kind == "file":
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("".join(json.dumps(s, default=str) + "\n" for s in batch))
+            elif self.kind == "http":
+                httpx.post(self.url, json={"spans": batch}, timeout=5.0)
+            self.exported += len(batch)
+        except Exception:
+            # Tracing must never take the service down
+            self.dropped += len(batch)
+
+
+exporter = SpanExporter(TRACE_EXPORTER)
+
+
+def _reset_after_fork():
+    # Forked workers start their own export thread on first use
+    exporter._queue = queue.Queue(maxsize=10000)
+    exporter._thread = None
+    exporter._lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class TracingMiddleware:
+    """Root span per HTTP request, named "<METHOD> <route template>"."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = parse_traceparent(dict(scope["headers"]).get(b"traceparent", b"").decode("latin-1"))
+        if incoming:
+            trace_id, parent_id, sampled = incoming
+        else:
+            trace_id, parent_id, sampled = secrets.token_hex(16), None, random.random() < TRACE_SAMPLE_RATE
+
+        if not sampled:
+            token = current_span.set(NOOP_SPAN)
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                current_span.reset(token)
+            return
+
+        root = Span(scope["method"], trace_id, parent_id, {"http.method": scope["method"], "http.target": scope["path"]})
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"traceparent", f"00-{root.trace_id}-{root.span_id}-01".encode("latin-1"))
+                ]
+            await send(message)
+
+        token = current_span.set(root)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            root.record_exception(e)
+            raise
+        finally:
+            current_span.reset(token)
+            route = scope.get("route")
+            root.name = f'{scope["method"]} {getattr(route, "path", scope["path"])}'
+            root.set_attribute("http.status_code", status["code"])
+            if status["code"] >= 500:
+                root.status = "error"
+            root.end()
@@ -0,0 +1,232 @@
+"""
+In-memory village master index (LGD codes, tehsil, district, state, centroid,
+census population) with exact and fuzzy name lookup.
+
+Rows are stored column-wise: names as interned strings, numbers in numpy
+arrays. Exact lookups hit a dict of normalised names; fuzzy lookups score
+candidates from a character-trigram inverted index with one np.bincount.
+"""
+import csv
+import os
+import re
+import sys
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+VILLAGE_MASTER_PATH = os.getenv("VILLAGE_MASTER_PATH", "data/villages.csv")
+
+# Minimum trigram similarity for a fuzzy match to be accepted
+FUZZY_MATCH_THRESHOLD = float(os.getenv("VILLAGE_FUZZY_THRESHOLD", "0.75"))
+
+# Values the extraction step uses for "not found"
+UNKNOWN_VALUES = {"", "unknown", "none", "null", "n/a", "na"}
+
+
+def normalize_name(value: Optional[str]) -> str:
+    """Case-fold, strip accents and punctuation, collapse whitespace."""
+    if not value:
+        return ""
+    text = unicodedata.normalize("NFKD", str(value))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r"[^\w\s]", " ", text.casefold())
+    return " ".join(text.split())
+
+
+def trigrams(normalized: str) -> List[str]:
+    """Character trigrams of a normalised name, padded so short names still match."""
+    padded = f"  {normalized} "
+    return sorted({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+def is_unknown(value: Optional[str]) -> bool:
+    return normalize_name(value) in UNKNOWN_VALUES
+
+
+class VillageIndex:
+    def __init__(self, path: str = VILLAGE_MASTER_PATH):
+        self.path = path
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self.names: List[str] = []
+        self.tehsils: List[str] = []
+        self.districts: List[str] = []
+        self.states: List[str] = []
+        self.lgd_codes = np.zeros(0, dtype=np.int64)
+        self.latitudes = np.zeros(0, dtype=np.float64)
+        self.longitudes = np.zeros(0, dtype=np.float64)
+        self.populations = np.zeros(0, dtype=np.int32)
+        self._exact: Dict[str, List[int]] = {}
+        self._by_lgd: Dict[int, int] = {}
+        self._postings: Dict[str, np.ndarray] = {}
+        self._trigram_counts = np.zeros(0, dtype=np.int16)
+        self._norm_tehsils: List[str] = []
+        self._norm_districts: List[str] = []
+        self._norm_states: List[str] = []
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self.names)
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    if os.path.exists(self.path):
+                        with open(self.path, newline="", encoding="utf-8") as f:
+                            self._build(csv.DictReader(f))
+                    self._loaded = True
+
+    def load_rows(self, rows: List[Dict]):
+        """Replace the index contents with the given rows (same columns as the CSV)."""
+        with self._lock:
+            self._build(rows)
+            self._loaded = True
+
+    def _build(self, rows):
+        self._clear()
+        lgd_codes, latitudes, longitudes, populations = [], [], [], []
+        exact = defaultdict(list)
+        postings = defaultdict(list)
+        trigram_counts = []
+
+        def number(value, cast, default):
+            try:
+                return cast(value) if value not in (None, "") else default
+            except ValueError:
+                return default
+
+        for row in rows:
+            name = (row.get("village") or "").strip()
+            if not name:
+                continue
+            row_id = len(self.names)
+
+            # Interning keeps repeated tehsil/district/state names as one object
+            self.names.append(sys.intern(name))
+            self.tehsils.append(sys.intern((row.get("tehsil") or "").strip()))
+            self.districts.append(sys.intern((row.get("district") or "").strip()))
+            self.states.append(sys.intern((row.get("state") or "").strip()))
+            self._norm_tehsils.append(sys.intern(normalize_name(row.get("tehsil"))))
+            self._norm_districts.append(sys.intern(normalize_name(row.get("district"))))
+            self._norm_states.append(sys.intern(normalize_name(row.get("state"))))
+
+            lgd_code = number(row.get("lgd_code"), int, -1)
+            lgd_codes.append(lgd_code)
+            latitudes.append(number(row.get("latitude"), float, np.nan))
+            longitudes.append(number(row.get("longitude"), float, np.nan))
+            populations.append(number(row.get("population"), int, -1))
+            if lgd_code >= 0:
+                self._by_lgd[lgd_code] = row_id
+
+            normalized = normalize_name(name)
+            exact[normalized].append(row_id)
+            grams = trigrams(normalized)
+            trigram_counts.append(len(grams))
+            for gram in grams:
+                postings[gram].append(row_id)
+
+        self.lgd_codes = np.array(lgd_codes, dtype=np.int64)
+        self.latitudes = np.array(latitudes, dtype=np.float64)
+        self.longitudes = np.array(longitudes, dtype=np.float64)
+        self.populations = np.array(populations, dtype=np.int32)
+        self._exact = dict(exact)
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self._trigram_counts = np.array(trigram_counts, dtype=np.int16)
+
+    def record(self, row_id: int, score: float = 1.0) -> Dict:
+        population = int(self.populations[row_id])
+        latitude = float(self.latitudes[row_id])
+        longitude = float(self.longitudes[row_id])
+        lgd_code = int(self.lgd_codes[row_id])
+        return {
+            "lgd_code": lgd_code if lgd_code >= 0 else None,
+            "village": self.names[row_id],
+            "tehsil": self.tehsils[row_id] or None,
+            "district": self.districts[row_id] or None,
+            "state": self.states[row_id] or None,
+            "latitude": None if np.isnan(latitude) else round(latitude, 6),
+            "longitude": None if np.isnan(longitude) else round(longitude, 6),
+            "population": population if population >= 0 else None,
+            "match_score": round(score, 3),
+        }
+
+    def _hint_score(self, row_id: int, tehsil: str, district: str, state: str) -> float:
+        """Small bonus for agreeing location hints and a penalty for conflicting ones."""
+        score = 0.0
+        for hint, values, weight in (
+            (district, self._norm_districts, 0.2),
+            (tehsil, self._norm_tehsils, 0.1),
+            (state, self._norm_states, 0.1),
+        ):
+            if hint and values[row_id]:
+                score += weight if values[row_id] == hint else -weight
+        return score
+
+    def search(self, village: str, district: Optional[str] = None, state: Optional[str] = None,
+               tehsil: Optional[str] = None, limit: int = 5) -> List[Dict]:
+        """
+        Ranked candidates for a village name. match_score is the name
+        similarity alone; location hints only order equally similar names.
+        """
+        self._ensure_loaded()
+        normalized = normalize_name(village)
+        if not normalized or not self.names:
+            return []
+
+        hints = [normalize_name(h) if not is_unknown(h) else "" for h in (tehsil, district, state)]
+
+        exact_ids = self._exact.get(normalized)
+        if exact_ids:
+            scored = [(1.0, self._hint_score(i, *hints), i) for i in exact_ids]
+        else:
+            grams = trigrams(normalized)
+            lists = [self._postings[g] for g in grams if g in self._postings]
+            if not lists:
+                return []
+            hits = np.bincount(np.concatenate(lists), minlength=len(self.names))
+            candidates = np.nonzero(hits)[0]
+            # Dice coefficient between the query and candidate trigram sets
+            similarity = 2.0 * hits[candidates] / (len(grams) + self._trigram_counts[candidates])
+            top = candidates[np.argsort(-similarity)[:max(limit * 4, 20)]]
+            scored = [
+                (float(2.0 * hits[i] / (len(grams) + self._trigram_counts[i])), self._hint_score(i, *hints), int(i))
+                for i in top
+            ]
+
+        scored.sort(key=lambda item: (-item[0], -item[1]))
+        return [self.record(i, similarity) for similarity, _, i in scored[:limit]]
+
+    def lookup(self, village: str, district: Optional[str] = None, state: Optional[str] = None,
+               tehsil: Optional[str] = None) -> Optional[Dict]:
+        """
+        Best match for a village name, or None if nothing is similar enough.
+        A match in another district or state than the stated one is not
+        returned: it is a different village with the same name.
+        """
+        if is_unknown(village):
+            return None
+        for match in self.search(village, district=district, state=state, tehsil=tehsil):
+            if match["match_score"] < FUZZY_MATCH_THRESHOLD:
+                return None
+            if not any(
+                not is_unknown(stated) and found and normalize_name(stated) != normalize_name(found)
+                for stated, found in ((district, match["district"]), (state, match["state"]))
+            ):
+                return match
+        return None
+
+    def get_by_lgd(self, lgd_code: int) -> Optional[Dict]:
+        self._ensure_loaded()
+        row_id = self._by_lgd.get(int(lgd_code))
+        return self.record(row_id) if row_id is not None else None
+
+
+# Initialize the index (loaded from VILLAGE_MASTER_PATH on first use)
+village_index = VillageIndex()
@@ -0,0 +1,66 @@
+"""
+Compare two benchmark result files from benchmarks/run.py.
+
+    python -m benchmarks.compare results/bench-old.json results/bench-new.json --threshold 0.15
+
+Prints p50/p95 latency and throughput changes per dataset size and scenario,
+and exits with status 1 when any p95 latency grew or throughput dropped by
+more than the threshold.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional, Tuple
+
+
+def load(path: str) -> Dict[Tuple[int, str], Dict]:
+    with open(path) as f:
+        report = json.load(f)
+    return {(r["dataset_size"], r["scenario"]): r for r in report["results"]}
+
+
+def change(old: Optional[float], new: Optional[float]) -> Optional[float]:
+    if not old or new is None:
+        return None
+    return (new - old) / old
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> List[Dict]:
+    rows = []
+    for key in sorted(baseline.keys() & current.keys()):
+        old, new = baseline[key], current[key]
+        p50 = change(old["latency_ms"]["p50"], new["latency_ms"]["p50"])
+        p95 = change(old["latency_ms"]["p95"], new["latency_ms"]["p95"])
+        throughput = change(old["throughput_rps"], new["throughput_rps"])
+        rows.append({
+            "dataset_size": key[0],
+            "scenario": key[1],
+            "p50": p50,
+            "p95": p95,
+            "throughput": throughput,
+            "regressed": (p95 or 0) > threshold or (throughput or 0) < -threshold,
+        })
+    return rows
+
+
+def fmt(value: Optional[float]) -> str:
+    return "     n/a" if value is None else f"{value * 100:+7.1f}%"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed relative regression")
+    args = parser.parse_args(argv)
+
+    rows = compare(load(args.baseline), load(args.current), args.threshold)
+    print(f"{'size':>7} {'scenario':<13} {'p50':>8} {'p95':>8} {'rps':>8}")
+    for row in rows:
+        flag = "  REGRESSION" if row["regressed"] else ""
+        print(f"{row['dataset_size']:>7} {row['scenario']:<13} {fmt(row['p50'])} {fmt(row['p95'])} {fmt(row['throughput'])}{flag}")
+    return 1 if any(row["regressed"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
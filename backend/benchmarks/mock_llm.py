@@ -0,0 +1,170 @@
+"""
+Local stand-ins for the OpenRouter and AIMLAPI chat completion APIs.
+
+Each server answers POST /v1/chat/completions after a simulated latency with
+a response shaped like the real provider's: claim extraction (single and
+batched), anomaly reports and intervention lists are recognised from the
+prompt, and `usage` reports token counts.
+"""
+import asyncio
+import json
+import random
+import re
+import socket
+import threading
+import time
+from typing import Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+FORM_FIELDS = {
+    "Name of the claimant(s)": "claimant_name",
+    "Name of the spouse": "spouse_name",
+    "Name of father/mother": "father_mother_name",
+    "Address": "address",
+    "Village": "village",
+    "Gram Panchayat": "gram_panchayat",
+    "Tehsil/Taluka": "tehsil_taluka",
+    "District": "district",
+    "State": "state",
+    "Claim type": "claim_type",
+    "Extent of forest land occupied": "area",
+}
+
+INTERVENTIONS = [
+    ("Water Management", "High", "Rainwater harvesting and check dams under Jal Shakti Abhiyan."),
+    ("Livelihood Support", "Medium", "Minor forest produce value addition through Van Dhan Kendras."),
+    ("Healthcare Access", "Medium", "Mobile health unit visits and sub-centre staffing."),
+    ("Forest Conservation", "High", "Community forest resource management plan."),
+]
+
+
+def extract_fields(form: str) -> Dict:
+    extracted = {field: None for field in FORM_FIELDS.values()}
+    for line in form.splitlines():
+        label, _, value = line.partition(":")
+        field = FORM_FIELDS.get(label.strip())
+        if field and value.strip():
+            extracted[field] = value.strip()
+    return extracted
+
+
+def _between(text: str, start: str, end: str) -> str:
+    head, _, rest = text.partition(start)
+    return rest.partition(end)[0] if rest else ""
+
+
+def completion_content(prompt: str, rng: random.Random) -> str:
+    if "Forms to process" in prompt:
+        forms = _between(prompt, "Forms to process (each starts with its [index]):", "Return only a valid JSON array")
+        parts = re.split(r"^\s*\[(\d+)\]\s*$", forms, flags=re.MULTILINE)
+        items = [{"index": int(index), **extract_fields(form)} for index, form in zip(parts[1::2], parts[2::2])]
+        return "```json\n" + json.dumps(items) + "\n```"
+    if "Text to process:" in prompt:
+        return json.dumps(extract_fields(_between(prompt, "Text to process:", "Return only a valid JSON object")))
+    if "anomalies" in prompt:
+        claims = json.loads(_between(prompt, "anomalies: ", "\x00") or "[]")
+        anomalies = [
+            {
+                "claim_id": claim.get("claim_id"),
+                "type": "Large Area Claim",
+                "severity": "High",
+                "confidence": 88.0,
+                "description": f"Area of {claim.get('area')} ha is above the village median",
+            }
+            for claim in claims if (claim.get("area") or 0) > 10
+        ]
+        return json.dumps({"anomalies": anomalies, "summary": {"total_analyzed": len(claims), "anomalies_found": len(anomalies)}})
+    if "prioritize interventions" in prompt:
+        picked = rng.sample(INTERVENTIONS, k=3)
+        return json.dumps([
+            {
+                "title": title,
+                "description": description,
+                "action": f"Plan {title}",
+                "priority": priority,
+                "confidence_score": round(rng.uniform(0.7, 0.95), 2),
+                "reasoning": "Derived from village indicators",
+            }
+            for title, priority, description in picked
+        ])
+    return "{}"
+
+
+def create_app(name: str, latency_ms: float = 300.0, jitter_ms: float = 100.0,
+               error_rate: float = 0.0, seed: int = 0) -> FastAPI:
+    """Chat completion server with simulated latency and an optional share of 503s."""
+    app = FastAPI(title=f"Mock {name}")
+    rng = random.Random(seed)
+    app.state.requests = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        app.state.requests += 1
+        await asyncio.sleep(max(0.0, rng.gauss(latency_ms, jitter_ms)) / 1000)
+        if rng.random() < error_rate:
+            return JSONResponse({"error": {"message": "overloaded"}}, status_code=503)
+
+        prompt = "\n".join(m.get("content", "") for m in payload.get("messages", []))
+        content = completion_content(prompt, rng)
+        prompt_tokens, completion_tokens = len(prompt) // 4, len(content) // 4
+        return {
+            "id": f"mock-{app.state.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    return app
+
+
+class MockServer:
+    """Runs a mock provider with uvicorn on a free local port in a background thread."""
+
+    def __init__(self, app: FastAPI, port: Optional[int] = None):
+        self.app = app
+        self.port = port or _free_port()
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def start(self) -> "MockServer":
+        self._thread = threading.Thread(target=self.server.run, name=f"mock-llm-{self.port}", daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Mock LLM server on port {self.port} did not start")
+            time.sleep(0.02)
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        if self._thread:
+            self._thread.join(timeout=5)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_providers(latency_ms: float, jitter_ms: float, error_rate: float = 0.0) -> List[MockServer]:
+    """Start mock OpenRouter and AIMLAPI servers; returns them in that order."""
+    return [
+        MockServer(create_app(name, latency_ms, jitter_ms, error_rate, seed=i)).start()
+        for i, name in enumerate(["openrouter", "aimlapi"])
+    ]
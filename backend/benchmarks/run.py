@@ -0,0 +1,332 @@
+"""
+Benchmark the backend endpoints against synthetic data.
+
+The app runs in-process behind httpx's ASGI transport, so every request goes
+through the full middleware stack without a network hop. LLM providers are
+replaced by local mock servers (benchmarks/mock_llm.py) and MongoDB by
+mongomock-motor, or by a throwaway database on a real mongod with --mongo-uri.
+
+For each dataset size the claims collection is reseeded and every scenario
+is run with a fixed number of requests and concurrency. Throughput and
+p50/p95/p99 latency are printed and written as JSON to --output; compare two
+result files with `python -m benchmarks.compare`.
+
+    cd backend
+    python -m benchmarks.run --sizes 100,1000,5000 --requests 50 --concurrency 8
+    python -m benchmarks.run --mongo-uri mongodb://localhost:27017 --llm-latency-ms 800
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.mock_llm import start_providers
+from benchmarks.synthetic import claim_form_text, generate_claims, generate_villages, village_analysis_request
+
+SCENARIOS = ["ingest", "ingest_batch", "ingest_queued", "list", "snapshot_arrow", "statistics", "anomalies", "dss",
+             "dss_batch", "dss_batch_snapshot", "search"]
+# Read the Parquet claims snapshot, written after each reseed
+SNAPSHOT_SCENARIOS = {"snapshot_arrow", "dss_batch_snapshot"}
+BATCH_SIZE = 8
+
+Request = Tuple[str, str, Optional[Dict]]
+
+
+def latency_summary(samples: List[float]) -> Dict:
+    """Latency percentiles in milliseconds."""
+    if not samples:
+        return {"p50": None, "p95": None, "p99": None, "mean": None, "max": None}
+    ms = np.array(samples) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+        "mean": round(float(ms.mean()), 3),
+        "max": round(float(ms.max()), 3),
+    }
+
+
+async def run_scenario(client, make_request: Callable[[int], Request], total: int, concurrency: int) -> Dict:
+    """Send `total` requests from `concurrency` workers; returns throughput and latency."""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    next_index = iter(range(total))
+
+    async def worker():
+        for i in next_index:
+            method, url, body = make_request(i)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, json=body)
+                status = str(response.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+    elapsed = time.perf_counter() - start
+
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "statuses": statuses,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else None,
+        "latency_ms": latency_summary(latencies),
+    }
+
+
+def scenario_requests(name: str, villages: List[Dict], seed: int) -> Callable[[int], Request]:
+    # Distinct forms per scenario: repeated content is deduplicated on ingestion
+    rng = random.Random(f"{seed}:{name}")
+    if name == "ingest":
+        return lambda i: ("POST", "/claims/", {"extracted_text": claim_form_text(rng, villages)})
+    if name == "ingest_queued":
+        return lambda i: ("POST", "/claims/ingest", {"extracted_text": claim_form_text(rng, villages)})
+    if name == "ingest_batch":
+        return lambda i: ("POST", "/claims/batch", {"items": [claim_form_text(rng, villages) for _ in range(BATCH_SIZE)]})
+    if name == "list":
+        return lambda i: ("GET", "/claims/", None)
+    if name == "snapshot_arrow":
+        return lambda i: ("GET", "/claims/snapshot.arrow", None)
+    if name in ("dss_batch", "dss_batch_snapshot"):
+        source = "snapshot" if name == "dss_batch_snapshot" else "database"
+        return lambda i: ("POST", "/dss/batch-analysis", {"district": rng.choice(villages)["district"], "source": source})
+    if name == "search":
+        # Village prefixes and misspelt names, as typed by field officers
+        def search_request(i):
+            village = rng.choice(villages)["village"]
+            query = village[:4] if i % 2 else village[:-1] + village[-2:]
+            return ("GET", f"/claims/search?q={quote(query)}", None)
+        return search_request
+    if name == "statistics":
+        return lambda i: ("GET", "/claims/statistics", None)
+    if name == "anomalies":
+        return lambda i: ("POST", "/claims/detect-anomalies", None)
+    if name == "dss":
+        # A different holder each time, so results reflect uncached analysis
+        return lambda i: ("POST", "/dss/analyze", village_analysis_request(rng, rng.choice(villages)))
+    raise ValueError(f"Unknown scenario: {name}")
+
+
+def use_database(database, analytics=None):
+    """Point every module holding a reference to the app databases at `database`."""
+    import app.database
+    from app.routes import claims, dss
+    from app.services import claim_search, ingest_queue, snapshots
+    analytics = analytics or database
+    app.database.db = claims.db = ingest_queue.db = database
+    app.database.analytics_db = claims.analytics_db = dss.analytics_db = analytics
+    snapshots.analytics_db = claim_search.analytics_db = analytics
+
+
+async def wait_for_drain(queue, timeout: float = 600.0) -> Dict:
+    """Time until the ingest workers have emptied the queue, and their rate."""
+    start = time.perf_counter()
+    counts = await queue.depth()
+    while counts["queued"] + counts["processing"] and time.perf_counter() - start < timeout:
+        await asyncio.sleep(0.05)
+        counts = await queue.depth()
+    elapsed = time.perf_counter() - start
+    return {
+        "drain_s": round(elapsed, 3),
+        "jobs": counts,
+    }
+
+
+async def seed_claims(database, size: int, villages: List[Dict], seed: int):
+    from app.services.claim_schema import compact_claim
+    from app.services.claim_search import claim_search_keys
+    await database["claims"].delete_many({})
+    # Stored the way the app writes them now
+    claims = [
+        compact_claim({**claim, "search_keys": claim_search_keys(claim)})
+        for claim in generate_claims(size, villages, seed=seed)
+    ]
+    for start in range(0, len(claims), 1000):
+        await database["claims"].insert_many(claims[start:start + 1000])
+
+
+async def run_benchmarks(args) -> List[Dict]:
+    import httpx
+    from app.database import analytics_read_preference
+    from app.main import app
+    from app.routes.claims import ingest_queue
+    from app.services.cache import recommendation_cache
+    from app.services.claim_search import claim_search
+    from app.services.snapshots import claim_snapshots
+    from app.services.village_index import village_index
+
+    villages = generate_villages(args.villages, seed=args.seed)
+    village_index.load_rows(villages)
+
+    if args.mongo_uri:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        mongo_client = AsyncIOMotorClient(args.mongo_uri)
+        database = mongo_client[f"fra_bench_{uuid.uuid4().hex[:8]}"]
+        analytics = database.with_options(read_preference=analytics_read_preference())
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+        mongo_client = AsyncMongoMockClient()
+        database = analytics = mongo_client["FRA_DB"]
+    use_database(database, analytics)
+    snapshot_dir = tempfile.mkdtemp(prefix="fra_bench_snapshots_")
+    claim_snapshots.base_dir = os.path.join(snapshot_dir, "claims")
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    # The ASGI transport does not run the app lifespan
+    await ingest_queue.start()
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=120.0) as client:
+            for size in args.sizes:
+                await seed_claims(database, size, villages, seed=args.seed + size)
+                claim_search.clear()
+                # The ASGI transport does not start the background refresh either
+                await claim_search.refresh()
+                if SNAPSHOT_SCENARIOS & set(args.scenarios):
+                    await claim_snapshots.run(full=True)
+                for name in args.scenarios:
+                    await recommendation_cache.clear()
+                    total = args.requests if name != "ingest_batch" else max(1, args.requests // BATCH_SIZE)
+                    started = time.perf_counter()
+                    stats = await run_scenario(client, scenario_requests(name, villages, args.seed), total, args.concurrency)
+                    if name == "ingest_queued":
+                        # Accepting is fast; also report how long the workers took to store everything
+                        stats["drain"] = await wait_for_drain(ingest_queue)
+                        drained_in = time.perf_counter() - started
+                        stats["drain"]["claims_per_s"] = round(total / drained_in, 2) if drained_in else None
+                        await ingest_queue.collection.delete_many({})
+                    stats.update({"scenario": name, "dataset_size": size})
+                    results.append(stats)
+                    print_row(stats)
+    finally:
+        await ingest_queue.stop()
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+        if args.mongo_uri:
+            await mongo_client.drop_database(database.name)
+            mongo_client.close()
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_row(stats: Dict):
+    latency = stats["latency_ms"]
+    print(
+        f"{stats['dataset_size']:>7} {stats['scenario']:<18} {stats['requests']:>5} req "
+        f"{stats['throughput_rps']:>8} rps  p50 {latency['p50']:>9} ms  p95 {latency['p95']:>9} ms  "
+        f"p99 {latency['p99']:>9} ms  errors {stats['errors']}"
+    )
+
+
+def configure_environment(args, providers):
+    """Settings the app reads at import time; explicit environment values win."""
+    openrouter, aimlapi = providers
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("OPENROUTER_API_KEY", "benchmark")
+    os.environ.setdefault("AIMLAPI_KEY", "benchmark")
+    os.environ["OPENROUTER_BASE_URL"] = openrouter.base_url
+    os.environ["AIMLAPI_BASE_URL"] = aimlapi.base_url
+    if not args.rate_limits:
+        # Measure the backend, not the providers' request quotas
+        for provider in ("OPENROUTER", "AIMLAPI"):
+            os.environ.setdefault(f"{provider}_RPM", "1000000")
+            os.environ.setdefault(f"{provider}_TPM", "1000000000")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the FRA DSS backend endpoints")
+    parser.add_argument("--sizes", default="100,1000,5000", help="Comma-separated numbers of seeded claims")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per scenario (batches for ingest_batch)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--villages", type=int, default=500, help="Villages in the synthetic master index")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0, help="Mean mock provider latency")
+    parser.add_argument("--llm-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Share of mock provider 503s")
+    parser.add_argument("--rate-limits", action="store_true", help="Keep the providers' default rate limits")
+    parser.add_argument("--mongo-uri", help="Use a throwaway database on this mongod instead of mongomock")
+    parser.add_argument("--output", default=os.path.join(BACKEND_DIR, "benchmarks", "results"),
+                        help="Directory for the JSON results file")
+    args = parser.parse_args(argv)
+    args.sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv=None) -> str:
+    args = parse_args(argv)
+    providers = start_providers(args.llm_latency_ms, args.llm_jitter_ms, args.llm_error_rate)
+    try:
+        configure_environment(args, providers)
+        started = datetime.now(timezone.utc)
+        results = asyncio.run(run_benchmarks(args))
+    finally:
+        for server in providers:
+            server.stop()
+
+    report = {
+        "started_at": started.isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "sizes": args.sizes,
+            "scenarios": args.scenarios,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "villages": args.villages,
+            "seed": args.seed,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter_ms": args.llm_jitter_ms,
+            "llm_error_rate": args.llm_error_rate,
+            "rate_limits": args.rate_limits,
+            "mongo": "mongod" if args.mongo_uri else "mongomock",
+        },
+        "results": results,
+    }
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"bench-{started.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {path}")
+    return path
+
+
+if __name__ == "__main__":
+    main()
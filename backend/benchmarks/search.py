@@ -0,0 +1,88 @@
+"""
+Micro-benchmark of the claim search index (app/services/claim_search.py)
+on synthetic claims, without MongoDB.
+
+    cd backend
+    python -m benchmarks.search --claims 100000,1000000 --repeat 20
+
+Prints the time to index the claims' search keys and p50/p95/max latency per query kind:
+exact names, Devanagari names, prefixes and misspellings. The synthetic
+name lists are short, so every query word matches a large share of the
+claims; real data has a far larger vocabulary and shorter posting lists.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+from bson import ObjectId
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.services.claim_search import ClaimSearchIndex, claim_search_keys
+from benchmarks.synthetic import generate_claims, generate_villages
+
+QUERIES = {
+    "exact": ["Sita Gond", "Jagdish Marandi", "Phoolmati Netam", "Birsa Munda"],
+    "devanagari": ["सीता गोंड", "जगदीश मरांडी", "लक्ष्मी", "कमला बैगा"],
+    "prefix": ["Kanh", "Dev", "Sukh", "Ramesh Hem"],
+    "misspelt": ["Seeta Gondh", "Laksmi Baigaa", "Jagdis Marandy", "Devpru"],
+}
+
+
+def claim_keys(size: int, seed: int = 7) -> List[Dict[str, str]]:
+    villages = generate_villages(max(100, size // 500), seed=seed)
+    keys = []
+    for claim in generate_claims(size, villages, seed=seed):
+        claim["extracted_metadata"]["gram_panchayat"] = f"{claim['village']} GP"
+        keys.append(claim_search_keys(claim))
+    return keys
+
+
+def run_benchmark(sizes: List[int], repeat: int) -> List[Dict]:
+    results = []
+    for size in sizes:
+        keys = claim_keys(size)
+        started = time.perf_counter()
+        index = ClaimSearchIndex()
+        for claim in keys:
+            index.add(ObjectId(), claim)
+        build_s = time.perf_counter() - started
+        rng = random.Random(size)
+        for kind, queries in QUERIES.items():
+            samples = []
+            for _ in range(repeat):
+                query = rng.choice(queries)
+                started = time.perf_counter()
+                index.search(query, limit=20)
+                samples.append((time.perf_counter() - started) * 1000)
+            results.append({
+                "claims": size,
+                "kind": kind,
+                "build_s": round(build_s, 2),
+                "p50_ms": round(float(np.percentile(samples, 50)), 2),
+                "p95_ms": round(float(np.percentile(samples, 95)), 2),
+                "max_ms": round(max(samples), 2),
+            })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark claim search latency")
+    parser.add_argument("--claims", default="100000,1000000", help="Comma-separated index sizes")
+    parser.add_argument("--repeat", type=int, default=20, help="Queries per kind")
+    args = parser.parse_args(argv)
+
+    for row in run_benchmark([int(size) for size in args.claims.split(",")], args.repeat):
+        print(
+            f"{row['claims']:>8} {row['kind']:<11} build {row['build_s']:>6} s  "
+            f"p50 {row['p50_ms']:>7} ms  p95 {row['p95_ms']:>7} ms  max {row['max_ms']:>7} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
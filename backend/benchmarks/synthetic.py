@@ -0,0 +1,200 @@
+"""
+Synthetic FRA claim data for benchmarks.
+
+Everything is derived from a seeded random.Random, so a given seed and size
+always produce the same villages, claims and claim form texts.
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+# FRA implementing states and some of their forest districts, with tehsils
+GEOGRAPHY = {
+    "Madhya Pradesh": {
+        "Balaghat": ["Baihar", "Paraswada", "Lanji"],
+        "Mandla": ["Bichhiya", "Niwas", "Nainpur"],
+        "Dindori": ["Shahpura", "Bajag", "Karanjia"],
+        "Shahdol": ["Sohagpur", "Jaisinghnagar", "Beohari"],
+    },
+    "Odisha": {
+        "Mayurbhanj": ["Karanjia", "Udala", "Bangiriposi"],
+        "Koraput": ["Jeypore", "Lamtaput", "Semiliguda"],
+        "Kandhamal": ["Phulbani", "Baliguda", "G. Udayagiri"],
+    },
+    "Telangana": {
+        "Adilabad": ["Utnoor", "Indervelly", "Narnoor"],
+        "Mulugu": ["Eturnagaram", "Tadvai", "Venkatapuram"],
+        "Bhadradri Kothagudem": ["Bhadrachalam", "Dummugudem", "Yellandu"],
+    },
+    "Tripura": {
+        "Dhalai": ["Ambassa", "Manu", "Gandacherra"],
+        "North Tripura": ["Kanchanpur", "Panisagar", "Dharmanagar"],
+    },
+}
+
+VILLAGE_PREFIXES = [
+    "Dev", "Ram", "Kanha", "Bori", "Sal", "Mahu", "Jam", "Ken", "Tendu", "Amla",
+    "Kusum", "Bija", "Char", "Harra", "Bhel", "Kar", "Son", "Nim", "Pipar", "Ghat",
+]
+VILLAGE_SUFFIXES = ["pur", "gaon", "khedi", "tola", "wada", "palli", "guda", "nagar", "pada", "dih"]
+
+FIRST_NAMES = [
+    "Ramesh", "Sita", "Karan", "Priya", "Baldev", "Lakshmi", "Suresh", "Kamla", "Birsa",
+    "Phoolmati", "Mangal", "Sukhmati", "Jagdish", "Anita", "Raju", "Shanti", "Budhu", "Parvati",
+]
+SURNAMES = [
+    "Gond", "Baiga", "Munda", "Oraon", "Santal", "Majhi", "Naik", "Koya", "Bhil",
+    "Marandi", "Hembram", "Tudu", "Netam", "Markam", "Debbarma", "Reang",
+]
+
+AREA_FORMATS = [
+    "{a} ha",
+    "{a} hectares",
+    "{a} Ha.",
+    "{acres} acres",
+    "{h} ha (habitation), {c} ha (self-cultivation)",
+    "{a}",
+]
+
+
+def _area(rng: random.Random, claim_type: str) -> float:
+    if claim_type == "community":
+        return round(rng.uniform(5, 60), 2)
+    # Mostly small individual holdings, with a tail of suspiciously large/small ones
+    roll = rng.random()
+    if roll < 0.03:
+        return round(rng.uniform(0.01, 0.09), 2)
+    if roll < 0.08:
+        return round(rng.uniform(10, 25), 2)
+    return round(rng.uniform(0.2, 4.0), 2)
+
+
+def area_text(rng: random.Random, area: float) -> str:
+    """Area as a claimant might write it; parse_area_value() reads all of these."""
+    fmt = rng.choice(AREA_FORMATS)
+    habitation = round(min(area, 0.4), 2)
+    return fmt.format(
+        a=area,
+        acres=round(area * 2.471, 2),
+        h=habitation,
+        c=round(max(area - habitation, 0.0), 2),
+    )
+
+
+def generate_villages(count: int, seed: int = 7) -> List[Dict]:
+    """Village master rows with the columns of data/villages.csv."""
+    rng = random.Random(seed)
+    places = [
+        (state, district, tehsil)
+        for state, districts in GEOGRAPHY.items()
+        for district, tehsils in districts.items()
+        for tehsil in tehsils
+    ]
+    villages, seen = [], set()
+    while len(villages) < count:
+        name = rng.choice(VILLAGE_PREFIXES) + rng.choice(VILLAGE_SUFFIXES)
+        if name in seen:
+            # Real masters repeat names across districts; keep them distinct here
+            name = f"{name} {rng.choice(['Khurd', 'Kalan', 'Tola', 'Para'])} {len(villages)}"
+        seen.add(name)
+        state, district, tehsil = rng.choice(places)
+        villages.append({
+            "lgd_code": 400000 + len(villages),
+            "village": name,
+            "tehsil": tehsil,
+            "district": district,
+            "state": state,
+            "latitude": round(rng.uniform(18.0, 24.5), 5),
+            "longitude": round(rng.uniform(78.0, 92.0), 5),
+            "population": rng.randint(150, 4500),
+        })
+    return villages
+
+
+def generate_claims(count: int, villages: List[Dict], seed: int = 11,
+                    now: Optional[datetime] = None) -> List[Dict]:
+    """
+    Claim documents shaped like those stored by POST /claims/, submitted over
+    the three years before `now` (default: the current time).
+    """
+    rng = random.Random(seed)
+    now = now or datetime.now()
+    claims = []
+    for _ in range(count):
+        village = rng.choice(villages)
+        claim_type = "community" if rng.random() < 0.15 else "individual"
+        area = _area(rng, claim_type)
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)}"
+        submitted = now - timedelta(days=rng.randint(0, 3 * 365), minutes=rng.randint(0, 1440))
+        extracted = {
+            "claimant_name": name,
+            "village": village["village"],
+            "tehsil_taluka": village["tehsil"],
+            "district": village["district"],
+            "state": village["state"],
+            "claim_type": claim_type,
+            "area": area_text(rng, area),
+        }
+        claims.append({
+            "claimant_name": name,
+            "state": village["state"],
+            "district": village["district"],
+            "village": village["village"],
+            "claim_type": claim_type,
+            "area": area,
+            "submission_date": submitted,
+            "status": "approved" if rng.random() < 0.4 else "pending",
+            "is_anomaly": False,
+            "extracted_metadata": extracted,
+            "processing_method": "AI text processing",
+            "lgd_code": village["lgd_code"],
+            "created_at": submitted.isoformat(),
+        })
+    return claims
+
+
+def claim_form_text(rng: random.Random, villages: List[Dict]) -> str:
+    """Raw OCR-style text of an FRA Form A claim."""
+    village = rng.choice(villages)
+    claim_type = "community" if rng.random() < 0.15 else "individual"
+    first, surname = rng.choice(FIRST_NAMES), rng.choice(SURNAMES)
+    lines = [
+        "FORM - A  CLAIM FOR RIGHTS TO FOREST LAND",
+        f"Name of the claimant(s): {first} {surname}",
+        f"Name of the spouse: {rng.choice(FIRST_NAMES)} {surname}",
+        f"Name of father/mother: {rng.choice(FIRST_NAMES)} {surname}",
+        f"Address: House {rng.randint(1, 300)}, {village['village']}",
+        f"Village: {village['village']}",
+        f"Gram Panchayat: {village['village']} GP",
+        f"Tehsil/Taluka: {village['tehsil']}",
+        f"District: {village['district']}",
+        f"Claim type: {claim_type}",
+        f"Extent of forest land occupied: {area_text(rng, _area(rng, claim_type))}",
+    ]
+    if rng.random() < 0.5:
+        # State is often left blank on the form
+        lines.insert(-2, f"State: {village['state']}")
+    return "\n".join(lines)
+
+
+def village_analysis_request(rng: random.Random, village: Dict) -> Dict:
+    """Body for POST /dss/analyze about one FRA holder in `village`."""
+    return {
+        "claim_data": {
+            "claimant_name": f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)}",
+            "village": village["village"],
+            "district": village["district"],
+            "state": village["state"],
+            "claim_type": "individual",
+            "area": _area(rng, "individual"),
+            "tribal_status": "ST",
+            "status": "approved",
+        },
+        "village_data": {
+            "name": village["village"],
+            "population": village["population"],
+            "water_index": round(rng.uniform(0.1, 0.9), 2),
+            "forest_cover": round(rng.uniform(0.2, 0.9), 2),
+            "literacy_rate": round(rng.uniform(0.4, 0.85), 2),
+        },
+    }
@@ -0,0 +1,93 @@
+"""
+Micro-benchmark of claim validation: the per-claim model round trip against
+bulk validation with a TypeAdapter over the whole batch.
+
+    cd backend
+    python -m benchmarks.validation --claims 1000,10000 --repeat 5
+
+Each path turns mapped claim fields into validated dicts, as the batch and
+ingest endpoints do before building the stored document. Best-of-repeat
+times are printed; nothing touches the database or the LLM.
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+from typing import Callable, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.models.claim import Claim
+from app.routes.claims import validate_claims
+from benchmarks.synthetic import generate_claims, generate_villages
+
+
+def per_claim_v1(claims_data: List[Dict]) -> List[Dict]:
+    """The previous path: construct a Claim per item, then .dict() it"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        return [Claim(**claim_data).dict() for claim_data in claims_data]
+
+
+def per_claim(claims_data: List[Dict]) -> List[Dict]:
+    return [Claim.model_validate(claim_data).model_dump(mode="python") for claim_data in claims_data]
+
+
+PATHS: Dict[str, Callable[[List[Dict]], List]] = {
+    "per_claim_dict": per_claim_v1,
+    "per_claim_model_dump": per_claim,
+    "bulk_type_adapter": validate_claims,
+}
+
+
+def mapped_claims(count: int, seed: int = 11) -> List[Dict]:
+    """Claim fields as map_extracted_claim produces them (no submission_date)"""
+    villages = generate_villages(100, seed=seed)
+    fields = ("claimant_name", "state", "district", "village", "claim_type", "area", "is_anomaly")
+    return [{field: claim[field] for field in fields} for claim in generate_claims(count, villages, seed=seed)]
+
+
+def best_time(run: Callable[[List[Dict]], List], claims_data: List[Dict], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(claims_data)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(sizes: List[int], repeat: int) -> List[Dict]:
+    results = []
+    for size in sizes:
+        claims_data = mapped_claims(size)
+        baseline = None
+        for name, run in PATHS.items():
+            seconds = best_time(run, claims_data, repeat)
+            baseline = baseline or seconds
+            results.append({
+                "claims": size,
+                "path": name,
+                "ms": round(seconds * 1000, 3),
+                "us_per_claim": round(seconds / size * 1e6, 3),
+                "speedup": round(baseline / seconds, 2),
+            })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare per-claim and bulk claim validation")
+    parser.add_argument("--claims", default="1000,10000", help="Comma-separated batch sizes")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    for row in run_benchmark([int(size) for size in args.claims.split(",")], args.repeat):
+        print(
+            f"{row['claims']:>7} {row['path']:<21} {row['ms']:>10} ms  "
+            f"{row['us_per_claim']:>8} us/claim  x{row['speedup']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Multi-worker deployment: gunicorn managing uvicorn workers.
+
+    cd backend
+    SHARED_STATE_URL=sqlite:////tmp/fra-dss/shared.db gunicorn app.main:app -c gunicorn.conf.py
+
+Each worker is a separate process with its own event loop, Motor client
+(created in the app lifespan) and LLM rate limiter share. Set
+SHARED_STATE_URL so that DSS cache entries, invalidations and locks are
+shared between workers; without it every worker caches on its own.
+
+Environment:
+- WEB_CONCURRENCY: number of workers (default: CPU count)
+- BIND: listen address (default 0.0.0.0:8000)
+- GUNICORN_PRELOAD: "1" imports the app once in the master before forking,
+  sharing read-only memory such as the village index. Clients and
+  background threads are created per worker after fork either way.
+- PROMETHEUS_MULTIPROC_DIR: where workers write metric files for /metrics
+  (default: a fresh temporary directory)
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# Workers read this to split provider rate limits between them
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("GUNICORN_PRELOAD", "0") == "1"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then to bound memory growth
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "5000"))
+max_requests_jitter = 500
+
+# Must be set before prometheus_client is imported by the app
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="fra-dss-metrics-"))
+
+
+def on_starting(server):
+    # Metric files left by a previous run would be summed into this one
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
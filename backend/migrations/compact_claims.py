@@ -0,0 +1,155 @@
+"""
+Rewrite version 1 claim documents into the compact version 2 layout
+(see app/services/claim_schema.py) while the app keeps serving.
+
+    cd backend
+    python -m migrations.compact_claims --batch-size 500 --pause-ms 50
+    python -m migrations.compact_claims --dry-run
+
+Claims are visited in _id order, one batch at a time, with an optional pause
+between batches to leave capacity for live traffic. Each claim is updated
+only if it is still version 1, and its embedded anomaly_details is copied to
+claim_anomalies (keyed by the claim id, so repeating it is harmless) before
+being removed. Progress is checkpointed in the `migrations` collection after
+every batch; an interrupted run resumes from the last migrated _id, and a
+later run picks up claims written by older app versions since.
+
+Space freed inside the collection is reused by WiredTiger; run `compact` on
+the collection to return it to the filesystem.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+import bson
+from pymongo import UpdateOne
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.services.claim_schema import CLAIM_SCHEMA_VERSION, compact_claim, compact_metadata
+
+MIGRATION_ID = "compact_claims_v2"
+
+
+def progress_line(state: Dict, remaining: int, rate: float) -> str:
+    done = state["migrated"]
+    total = done + remaining
+    eta = f"{remaining / rate:.0f}s" if rate else "?"
+    saved = 1 - state["bytes_after"] / state["bytes_before"] if state["bytes_before"] else 0.0
+    return (
+        f"{done}/{total} claims ({done / total:.1%}) {rate:.0f}/s ETA {eta}, "
+        f"{state['anomalies_moved']} anomaly records moved, documents {saved:.1%} smaller"
+        if total else "nothing to migrate"
+    )
+
+
+async def migrate(database, batch_size: int = 500, pause_seconds: float = 0.0, dry_run: bool = False,
+                  restart: bool = False, report: Callable[[str], None] = print) -> Dict:
+    """Run (or resume) the migration; returns the final checkpoint state."""
+    checkpoints = database["migrations"]
+    state: Optional[Dict] = None if restart else await checkpoints.find_one({"_id": MIGRATION_ID})
+    if state is None:
+        state = {
+            "_id": MIGRATION_ID,
+            "last_id": None,
+            "migrated": 0,
+            "anomalies_moved": 0,
+            "bytes_before": 0,
+            "bytes_after": 0,
+            "started_at": datetime.now(),
+        }
+    elif state["last_id"] is not None:
+        report(f"Resuming after _id {state['last_id']} ({state['migrated']} claims already migrated)")
+
+    pending = {"schema_version": {"$exists": False}}
+    if state["last_id"] is not None:
+        pending["_id"] = {"$gt": state["last_id"]}
+    remaining = await database["claims"].count_documents(pending)
+    started, resumed_at = time.perf_counter(), state["migrated"]
+
+    def rate() -> float:
+        elapsed = time.perf_counter() - started
+        return (state["migrated"] - resumed_at) / elapsed if elapsed else 0.0
+
+    while True:
+        query = {"schema_version": {"$exists": False}}
+        if state["last_id"] is not None:
+            query["_id"] = {"$gt": state["last_id"]}
+        batch = await database["claims"].find(query).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        claim_updates, anomaly_records = [], []
+        for document in batch:
+            diff, inherits = compact_metadata(document)
+            update = {"$set": {
+                "extracted_metadata": diff,
+                "metadata_inherits": inherits,
+                "schema_version": CLAIM_SCHEMA_VERSION,
+            }}
+            details = document.get("anomaly_details")
+            if details is not None:
+                update["$unset"] = {"anomaly_details": ""}
+                if isinstance(details, dict):
+                    record = {k: v for k, v in details.items() if k != "_id"}
+                    record.update(claim_id=document["_id"], detected_at=state["started_at"], migrated=True)
+                    anomaly_records.append(UpdateOne({"_id": document["_id"]}, {"$setOnInsert": record}, upsert=True))
+            # Skip claims another process rewrote since they were read
+            claim_updates.append(UpdateOne({"_id": document["_id"], "schema_version": {"$exists": False}}, update))
+            state["bytes_before"] += len(bson.encode(document))
+            state["bytes_after"] += len(bson.encode(compact_claim(document)))
+
+        if not dry_run:
+            # Anomaly records first: a crash in between must not lose them
+            if anomaly_records:
+                await database["claim_anomalies"].bulk_write(anomaly_records, ordered=False)
+            await database["claims"].bulk_write(claim_updates, ordered=False)
+
+        state["last_id"] = batch[-1]["_id"]
+        state["migrated"] += len(batch)
+        state["anomalies_moved"] += len(anomaly_records)
+        state["updated_at"] = datetime.now()
+        remaining = max(0, remaining - len(batch))
+        if not dry_run:
+            await checkpoints.replace_one({"_id": MIGRATION_ID}, state, upsert=True)
+        report(progress_line(state, remaining, rate()))
+        if pause_seconds:
+            await asyncio.sleep(pause_seconds)
+
+    state["completed_at"] = datetime.now()
+    if not dry_run:
+        await checkpoints.replace_one({"_id": MIGRATION_ID}, state, upsert=True)
+    report(("Dry run: " if dry_run else "Done: ") + progress_line(state, 0, rate()))
+    return state
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Rewrite claims into the compact schema version 2 layout")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause-ms", type=float, default=0.0, help="Pause between batches")
+    parser.add_argument("--dry-run", action="store_true", help="Report the savings without writing")
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint")
+    parser.add_argument("--mongo-uri", help="Database URI (default: MONGO_DB_URL, or its alias MONGO_URI, as for the app)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    from dotenv import load_dotenv
+    load_dotenv()
+    from app import database as app_database
+    if args.mongo_uri:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        database = AsyncIOMotorClient(args.mongo_uri).get_default_database(app_database.MONGO_DB_NAME)
+    else:
+        database = app_database.get_database()
+    asyncio.run(migrate(database, args.batch_size, args.pause_ms / 1000, args.dry_run, args.restart))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test batched multi-form claim extraction, per-item retries and bulk claim
+validation
+"""
+
+import asyncio
+import json
+import os
+import re
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+from mongomock_motor import AsyncMongoMockClient
+from pydantic import ValidationError
+
+import app.routes.claims as claims
+from app.routes.claims import openrouter_service
+from app.services.model_router import model_router
+
+
+def make_form(i):
+    return f"FRA Form A. Name: Claimant {i}. Village: Devpur. Tehsil: Shahdol. Claim: individual. Area: {i}.5 ha"
+
+
+def extraction(text):
+    index = int(re.search(r"Claimant (\d+)", text).group(1))
+    return {"claimant_name": f"Claimant {index}", "village": "Devpur", "claim_type": "individual", "area": f"{index}.5 ha"}
+
+
+def test_pack_batches():
+    print("Testing batch packing...")
+    texts = [make_form(i) for i in range(20)]
+    batches = openrouter_service.pack_batches(texts)
+    print(f"   {[len(b) for b in batches]}")
+    assert [i for b in batches for i in b] == list(range(20))
+    assert all(len(b) <= claims.EXTRACTION_BATCH_MAX_ITEMS for b in batches)
+
+    # A form larger than the budget is sent on its own
+    huge = "x" * (claims.EXTRACTION_BATCH_TOKEN_BUDGET * 4)
+    batches = openrouter_service.pack_batches([make_form(0), huge, make_form(2)])
+    assert batches == [[0], [1], [2]]
+    print("✅ Batch packing: SUCCESS")
+
+
+def test_split_batch_response():
+    print("Testing batch response validation...")
+    content = "Here you go:\n" + json.dumps([
+        {"index": 0, "claimant_name": "A"},
+        {"index": 0, "claimant_name": "duplicate"},
+        {"index": "2", "claimant_name": "C"},
+        {"index": 7, "claimant_name": "out of range"},
+        {"claimant_name": "no index"},
+        {"index": 1, "unrelated": True},
+        "not an object",
+    ])
+    parsed = openrouter_service.split_batch_response(content, 3)
+    assert {i: item["claimant_name"] for i, item in parsed.items()} == {0: "A", 2: "C"}
+    assert openrouter_service.split_batch_response("no json here", 3) == {}
+    print("✅ Batch response validation: SUCCESS")
+
+
+def test_batch_extraction_retries_failed_items():
+    print("Testing batched extraction...")
+    texts = [make_form(i) for i in range(10)]
+    requests = []
+
+    def handler(request):
+        content = json.loads(request.content)["messages"][0]["content"]
+        requests.append(content)
+        if "Forms to process" in content:
+            forms = re.findall(r"\[(\d+)\]\n(.*)\n", content)
+            # The model drops the form for Claimant 3
+            items = [{"index": int(i), **extraction(text)} for i, text in forms if "Claimant 3." not in text]
+            answer = json.dumps(items)
+        else:
+            answer = json.dumps(extraction(content))
+        return httpx.Response(200, json={
+            "choices": [{"message": {"content": answer}}],
+            "usage": {"total_tokens": len(content) // 4 + 50 * answer.count("claimant_name")}
+        })
+
+    candidates = model_router.candidates(openrouter_service.task)
+    keys = [c.api_key for c in candidates]
+    for c in candidates:
+        c.api_key = "test-key"
+    original_client = claims.httpx.AsyncClient
+    claims.httpx.AsyncClient = lambda **kwargs: original_client(transport=httpx.MockTransport(handler))
+    try:
+        results, usage = asyncio.run(openrouter_service.extract_claims_batch(texts))
+    finally:
+        claims.httpx.AsyncClient = original_client
+        for c, key in zip(candidates, keys):
+            c.api_key = key
+
+    print(f"   {usage}")
+    assert [r["claimant_name"] for r in results] == [f"Claimant {i}" for i in range(10)]
+    batches = len(openrouter_service.pack_batches(texts))
+    assert usage["batched_calls"] == batches
+    assert usage["individual_retries"] == 1
+    assert usage["llm_calls"] == len(requests) == batches + 1
+    assert usage["calls_per_claim"] < 0.5
+    print("✅ Batched extraction: SUCCESS")
+
+
+def test_bulk_claim_validation():
+    print("Testing bulk claim validation...")
+    fields = {"claimant_name": "Sita Gond", "state": "Madhya Pradesh", "district": "Mandla", "village": "Devpur", "area": 1.5}
+    results = claims.validate_claims([fields, {**fields, "area": "large"}, {**fields, "claim_type": "community"}])
+    assert results[0]["area"] == 1.5 and results[0]["status"] == "pending"
+    assert isinstance(results[0]["submission_date"], claims.datetime)
+    assert isinstance(results[1], ValidationError) and "area" in str(results[1])
+    assert results[2]["claim_type"] == "community"
+    assert claims.validate_claims([]) == []
+
+    # One invalid item in a batch fails alone
+    database = AsyncMongoMockClient()["validation_test"]
+    original = claims.db
+    claims.db = database
+    items = [{"claimant_name": f"Holder {i}", "village": "Devpur", "area": i + 1} for i in range(5)]
+    items[2]["is_anomaly"] = "unsure"
+    try:
+        batch = asyncio.run(claims.process_and_create_claims_batch(claims.ClaimBatchRequest(items=items)))
+        stored = asyncio.run(database["claims"].count_documents({}))
+    finally:
+        claims.db = original
+    assert batch["created"] == 4 and batch["failed"] == 1 and stored == 4
+    assert not batch["results"][2]["success"] and "is_anomaly" in batch["results"][2]["error"]
+    assert [r["index"] for r in batch["results"]] == list(range(5))
+    print("✅ Bulk claim validation: SUCCESS")
+
+
+if __name__ == "__main__":
+    test_pack_batches()
+    test_split_batch_response()
+    test_batch_extraction_retries_failed_items()
+    test_bulk_claim_validation()
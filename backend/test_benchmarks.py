@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test the benchmark suite helpers: synthetic data, mock provider responses and result comparison
+"""
+
+import os
+import random
+import sys
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from benchmarks.compare import compare
+from benchmarks.mock_llm import completion_content
+from benchmarks.run import latency_summary
+from benchmarks.synthetic import area_text, claim_form_text, generate_claims, generate_villages
+from app.models.claim import Claim
+from app.routes.claims import openrouter_service, parse_area_value
+
+
+def test_synthetic_data_is_deterministic_and_valid():
+    print("Testing synthetic claim generator...")
+    villages = generate_villages(50, seed=3)
+    assert villages == generate_villages(50, seed=3)
+    assert len({v["village"] for v in villages}) == 50
+
+    now = datetime(2025, 6, 1, 12, 0)
+    claims = generate_claims(200, villages, seed=5, now=now)
+    assert claims == generate_claims(200, villages, seed=5, now=now)
+    for claim in claims:
+        Claim(**{k: claim[k] for k in Claim.model_fields})
+    assert {c["claim_type"] for c in claims} == {"individual", "community"}
+
+    rng = random.Random(1)
+    for area in (0.05, 2.5, 17.25):
+        text = area_text(rng, area)
+        assert parse_area_value(text) > 0, text
+    print("✅ Synthetic claim generator: SUCCESS")
+
+
+def test_mock_provider_extracts_batched_forms():
+    print("Testing mock provider batch extraction...")
+    villages = generate_villages(20)
+    rng = random.Random(9)
+    texts = [claim_form_text(rng, villages) for _ in range(3)]
+    content = completion_content(openrouter_service._batch_prompt(texts), rng)
+    items = openrouter_service.split_batch_response(content, len(texts))
+    print(f"   {[items[i]['village'] for i in sorted(items)]}")
+    assert sorted(items) == [0, 1, 2]
+    for i, text in enumerate(texts):
+        item = items[i]
+        assert f"Village: {item['village']}" in text
+        assert f"District: {item['district']}" in text
+    print("✅ Mock provider batch extraction: SUCCESS")
+
+
+def test_latency_summary_and_compare():
+    print("Testing result summaries and comparison...")
+    summary = latency_summary([i / 1000 for i in range(1, 101)])
+    assert summary["p50"] == 50.5
+    assert summary["max"] == 100.0
+    assert latency_summary([])["p95"] is None
+
+    def result(p95, rps):
+        return {"latency_ms": {"p50": 10.0, "p95": p95}, "throughput_rps": rps}
+
+    baseline = {(100, "list"): result(20.0, 100.0), (100, "dss"): result(300.0, 10.0)}
+    current = {(100, "list"): result(21.0, 98.0), (100, "dss"): result(450.0, 7.0)}
+    rows = {row["scenario"]: row for row in compare(baseline, current, threshold=0.15)}
+    assert not rows["list"]["regressed"]
+    assert rows["dss"]["regressed"]
+    print("✅ Result summaries and comparison: SUCCESS")
+
+
+if __name__ == "__main__":
+    test_synthetic_data_is_deterministic_and_valid()
+    test_mock_provider_extracts_batched_forms()
+    test_latency_summary_and_compare()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Test the compact claim layout (schema version 2), the anomaly history
+collection and the resumable compaction migration
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import bson
+from bson import ObjectId
+from fastapi import Response
+from mongomock_motor import AsyncMongoMockClient
+
+from app.routes import claims
+from app.services.claim_schema import CLAIM_SCHEMA_VERSION, compact_claim, expand_claim
+from benchmarks.synthetic import generate_claims, generate_villages
+from migrations.compact_claims import migrate
+
+
+def legacy_claims(count=20):
+    villages = generate_villages(10, seed=3)
+    documents = generate_claims(count, villages, seed=4)
+    for i, document in enumerate(documents):
+        document["_id"] = ObjectId()
+        document["extracted_metadata"]["gram_panchayat"] = f"{document['village']} GP"
+        if i % 5 == 0:
+            document["is_anomaly"] = True
+            document["anomaly_details"] = {"claim_id": str(document["_id"]), "confidence": 91, "type": "area"}
+    return documents
+
+
+def test_compact_layout_round_trip():
+    print("Testing compact claim layout...")
+    for document in legacy_claims():
+        compact = compact_claim(document)
+        assert compact["schema_version"] == CLAIM_SCHEMA_VERSION
+        assert "anomaly_details" not in compact
+        # Values equal to the top-level fields are not stored twice
+        assert "claimant_name" not in compact["extracted_metadata"]
+        assert compact["extracted_metadata"]["gram_panchayat"] == document["extracted_metadata"]["gram_panchayat"]
+        assert len(bson.encode(compact)) < len(bson.encode(document))
+        assert expand_claim(compact)["extracted_metadata"] == document["extracted_metadata"]
+        # Version 1 documents are read as they are
+        assert expand_claim(document) is document
+
+    # A value that only differs in type is kept
+    document = {"area": 15.0, "extracted_metadata": {"area": 15, "village": None}, "village": "Unknown"}
+    compact = compact_claim(document)
+    assert compact["extracted_metadata"] == {"area": 15, "village": None}
+    assert expand_claim(compact)["extracted_metadata"] == {"area": 15, "village": None}
+    print("✅ Compact claim layout: SUCCESS")
+
+
+def test_new_claims_are_stored_compact():
+    print("Testing compact claim writes...")
+    database = AsyncMongoMockClient()["schema_test"]
+    original = claims.db, claims.analytics_db
+    claims.db = claims.analytics_db = database
+    extracted = {"claimant_name": "Sita Gond", "village": "Devpur", "gram_panchayat": "Devpur GP", "area": "1.5 ha"}
+
+    async def run():
+        created = await claims.process_and_create_claim(
+            claims.ClaimProcessingRequest(extracted_text=extracted), Response(), idempotency_key=None
+        )
+        stored = await database["claims"].find_one({})
+        listed = await claims.get_all_claims()
+        replay = await claims.process_and_create_claim(
+            claims.ClaimProcessingRequest(extracted_text=extracted), Response(), idempotency_key=None
+        )
+        return created, stored, listed, replay
+
+    try:
+        created, stored, listed, replay = asyncio.run(run())
+    finally:
+        claims.db, claims.analytics_db = original
+    assert stored["schema_version"] == CLAIM_SCHEMA_VERSION
+    assert stored["extracted_metadata"] == {"gram_panchayat": "Devpur GP", "area": "1.5 ha"}
+    assert listed["claims"][0]["extracted_metadata"] == extracted
+    assert created["extracted_data"] == replay["extracted_data"] == extracted
+    print("✅ Compact claim writes: SUCCESS")
+
+
+def test_anomaly_history_collection():
+    print("Testing anomaly history...")
+    database = AsyncMongoMockClient()["schema_test"]
+    original = claims.db, claims.analytics_db
+    claims.db = claims.analytics_db = database
+
+    async def run():
+        claim_id = (await database["claims"].insert_one(compact_claim({
+            "claimant_name": "Sita Gond", "village": "Devpur", "district": "Mandla", "area": 950.0,
+            "extracted_metadata": {"claimant_name": "Sita Gond", "area": "950 ha"}
+        }))).inserted_id
+        original_detect = claims.aiml_service.detect_anomalies
+
+        async def detect(claims_data):
+            # The detector sees the full extracted metadata
+            assert claims_data[0]["extracted_metadata"]["claimant_name"] == "Sita Gond"
+            return {"anomalies": [{"claim_id": str(claim_id), "confidence": 95, "type": "area"}], "summary": {}}
+
+        claims.aiml_service.detect_anomalies = detect
+        try:
+            await claims.detect_claim_anomalies()
+            await claims.detect_claim_anomalies()
+        finally:
+            claims.aiml_service.detect_anomalies = original_detect
+        stored = await database["claims"].find_one({"_id": claim_id})
+        history = await database["claim_anomalies"].count_documents({"claim_id": claim_id})
+        listed = await claims.get_anomalous_claims()
+        return stored, history, listed
+
+    try:
+        stored, history, listed = asyncio.run(run())
+    finally:
+        claims.db, claims.analytics_db = original
+    assert stored["is_anomaly"] and "anomaly_details" not in stored
+    assert history == 2
+    assert listed["count"] == 1
+    assert listed["anomalous_claims"][0]["anomaly_details"]["confidence"] == 95
+    print("✅ Anomaly history: SUCCESS")
+
+
+def test_migration_resumes_and_is_idempotent():
+    print("Testing claim compaction migration...")
+    database = AsyncMongoMockClient()["migration_test"]
+    documents = legacy_claims(23)
+    lines = []
+
+    class Interrupted(Exception):
+        pass
+
+    def interrupt_after_two_batches(line):
+        lines.append(line)
+        if len(lines) == 2:
+            raise Interrupted()
+
+    async def run():
+        await database["claims"].insert_many([dict(d) for d in documents])
+        dry = await migrate(database, batch_size=5, dry_run=True, report=lines.append)
+        assert await database["claims"].count_documents({"schema_version": 2}) == 0
+        lines.clear()
+        try:
+            await migrate(database, batch_size=5, report=interrupt_after_two_batches)
+        except Interrupted:
+            pass
+        partial = await database["claims"].count_documents({"schema_version": 2})
+        resumed = await migrate(database, batch_size=5, report=lines.append)
+        again = await migrate(database, batch_size=5, report=lines.append)
+        stored = {d["_id"]: d async for d in database["claims"].find()}
+        anomalies = await database["claim_anomalies"].count_documents({})
+        return dry, partial, resumed, again, stored, anomalies
+
+    dry, partial, resumed, again, stored, anomalies = asyncio.run(run())
+    assert dry["migrated"] == 23 and dry["bytes_after"] < dry["bytes_before"]
+    assert partial == 10
+    assert any(line.startswith("Resuming after") for line in lines)
+    assert resumed["migrated"] == 23 and again["migrated"] == 23
+    assert anomalies == 5 and resumed["anomalies_moved"] == 5
+    for document in documents:
+        migrated = stored[document["_id"]]
+        assert migrated["schema_version"] == 2 and "anomaly_details" not in migrated
+        assert expand_claim(migrated)["extracted_metadata"] == document["extracted_metadata"]
+    print("✅ Claim compaction migration: SUCCESS")
+
+
+if __name__ == "__main__":
+    test_compact_layout_round_trip()
+    test_new_claims_are_stored_compact()
+    test_anomaly_history_collection()
+    test_migration_resumes_and_is_idempotent()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Test claim search: transliterated and folded search keys, ranking in the
+in-memory index and the /claims/search endpoint
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bson import ObjectId
+from fastapi import HTTPException, Response
+from mongomock_motor import AsyncMongoMockClient
+
+from app.routes import claims
+from app.services import claim_search as search_module
+from app.services.claim_search import ClaimSearchIndex, search_key, to_latin
+
+
+def test_search_keys():
+    print("Testing claim search keys...")
+    same = [
+        ("सीता गोंड", "Seeta Gond", "SITA GOND"),
+        ("कमला", "Kamla", "KAMLA"),
+        ("महेंद्र सिंह", "Mahendra Singh", "Mahendra Sinngh"),
+        ("मंडला", "Mandla", "MANDLA"),
+        ("लक्ष्मी", "Laxmi", "Lakshmi"),
+        ("बिरसा मुंडा", "Birsa Munda", "BIRSA MUNDA"),
+        ("देवपुर", "Devpur", "Dewpur"),
+    ]
+    for variants in same:
+        keys = {search_key(value) for value in variants}
+        assert len(keys) == 1, (variants, keys)
+    assert to_latin("राम") == "raam"
+    assert to_latin("महेंद्र") == "mahendra"
+    assert search_key("Devpur") != search_key("Deopur Kalan")
+    assert search_key(None) == "" and search_key("  ") == ""
+    print("✅ Claim search keys: SUCCESS")
+
+
+def indexed(rows):
+    index = ClaimSearchIndex()
+    ids = []
+    for claimant_name, village, gram_panchayat in rows:
+        claim_id = ObjectId()
+        ids.append(claim_id)
+        index.add(claim_id, {
+            "claimant_name": search_key(claimant_name),
+            "village": search_key(village),
+            "gram_panchayat": search_key(gram_panchayat),
+        })
+    return index, ids
+
+
+def test_index_ranking():
+    print("Testing claim search ranking...")
+    index, ids = indexed([
+        ("Sita Gond", "Devpur", "Devpur GP"),
+        ("Sitaram Netam", "Kanha", "Kanha GP"),
+        ("Site Marandi", "Devpur", "Devpur GP"),
+        ("Ramesh Gond", "Devnagar", "Devnagar GP"),
+    ])
+
+    # Exact beats prefix beats fuzzy
+    ranked = [claim_id for claim_id, _, _ in index.search("Sita", fields=["claimant_name"])]
+    assert ranked[:3] == [ids[0], ids[1], ids[2]], ranked
+    exact, prefix, fuzzy = (score for _, score, _ in index.search("Sita", fields=["claimant_name"])[:3])
+    assert exact > prefix > fuzzy
+
+    # Claims matching every word come first
+    results = index.search("Gond Devpur")
+    assert results[0][0] == ids[0]
+    assert set(results[0][2]) == {"claimant_name", "village", "gram_panchayat"}
+
+    # Field filter and prefix-as-you-type on the last word only
+    assert {claim_id for claim_id, _, _ in index.search("Devn", fields=["village"], fuzzy=False)} == {ids[3]}
+    assert index.search("Devpur", fields=["claimant_name"], fuzzy=False) == []
+    assert [claim_id for claim_id, _, _ in index.search("Devnagr Ramesh", fuzzy=False)] == [ids[3]]
+
+    # Misspelling in Devanagari and Latin
+    assert index.search("सीता गोंड")[0][0] == ids[0]
+    assert index.search("Seeta Gondh")[0][0] == ids[0]
+    assert index.search("Marandy", limit=1)[0][0] == ids[2]
+    assert index.search("Bhopal", fuzzy=False) == []
+    print("✅ Claim search ranking: SUCCESS")
+
+
+def run_with_mock_database(scenario):
+    database = AsyncMongoMockClient()["claim_search_test"]
+    original = claims.db, claims.analytics_db, search_module.analytics_db, claims.claim_search
+    claims.db = claims.analytics_db = search_module.analytics_db = database
+    claims.claim_search = ClaimSearchIndex()
+
+    async def run():
+        await claims.ensure_claim_indexes()
+        return await scenario(database)
+
+    try:
+        return asyncio.run(run())
+    finally:
+        claims.db, claims.analytics_db, search_module.analytics_db, claims.claim_search = original
+
+
+async def submit(extracted_text):
+    return await claims.process_and_create_claim(
+        claims.ClaimProcessingRequest(extracted_text=extracted_text), Response(), idempotency_key=None
+    )
+
+
+def test_search_endpoint():
+    print("Testing /claims/search...")
+
+    async def scenario(database):
+        created = await submit({
+            "claimant_name": "Sita Gond", "village": "Devpur", "gram_panchayat": "Devpur GP",
+            "district": "Mandla", "state": "Madhya Pradesh", "area": "1.5 ha",
+        })
+        await submit({"claimant_name": "Kamla Baiga", "village": "Kanha", "district": "Mandla", "area": 2})
+        await claims.claim_search.refresh()
+        stored = await database["claims"].find_one({"_id": ObjectId(created["claim_id"])})
+
+        by_script = await claims.search_claims(q="सीता गोंड", field=None, limit=20, fuzzy=True)
+        misspelt = await claims.search_claims(q="Seeta Gondh", field=None, limit=20, fuzzy=True)
+        by_panchayat = await claims.search_claims(q="devpur gp", field="gram_panchayat", limit=20, fuzzy=True)
+
+        # An older claim (written without search_keys) inserted late, within the overlap window
+        await database["claims"].insert_one({
+            "_id": ObjectId.from_datetime(datetime.now() - timedelta(seconds=60)),
+            "claimant_name": "लक्ष्मी मरांडी", "village": "Kenpur", "district": "Mandla",
+            "state": "Madhya Pradesh", "area": 1.0, "claim_type": "individual", "status": "pending",
+        })
+        await claims.claim_search.refresh()
+        late = await claims.search_claims(q="Laxmi", field=None, limit=20, fuzzy=True)
+        try:
+            await claims.search_claims(q="Sita", field="district", limit=20, fuzzy=True)
+            bad_field = None
+        except HTTPException as e:
+            bad_field = e.status_code
+        return created, stored, by_script, misspelt, by_panchayat, late, bad_field
+
+    created, stored, by_script, misspelt, by_panchayat, late, bad_field = run_with_mock_database(scenario)
+    assert stored["search_keys"] == {"claimant_name": "sita gond", "village": "devpur", "gram_panchayat": "devpur gp"}
+    assert by_script["search_key"] == "sita gond"
+    assert by_script["results"][0]["_id"] == created["claim_id"]
+    assert by_script["results"][0]["matched_fields"] == ["claimant_name"]
+    assert by_script["results"][0]["extracted_metadata"]["gram_panchayat"] == "Devpur GP"
+    assert misspelt["results"][0]["_id"] == created["claim_id"]
+    assert [claim["claimant_name"] for claim in by_panchayat["results"]] == ["Sita Gond"]
+    assert [claim["claimant_name"] for claim in late["results"]] == ["लक्ष्मी मरांडी"]
+    assert late["count"] == 1
+    assert bad_field == 400
+    print("✅ /claims/search: SUCCESS")
+
+
+def test_background_refresh_edits_and_deletes():
+    print("Testing the background index refresh, edits and deletes...")
+    original_refresh, original_rebuild = search_module.CLAIM_SEARCH_REFRESH_SECONDS, search_module.CLAIM_SEARCH_REBUILD_SECONDS
+    search_module.CLAIM_SEARCH_REFRESH_SECONDS = 0.02
+    search_module.CLAIM_SEARCH_REBUILD_SECONDS = 0
+
+    async def names(q):
+        found = await claims.search_claims(q=q, field="claimant_name", limit=20, fuzzy=False)
+        return [claim["claimant_name"] for claim in found["results"]]
+
+    async def scenario(database):
+        sita = await submit({"claimant_name": "Sita Gond", "village": "Devpur", "district": "Mandla", "area": 1})
+        kamla = await submit({"claimant_name": "Kamla Baiga", "village": "Kanha", "district": "Mandla", "area": 2})
+        # Searches do not load the index themselves
+        before_start = await names("Sita")
+        claims.claim_search.start()
+        try:
+            for _ in range(100):
+                if len(claims.claim_search) == 2:
+                    break
+                await asyncio.sleep(0.01)
+            started = await names("Sita")
+
+            await database["claims"].delete_one({"_id": ObjectId(sita["claim_id"])})
+            await database["claims"].update_one(
+                {"_id": ObjectId(kamla["claim_id"])},
+                {"$set": {"claimant_name": "Kamla Netam", "search_keys.claimant_name": search_key("Kamla Netam")}},
+            )
+            await asyncio.sleep(0.1)
+            # Refreshes only add claims; deleted documents are skipped when read
+            deleted = await names("Sita")
+            stale = await names("Baiga"), await names("Netam")
+        finally:
+            await claims.claim_search.stop()
+        await claims.claim_search.rebuild()
+        rebuilt = await names("Baiga"), await names("Netam")
+        return before_start, started, deleted, stale, rebuilt, len(claims.claim_search)
+
+    try:
+        before_start, started, deleted, stale, rebuilt, size = run_with_mock_database(scenario)
+    finally:
+        search_module.CLAIM_SEARCH_REFRESH_SECONDS, search_module.CLAIM_SEARCH_REBUILD_SECONDS = original_refresh, original_rebuild
+    assert before_start == [] and started == ["Sita Gond"]
+    assert deleted == []
+    assert stale == (["Kamla Netam"], [])
+    assert rebuilt == ([], ["Kamla Netam"]) and size == 1
+    print("✅ Background index refresh, edits and deletes: SUCCESS")
+
+
+if __name__ == "__main__":
+    test_search_keys()
+    test_index_ranking()
+    test_search_endpoint()
+    test_background_refresh_edits_and_deletes()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Test MongoDB settings, client lifecycle and connection pool metrics
+"""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from prometheus_client import REGISTRY
+
+import app.database as database
+from app.services.metrics import mongo_pool_listener
+
+
+def test_settings_from_environment():
+    print("Testing database settings...")
+    overrides = {
+        "MONGO_MAX_POOL_SIZE": "300",
+        "MONGO_MIN_POOL_SIZE": "20",
+        "MONGO_READ_PREFERENCE": "secondaryPreferred",
+        "MONGO_COMPRESSORS": "zlib",
+    }
+    previous = {key: os.environ.get(key) for key in overrides}
+    os.environ.update(overrides)
+    try:
+        options = database.client_options()
+        settings = database.settings()
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+    assert options["maxPoolSize"] == 300
+    assert options["minPoolSize"] == 20
+    assert options["readPreference"] == "secondaryPreferred"
+    assert options["compressors"] == "zlib"
+    assert "event_listeners" not in settings
+    assert settings["hosts"] == ["localhost:27017"]
+    print("✅ Database settings: SUCCESS")
+
+
+def test_lazy_client_and_close():
+    print("Testing client lifecycle...")
+    asyncio.run(database.close())
+    assert database.client is None
+
+    # The proxy creates the client on first use, without connecting
+    collection = database.db["claims"]
+    assert collection.name == "claims"
+    assert database.client is not None
+    assert database.db.name == database.MONGO_DB_NAME
+
+    asyncio.run(database.close())
+    assert database.client is None
+    print("✅ Client lifecycle: SUCCESS")
+
+
+def test_warmup_failure_does_not_block_startup():
+    print("Testing warm-up against an unreachable server...")
+    original_uri = database.MONGO_URI
+    database.MONGO_URI = "mongodb://127.0.0.1:1/FRA_DB"
+    os.environ["MONGO_SERVER_SELECTION_TIMEOUT_MS"] = "200"
+    try:
+        asyncio.run(database.connect())
+        assert database.client is not None
+    finally:
+        asyncio.run(database.close())
+        database.MONGO_URI = original_uri
+        os.environ.pop("MONGO_SERVER_SELECTION_TIMEOUT_MS")
+    print("✅ Warm-up against an unreachable server: SUCCESS")
+
+
+def test_analytics_read_preference():
+    print("Testing analytics read preference...")
+    os.environ["MONGO_ANALYTICS_READ_PREFERENCE"] = "secondary"
+    os.environ["MONGO_ANALYTICS_MAX_STALENESS_SECONDS"] = "150"
+    try:
+        preference = database.analytics_read_preference()
+        assert preference.document == {"mode": "secondary", "maxStalenessSeconds": 150}
+        asyncio.run(database.close())
+        assert database.analytics_db["claims"].read_preference == preference
+        # Writes and the default database stay on the primary
+        assert database.db["claims"].read_preference.document == {"mode": "primary"}
+
+        os.environ["MONGO_ANALYTICS_READ_PREFERENCE"] = "secondaryish"
+        try:
+            database.analytics_read_preference()
+            assert False, "unknown read preference accepted"
+        except ValueError:
+            pass
+    finally:
+        asyncio.run(database.close())
+        os.environ.pop("MONGO_ANALYTICS_READ_PREFERENCE")
+        os.environ.pop("MONGO_ANALYTICS_MAX_STALENESS_SECONDS")
+    print("✅ Analytics read preference: SUCCESS")
+
+
+def test_dashboard_reads_use_analytics_database():
+    print("Testing dashboard read routing...")
+    from mongomock_motor import AsyncMongoMockClient
+    from app.routes import claims
+
+    primary, replica = AsyncMongoMockClient()["primary"], AsyncMongoMockClient()["replica"]
+    original = claims.db, claims.analytics_db
+    claims.db, claims.analytics_db = primary, replica
+
+    async def run():
+        await replica["claims"].insert_one({"claimant_name": "Sita Gond", "district": "Mandla", "is_anomaly": True})
+        statistics = await claims.get_claims_statistics()
+        anomalies = await claims.get_anomalous_claims()
+        export = await claims.get_all_claims()
+        return statistics, anomalies, export
+
+    try:
+        statistics, anomalies, export = asyncio.run(run())
+    finally:
+        claims.db, claims.analytics_db = original
+    assert statistics["statistics"]["total_claims"] == 1
+    assert anomalies["count"] == 1
+    assert export["count"] == 1
+    print("✅ Dashboard read routing: SUCCESS")
+
+
+def test_pool_metrics():
+    print("Testing pool metrics...")
+    address = ("db-test", 27017)
+    labels = {"address": "db-test:27017"}
+
+    def sample(name):
+        return REGISTRY.get_sample_value(name, labels) or 0.0
+
+    event = SimpleNamespace(address=address, connection_id=1, reason="timeout")
+    mongo_pool_listener.connection_created(event)
+    mongo_pool_listener.connection_check_out_started(event)
+    assert sample("mongodb_pool_wait_queue") == 1
+    mongo_pool_listener.connection_checked_out(event)
+    assert sample("mongodb_pool_connections") == 1
+    assert sample("mongodb_pool_connections_in_use") == 1
+    assert sample("mongodb_pool_wait_queue") == 0
+
+    mongo_pool_listener.connection_checked_in(event)
+    mongo_pool_listener.connection_check_out_started(event)
+    mongo_pool_listener.connection_check_out_failed(event)
+    assert sample("mongodb_pool_connections_in_use") == 0
+    assert sample("mongodb_pool_wait_queue") == 0
+    assert REGISTRY.get_sample_value(
+        "mongodb_pool_checkout_failures_total", {"address": "db-test:27017", "reason": "timeout"}
+    ) == 1
+    mongo_pool_listener.connection_closed(event)
+    assert sample("mongodb_pool_connections") == 0
+    print("✅ Pool metrics: SUCCESS")
+
+
+if __name__ == "__main__":
+    test_settings_from_environment()
+    test_lazy_client_and_close()
+    test_warmup_failure_does_not_block_startup()
+    test_analytics_read_preference()
+    test_dashboard_reads_use_analytics_database()
+    test_pool_metrics()
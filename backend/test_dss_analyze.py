@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Test /dss/analyze: memoisation, TTL cache, parallel analyzers and SSE streaming
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+from fastapi import Response
+
+import app.routes.dss as dss
+from app.routes.dss import DSSAnalysisRequest, analyze_dss_recommendations, invalidate_recommendation_cache
+from app.services.cache import TTLCache, fingerprint, recommendation_cache
+
+
+def test_fingerprint_is_canonical():
+    print("Testing fingerprint...")
+    assert fingerprint({"a": 1, "b": [1, 2]}) == fingerprint({"b": [1, 2], "a": 1})
+    assert fingerprint({"a": 1}) != fingerprint({"a": 2})
+    print("✅ Fingerprint: SUCCESS")
+
+
+def test_ttl_and_tags():
+    print("Testing TTL cache...")
+    cache = TTLCache(ttl_seconds=0.05, max_entries=2)
+
+    async def run():
+        await cache.set("k1", 1, tags=["devpur"])
+        await cache.set("k2", 2, tags=["kanha"])
+        assert await cache.get("k1") == 1
+
+        assert await cache.invalidate_tag("devpur") == 1
+        assert await cache.get("k1") is None
+
+        await cache.set("k3", 3)
+        await cache.set("k4", 4)
+        assert await cache.get("k2") is None  # evicted, max_entries=2
+
+        time.sleep(0.06)
+        assert await cache.get("k4") is None  # expired
+
+    asyncio.run(run())
+    print(f"   {cache.stats()}")
+    print("✅ TTL cache: SUCCESS")
+
+
+def test_analyze_cache_hits():
+    print("Testing /dss/analyze memoisation...")
+    asyncio.run(recommendation_cache.clear())
+    request = DSSAnalysisRequest(
+        claim_data={"claimant_name": "Karan Singh", "village": "Devpur", "claim_type": "individual"},
+        schemes_data=[{"id": "dajgua"}, {"id": "mgnrega"}],
+    )
+
+    async def run():
+        first_response, second_response = Response(), Response()
+        first = await analyze_dss_recommendations(request, first_response)
+        second = await analyze_dss_recommendations(request, second_response)
+        assert first_response.headers["X-DSS-Cache"] == "MISS"
+        assert second_response.headers["X-DSS-Cache"] == "HIT"
+        assert [r.id for r in first] == [r.id for r in second]
+
+        invalidated = await invalidate_recommendation_cache(village="devpur")
+        assert invalidated["invalidated"] == 1
+
+        third_response = Response()
+        await analyze_dss_recommendations(request, third_response)
+        assert third_response.headers["X-DSS-Cache"] == "MISS"
+
+    asyncio.run(run())
+    print("✅ /dss/analyze memoisation: SUCCESS")
+
+
+def test_parallel_analyzers_partial_results():
+    print("Testing parallel analyzers with a slow branch...")
+    asyncio.run(recommendation_cache.clear())
+    request = DSSAnalysisRequest(
+        claim_data={"village": "Kanha", "claim_type": "community"},
+        village_data={"name": "Kanha", "water_index": 0.2},
+        schemes_data=[{"id": "jal_shakti"}],
+    )
+
+    async def slow_interventions(village_data, claims_data):
+        await asyncio.sleep(1)
+        return []
+
+    original = dss.aiml_service.prioritize_interventions
+    original_timeout = dss.INTERVENTION_ANALYSIS_TIMEOUT
+    dss.aiml_service.prioritize_interventions = slow_interventions
+    dss.INTERVENTION_ANALYSIS_TIMEOUT = 0.05
+    try:
+        response = Response()
+        start = time.perf_counter()
+        recommendations = asyncio.run(analyze_dss_recommendations(request, response))
+        elapsed = time.perf_counter() - start
+    finally:
+        dss.aiml_service.prioritize_interventions = original
+        dss.INTERVENTION_ANALYSIS_TIMEOUT = original_timeout
+
+    print(f"   Server-Timing: {response.headers['Server-Timing']} ({elapsed:.2f}s)")
+    assert elapsed < 0.5
+    assert response.headers["X-DSS-Partial"] == "interventions"
+    assert [r.matched_rule for r in recommendations] == ["jal-shakti-low-water-index"]
+    assert recommendation_cache.stats()["entries"] == 0  # partial results are not memoised
+    print("✅ Parallel analyzers: SUCCESS")
+
+
+def test_unparsed_interventions_not_cached():
+    print("Testing unparseable intervention output...")
+    asyncio.run(recommendation_cache.clear())
+    request = DSSAnalysisRequest(
+        claim_data={"village": "Baihar", "claim_type": "individual"},
+        village_data={"name": "Baihar", "water_index": 0.6},
+        schemes_data=[],
+    )
+
+    def handler(request):
+        return httpx.Response(200, json={"choices": [{"message": {"content": "Prioritise water first."}}]})
+
+    original_client = dss.httpx.AsyncClient
+    dss.httpx.AsyncClient = lambda **kwargs: original_client(transport=httpx.MockTransport(handler))
+    candidates = dss.model_router.candidates(dss.aiml_service.task)
+    original_keys = [candidate.api_key for candidate in candidates]
+    for candidate in candidates:
+        candidate.api_key = candidate.api_key or "test-key"
+
+    try:
+        response = Response()
+        recommendations = asyncio.run(analyze_dss_recommendations(request, response))
+    finally:
+        dss.httpx.AsyncClient = original_client
+        for candidate, key in zip(candidates, original_keys):
+            candidate.api_key = key
+
+    assert [r.id for r in recommendations] == ["ai-intervention-fallback"]
+    assert response.headers["X-DSS-Degraded"] == "interventions"
+    assert recommendation_cache.stats()["entries"] == 0
+    print("✅ Unparseable intervention output: SUCCESS")
+
+
+def test_streaming_recommendations():
+    print("Testing SSE recommendations...")
+    asyncio.run(recommendation_cache.clear())
+    request = DSSAnalysisRequest(
+        claim_data={"village": "Sonpur", "claim_type": "individual"},
+        village_data={"name": "Sonpur", "water_index": 0.7},
+        schemes_data=[{"id": "dajgua"}],
+    )
+
+    # Streamed completion that splits array elements across chunks
+    content = '```json\n[{"title": "Check dams", "priority": "High"}, {"title": "School repair"}]\n```'
+    chunks = [content[i:i + 7] for i in range(0, len(content), 7)]
+    body = "".join(
+        "data: " + json.dumps({"choices": [{"delta": {"content": c}}]}) + "\n\n" for c in chunks
+    ) + "data: [DONE]\n\n"
+
+    def handler(request):
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, text=body)
+
+    original_client = dss.httpx.AsyncClient
+    dss.httpx.AsyncClient = lambda **kwargs: original_client(transport=httpx.MockTransport(handler))
+    # Only candidates with an API key are called
+    candidates = dss.model_router.candidates(dss.aiml_service.task)
+    original_keys = [candidate.api_key for candidate in candidates]
+    for candidate in candidates:
+        candidate.api_key = candidate.api_key or "test-key"
+
+    async def collect():
+        response = await dss.stream_dss_recommendations(request)
+        return [chunk async for chunk in response.body_iterator]
+
+    try:
+        events = asyncio.run(collect())
+    finally:
+        dss.httpx.AsyncClient = original_client
+        for candidate, key in zip(candidates, original_keys):
+            candidate.api_key = key
+
+    names = [e.split("\n")[0][len("event: "):] for e in events]
+    print(f"   events={names}")
+    assert names == ["recommendation", "recommendation", "recommendation", "done"]
+    assert json.loads(events[0].split("data: ")[1])["matched_rule"] == "dajgua-individual-holder"
+    assert json.loads(events[2].split("data: ")[1])["title"] == "School repair"
+    assert json.loads(events[3].split("data: ")[1])["partial"] is False
+    print("✅ SSE recommendations: SUCCESS")
+
+
+def test_streaming_fails_over_before_first_chunk():
+    print("Testing SSE failover...")
+    asyncio.run(recommendation_cache.clear())
+    request = DSSAnalysisRequest(
+        claim_data={"village": "Rampur", "claim_type": "community"},
+        village_data={"name": "Rampur", "water_index": 0.4},
+    )
+    content = '[{"title": "Fodder bank", "priority": "Medium"}]'
+    body = "data: " + json.dumps({"choices": [{"delta": {"content": content}}]}) + "\n\ndata: [DONE]\n\n"
+    calls = []
+
+    def handler(request):
+        model = json.loads(request.content)["model"]
+        calls.append(model)
+        if model == primary.model:
+            return httpx.Response(503, text="overloaded")
+        return httpx.Response(200, text=body)
+
+    original_client = dss.httpx.AsyncClient
+    dss.httpx.AsyncClient = lambda **kwargs: original_client(transport=httpx.MockTransport(handler))
+    all_candidates = dss.model_router.candidates(dss.aiml_service.task)
+    original = [(c.api_key, list(c.outcomes)) for c in all_candidates]
+    for candidate in all_candidates:
+        candidate.api_key = candidate.api_key or "test-key"
+    primary = dss.model_router.rank(dss.aiml_service.task)[0]
+
+    async def collect():
+        response = await dss.stream_dss_recommendations(request)
+        return [chunk async for chunk in response.body_iterator]
+
+    try:
+        events = asyncio.run(collect())
+    finally:
+        dss.httpx.AsyncClient = original_client
+        for candidate, (key, outcomes) in zip(all_candidates, original):
+            candidate.api_key = key
+            candidate.outcomes.clear()
+            candidate.outcomes.extend(outcomes)
+            dss.get_provider(candidate.provider).breaker.record_success()
+
+    names = [e.split("\n")[0][len("event: "):] for e in events]
+    print(f"   calls={calls} events={names}")
+    assert calls[0] == primary.model and len(calls) == 2
+    assert names == ["recommendation", "done"]
+    assert json.loads(events[0].split("data: ")[1])["title"] == "Fodder bank"
+    assert json.loads(events[1].split("data: ")[1])["partial"] is False
+    print("✅ SSE failover: SUCCESS")
+
+
+if __name__ == "__main__":
+    test_fingerprint_is_canonical()
+    test_ttl_and_tags()
+    test_analyze_cache_hits()
+    test_parallel_analyzers_partial_results()
+    test_unparsed_interventions_not_cached()
+    test_streaming_recommendations()
+    test_streaming_fails_over_before_first_chunk()
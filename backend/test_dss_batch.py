@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Test district batch DSS analysis: the vectorised intervention table
+(scores, eligible holders per rule, forest rows, ranking) and the endpoint
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient
+
+from app.routes import dss
+
+SCHEMES = [
+    {"id": "water", "rules": [{
+        "id": "water-low",
+        "when": {"field": "water_index", "op": "lt", "value": 0.4},
+        "recommendation": {"title": "Check dams", "priority": "High", "reasoning": "Low water index"},
+    }]},
+    {"id": "land", "rules": [
+        {
+            "id": "land-small",
+            "when": {"all": [
+                {"field": "claim_type", "op": "eq", "value": "individual"},
+                {"field": "area", "op": "lt", "value": 2},
+            ]},
+            "recommendation": {"title": "Land development", "priority": "Medium"},
+        },
+        {
+            "id": "land-community",
+            "when": {"field": "claim_type", "op": "eq", "value": "community"},
+            "recommendation": {"title": "Community forest plan", "priority": "Low"},
+        },
+    ]},
+]
+
+HOLDERS = [
+    {"village": "Devpur", "claim_type": "individual", "area": 1.0, "is_anomaly": True},
+    {"village": "Devpur", "claim_type": "individual", "area": 3.0, "is_anomaly": False},
+    {"village": "Devpur", "claim_type": "community", "area": 5.0, "is_anomaly": False},
+    {"village": "Kanha", "claim_type": "individual", "area": 1.5, "is_anomaly": False},
+    {"village": "Kanha", "claim_type": "individual", "area": 0.5, "is_anomaly": False},
+]
+
+VILLAGE_STATS = [
+    {"village": "Devpur", "total_claims": 3, "anomaly_claims": 1, "individual_claims": 2,
+     "community_claims": 1, "total_area": 9.0},
+    {"village": "Kanha", "total_claims": 2, "anomaly_claims": 0, "individual_claims": 2,
+     "community_claims": 0, "total_area": 2.0},
+]
+
+CONTEXT = {
+    "Devpur": {"water_index": 0.3, "forest_cover": 0.7, "population": 500},
+    "Kanha": {"water_index": 0.8, "forest_cover": 0.5, "population": 900},
+}
+
+
+def summary(table):
+    return [(row["rank"], row["village"], row["matched_rule"], row["priority"], row["eligible_holders"], row["score"])
+            for row in table]
+
+
+def test_intervention_table():
+    print("Testing the intervention table...")
+    holders = HOLDERS + [{"village": "Elsewhere", "claim_type": "individual", "area": 1.0}]
+    table = dss.build_intervention_table(VILLAGE_STATS, holders, CONTEXT, SCHEMES)
+    for row in summary(table):
+        print(f"   {row}")
+    # High before Medium before Low, then by score; anomalies discount the score
+    assert summary(table) == [
+        (1, "Devpur", None, "High", 3, 6.3),                 # forest cover 0.7 x 3 claims x High
+        (2, "Devpur", "water-low", "High", 3, 6.0),          # 3 x 3 holders x (1 - 1/3)
+        (3, "Kanha", "land-small", "Medium", 2, 4.0),
+        (4, "Devpur", "land-small", "Medium", 1, 1.333),
+        (5, "Devpur", "land-community", "Low", 1, 0.667),
+    ]
+    forest, water = table[0], table[1]
+    assert forest["intervention"] == "Forest Conservation" and forest["scheme_id"] is None
+    assert water["intervention"] == "Check dams" and water["scheme_id"] == "water"
+    assert water["anomaly_rate"] == 33.33 and water["total_area"] == 9.0 and water["population"] == 500
+    print("✅ Intervention table: SUCCESS")
+
+
+def test_rules_see_every_claim_field():
+    print("Testing batch rules on fields outside the village stats...")
+    schemes = [{"id": "review", "rules": [
+        {"id": "review-open", "when": {"all": [
+            {"field": "status", "op": "ne", "value": "rejected"},
+            {"field": "state", "op": "eq", "value": "Madhya Pradesh"},
+            {"field": "is_anomaly", "op": "eq", "value": False},
+        ]}, "recommendation": {"title": "Field review", "priority": "Medium"}},
+    ]}]
+    statuses = ["pending", "rejected", "approved", "pending", "rejected"]
+    holders = [dict(h, status=s, state="Madhya Pradesh", district="Testpur") for h, s in zip(HOLDERS, statuses)]
+    database = AsyncMongoMockClient()["dss_batch_fields_test"]
+    original = dss.analytics_db
+    dss.analytics_db = database
+
+    async def run():
+        await database["claims"].insert_many([dict(h) for h in holders])
+        return await dss.analyze_district_batch(dss.DSSBatchRequest(district="Testpur", schemes_data=schemes))
+
+    try:
+        result = asyncio.run(run())
+    finally:
+        dss.analytics_db = original
+    assert dss.batch_holder_fields(schemes) == ["area", "claim_type", "is_anomaly", "state", "status", "village"]
+
+    # The same count as evaluating each claim on its own, as /dss/analyze does
+    engine = dss.get_engine(schemes)
+    expected = {}
+    for holder in holders:
+        if engine.match_record(holder):
+            expected[holder["village"]] = expected.get(holder["village"], 0) + 1
+    eligible = {row["village"]: row["eligible_holders"] for row in result["interventions"] if row["matched_rule"]}
+    assert eligible == expected == {"Devpur": 1, "Kanha": 1}, eligible
+    print("✅ Batch rules on every claim field: SUCCESS")
+
+
+def test_batch_endpoint():
+    print("Testing /dss/batch-analysis...")
+    database = AsyncMongoMockClient()["dss_batch_test"]
+    original = dss.analytics_db
+    dss.analytics_db = database
+
+    async def run():
+        try:
+            await dss.analyze_district_batch(dss.DSSBatchRequest())
+            missing = None
+        except HTTPException as e:
+            missing = e.status_code
+        await database["claims"].insert_many([dict(h, district="Testpur") for h in HOLDERS])
+        await database["claims"].insert_one({"village": "Devpur", "district": "Otherpur",
+                                             "claim_type": "individual", "area": 1.0})
+        result = await dss.analyze_district_batch(dss.DSSBatchRequest(district="Testpur", schemes_data=SCHEMES))
+        return missing, result
+
+    try:
+        missing, result = asyncio.run(run())
+    finally:
+        dss.analytics_db = original
+    assert missing == 400
+    assert result["success"] and result["source"] == "database"
+    assert result["villages_analyzed"] == 2 and result["claims_analyzed"] == 5
+    eligible = {(row["village"], row["matched_rule"]): row["eligible_holders"] for row in result["interventions"]}
+    assert eligible[("Kanha", "land-small")] == 2
+    assert eligible[("Devpur", "land-small")] == 1
+    assert eligible[("Devpur", "land-community")] == 1
+    assert [row["rank"] for row in result["interventions"]] == list(range(1, result["count"] + 1))
+    print("✅ /dss/batch-analysis: SUCCESS")
+
+
+if __name__ == "__main__":
+    test_intervention_table()
+    test_rules_see_every_claim_field()
+    test_batch_endpoint()
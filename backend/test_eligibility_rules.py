@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test the compiled scheme eligibility rule engine
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.eligibility import EligibilityEngine, SCHEMES, compile_condition, get_engine, validate_schemes
+
+
+def test_condition_compilation():
+    print("Testing condition compilation...")
+    columns = {
+        "claim_type": np.array(["individual", "community", "individual", None], dtype=object),
+        "water_index": np.array([0.2, 0.5, np.nan, 0.1]),
+    }
+    predicate = compile_condition({"all": [
+        {"field": "claim_type", "op": "eq", "value": "individual"},
+        {"not": {"field": "water_index", "op": "gte", "value": 0.4}},
+    ]})
+    mask = predicate(columns, 4)
+    print(f"   mask={mask}")
+    assert mask.tolist() == [True, False, True, False]
+
+    # Missing columns never match comparisons
+    assert not compile_condition({"field": "house_type", "op": "in", "value": ["kutcha"]})(columns, 4).any()
+    print("✅ Condition compilation: SUCCESS")
+
+
+def test_single_holder_matches():
+    print("Testing single holder matches...")
+    engine = EligibilityEngine(SCHEMES)
+
+    matched = [rule.id for rule in engine.match_record({"claim_type": "individual", "village": "Devpur", "water_index": 0.7})]
+    print(f"   {matched}")
+    assert matched == ["dajgua-individual-holder", "mgnrega-rural-household"]
+
+    matched = [rule.id for rule in engine.match_record({"claim_type": "community", "village": "Drypur"})]
+    assert matched == ["jal-shakti-drought-keyword", "mgnrega-rural-household"]
+    print("✅ Single holder matches: SUCCESS")
+
+
+def test_published_rules_are_used():
+    print("Testing rules supplied with schemes...")
+    custom = [{
+        "id": "custom",
+        "rules": [{"id": "custom-large-area", "when": {"field": "area", "op": "gt", "value": 4},
+                   "recommendation": {"title": "Custom"}}],
+    }]
+    engine = get_engine(custom)
+    assert [rule.id for rule in engine.rules] == ["custom-large-area"]
+    assert get_engine(custom) is engine  # compiled once
+
+    # Schemes without rules fall back to the built-in rules for that id
+    assert [rule.scheme_id for rule in get_engine([{"id": "mgnrega"}]).rules] == ["mgnrega"]
+    print("✅ Rules supplied with schemes: SUCCESS")
+
+
+def test_vectorised_evaluation():
+    print("Testing vectorised evaluation...")
+    size = 1_000_000
+    rng = np.random.default_rng(42)
+    columns = {
+        "claim_type": rng.choice(np.array(["individual", "community"], dtype=object), size),
+        "water_index": rng.random(size),
+        "village": np.full(size, "Devpur", dtype=object),
+    }
+    engine = EligibilityEngine(SCHEMES)
+
+    start = time.perf_counter()
+    results = engine.evaluate_schemes(columns)
+    elapsed = time.perf_counter() - start
+    print(f"   {size:,} holders x {len(engine.rules)} rules in {elapsed:.3f}s")
+
+    assert results["mgnrega"]["eligible"].all()
+    assert (results["dajgua"]["eligible"] == (columns["claim_type"] == "individual")).all()
+    assert set(results["dajgua"]["matched_rule"][results["dajgua"]["eligible"]]) == {"dajgua-individual-holder"}
+    print("✅ Vectorised evaluation: SUCCESS")
+
+
+
+def test_client_schemes_are_validated():
+    print("Testing validation of client-supplied schemes...")
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    assert validate_schemes(SCHEMES) is SCHEMES
+    assert validate_schemes([{"id": "dajgua"}, {"name": "no rules, no id"}]) is not None
+    bad = [
+        ([{"rules": [{"id": "r1", "when": {"field": "area", "op": "lt", "value": 2}}]}], "needs an id"),
+        ([{"id": "s", "rules": [{"id": "r2", "when": {"all": [{"field": "area", "op": "like", "value": 2}]}}]}],
+         "schemes_data[0].rules[0].when.all[0].op (rule 'r2')"),
+        ([{"id": "s", "rules": [{"when": {"field": "area", "op": "lt", "value": 2}}]}], "rules[0].id"),
+        ([{"id": "s", "rules": [{"id": "r3", "when": {"field": "village", "op": "in", "value": "Devpur"}}]}],
+         "needs a list value"),
+        ([{"id": "s", "rules": [{"id": "r4", "when": {"field": "area"}}]}], "has no op"),
+    ]
+    for schemes, expected in bad:
+        try:
+            validate_schemes(schemes)
+            assert False, f"accepted {schemes}"
+        except ValueError as e:
+            assert expected in str(e), str(e)
+
+    client = TestClient(app)
+    for path, body in (
+        ("/dss/analyze", {"claim_data": {"claim_type": "individual"}, "schemes_data": bad[1][0]}),
+        ("/dss/batch-analysis", {"district": "Balaghat", "schemes_data": bad[0][0]}),
+    ):
+        response = client.post(path, json=body)
+        print(f"   {path}: {response.status_code} {response.json()['detail'][0]['msg']}")
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["loc"] == ["body", "schemes_data"]
+    print("✅ Client scheme validation: SUCCESS")
+
+if __name__ == "__main__":
+    test_condition_compilation()
+    test_single_holder_matches()
+    test_published_rules_are_used()
+    test_vectorised_evaluation()
+    test_client_schemes_are_validated()
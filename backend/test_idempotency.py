@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Test idempotent claim submission: Idempotency-Key header, content hash
+dedup, concurrent retries and batch/queued repeats
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import HTTPException, Response
+from mongomock_motor import AsyncMongoMockClient
+
+from app.routes import claims
+from app.services import ingest_queue as ingest_module
+
+CLAIM = {"claimant_name": "Sita Gond", "village": "Devpur", "district": "Mandla", "area": "1.5 ha"}
+
+
+def run_with_mock_database(scenario):
+    database = AsyncMongoMockClient()["idempotency_test"]
+    original = claims.db, ingest_module.db
+    claims.db = ingest_module.db = database
+
+    async def run():
+        await claims.ensure_claim_indexes()
+        return await scenario(database)
+
+    try:
+        return asyncio.run(run())
+    finally:
+        claims.db, ingest_module.db = original
+
+
+async def submit(extracted_text, key=None):
+    response = Response()
+    result = await claims.process_and_create_claim(
+        claims.ClaimProcessingRequest(extracted_text=extracted_text), response, idempotency_key=key
+    )
+    return result, response.headers.get("Idempotent-Replayed")
+
+
+def test_repeat_submission_returns_original():
+    print("Testing repeated submissions...")
+
+    async def scenario(database):
+        first, first_replayed = await submit(CLAIM)
+        second, second_replayed = await submit(dict(CLAIM))
+        count = await database["claims"].count_documents({})
+        return first, first_replayed, second, second_replayed, count
+
+    first, first_replayed, second, second_replayed, count = run_with_mock_database(scenario)
+    assert first_replayed is None and second_replayed == "true"
+    assert second == first
+    assert count == 1
+    print("✅ Repeated submissions: SUCCESS")
+
+
+def test_idempotency_key_header():
+    print("Testing Idempotency-Key header...")
+
+    async def scenario(database):
+        first, _ = await submit("Claim form text", key="retry-1")
+        # A different key is a different submission, even with the same content
+        other, _ = await submit("Claim form text", key="retry-2")
+        replay, replayed = await submit("Claim form text", key="retry-1")
+        try:
+            await submit("Another claim form", key="retry-1")
+            conflict = None
+        except HTTPException as e:
+            conflict = e.status_code
+        return first, other, replay, replayed, conflict
+
+    first, other, replay, replayed, conflict = run_with_mock_database(scenario)
+    assert other["claim_id"] != first["claim_id"]
+    assert replay["claim_id"] == first["claim_id"] and replayed == "true"
+    assert conflict == 422
+    print("✅ Idempotency-Key header: SUCCESS")
+
+
+def test_concurrent_retries_extract_once():
+    print("Testing concurrent retries...")
+    original_extract = claims.extract_claim_input
+    extractions = []
+
+    async def slow_extract(extracted_text, hedge=True):
+        extractions.append(extracted_text)
+        await asyncio.sleep(0.05)
+        return dict(CLAIM), "AI text processing"
+
+    async def scenario(database):
+        results = await asyncio.gather(*(submit("Slow claim form", key="timeout-retry") for _ in range(3)))
+        return results, await database["claims"].count_documents({})
+
+    claims.extract_claim_input = slow_extract
+    try:
+        results, count = run_with_mock_database(scenario)
+    finally:
+        claims.extract_claim_input = original_extract
+    assert len(extractions) == 1 and count == 1
+    assert len({result["claim_id"] for result, _ in results}) == 1
+    assert sorted(replayed or "" for _, replayed in results) == ["", "true", "true"]
+    print("✅ Concurrent retries: SUCCESS")
+
+
+def test_batch_skips_stored_and_repeated_items():
+    print("Testing batch deduplication...")
+
+    async def scenario(database):
+        stored, _ = await submit(CLAIM)
+        other = {**CLAIM, "claimant_name": "Ramesh Gond"}
+        batch = await claims.process_and_create_claims_batch(
+            claims.ClaimBatchRequest(items=[CLAIM, other, other, "Claim form text"])
+        )
+        retried = await claims.process_and_create_claims_batch(
+            claims.ClaimBatchRequest(items=[other, "Claim form text"])
+        )
+        return stored, batch, retried, await database["claims"].count_documents({})
+
+    stored, batch, retried, count = run_with_mock_database(scenario)
+    assert batch["created"] == 2 and batch["duplicates"] == 2 and batch["failed"] == 0
+    assert batch["results"][0]["duplicate"] and batch["results"][0]["claim_id"] == stored["claim_id"]
+    assert batch["results"][2]["claim_id"] == batch["results"][1]["claim_id"]
+    assert retried["created"] == 0 and retried["duplicates"] == 2
+    assert count == 3
+    print("✅ Batch deduplication: SUCCESS")
+
+
+def test_queued_repeat_returns_original_job():
+    print("Testing queued repeats...")
+
+    async def scenario(database):
+        await claims.ingest_queue.start()
+        try:
+            first = await claims.enqueue_claim(claims.ClaimProcessingRequest(extracted_text=CLAIM), Response(), None)
+            response = Response()
+            second = await claims.enqueue_claim(claims.ClaimProcessingRequest(extracted_text=CLAIM), response, None)
+            for _ in range(100):
+                job = await claims.ingest_queue.get(first["ingest_id"])
+                if job["status"] == "done":
+                    break
+                await asyncio.sleep(0.02)
+        finally:
+            await claims.ingest_queue.stop()
+        # Already stored through the queue, so the synchronous route replays it
+        replay, replayed = await submit(CLAIM)
+        return first, second, response, job, replay, replayed, await database["claims"].count_documents({})
+
+    first, second, response, job, replay, replayed, count = run_with_mock_database(scenario)
+    assert second["ingest_id"] == first["ingest_id"]
+    assert response.headers.get("Idempotent-Replayed") == "true"
+    assert job["status"] == "done"
+    assert replayed == "true" and replay["claim_id"] == job["result"]["claim_id"]
+    assert count == 1
+    print("✅ Queued repeats: SUCCESS")
+
+
+if __name__ == "__main__":
+    test_repeat_submission_returns_original()
+    test_idempotency_key_header()
+    test_concurrent_retries_extract_once()
+    test_batch_skips_stored_and_repeated_items()
+    test_queued_repeat_returns_original_job()
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Test the queued ingestion pipeline: 202 acceptance, background stages,
+per-stage concurrency limits, retries, leases and job traces
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import Response
+from mongomock_motor import AsyncMongoMockClient
+
+from app.routes import claims
+from app.services import ingest_queue as ingest_module
+from app.services import tracing
+from app.services.ingest_queue import IngestQueue, Stage
+
+
+def use_mock_database():
+    database = AsyncMongoMockClient()["ingest_test"]
+    original = claims.db, ingest_module.db
+    claims.db = ingest_module.db = database
+    return database, original
+
+
+def restore_database(original):
+    claims.db, ingest_module.db = original
+
+
+async def wait_until_settled(queue, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while asyncio.get_running_loop().time() < deadline:
+        counts = await queue.depth()
+        if counts["queued"] + counts["processing"] == 0:
+            return counts
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"queue did not drain: {counts}")
+
+
+def test_claim_accepted_and_processed():
+    print("Testing queued claim ingestion...")
+    database, original = use_mock_database()
+
+    async def run():
+        accepted = await claims.enqueue_claim(claims.ClaimProcessingRequest(extracted_text={
+            "claimant_name": "Sita Gond", "village": "Devpur", "district": "Mandla",
+            "state": "Madhya Pradesh", "area": "1.5 ha"
+        }), Response(), None)
+        raw = await claims.enqueue_claim(claims.ClaimProcessingRequest(extracted_text="Claim form text"), Response(), None)
+        queued = await claims.get_ingest_status(accepted["ingest_id"])
+        assert queued["status"] == "queued" and "payload" not in queued
+
+        await claims.ingest_queue.start()
+        try:
+            counts = await wait_until_settled(claims.ingest_queue)
+        finally:
+            await claims.ingest_queue.stop()
+        done = await claims.get_ingest_status(accepted["ingest_id"])
+        stored = await database["claims"].find_one({"claimant_name": "Sita Gond"})
+        return accepted, raw, counts, done, stored
+
+    try:
+        accepted, raw, counts, done, stored = asyncio.run(run())
+    finally:
+        restore_database(original)
+    assert accepted["status"] == "queued"
+    assert accepted["status_url"] == f"/claims/ingest/{accepted['ingest_id']}"
+    assert counts == {"queued": 0, "processing": 0, "done": 2, "failed": 0}
+    assert done["status"] == "done" and done["attempts"] == 1
+    assert done["result"]["claim_id"] == str(stored["_id"])
+    assert stored["area"] == 1.5 and stored["processing_method"] == "Direct JSON input"
+    print("✅ Queued claim ingestion: SUCCESS")
+
+
+def test_unknown_ingest_id():
+    print("Testing unknown ingest ids...")
+    _, original = use_mock_database()
+    try:
+        for ingest_id in ("not-an-id", "0123456789abcdef01234567"):
+            try:
+                asyncio.run(claims.get_ingest_status(ingest_id))
+                assert False, "unknown ingest id accepted"
+            except claims.HTTPException as e:
+                assert e.status_code == 404
+    finally:
+        restore_database(original)
+    print("✅ Unknown ingest ids: SUCCESS")
+
+
+def test_stage_concurrency_limits():
+    print("Testing per-stage concurrency limits...")
+    _, original = use_mock_database()
+    active = {"slow": 0, "fast": 0}
+    peak = {"slow": 0, "fast": 0}
+
+    def tracked(name, delay):
+        async def run(state):
+            active[name] += 1
+            peak[name] = max(peak[name], active[name])
+            await asyncio.sleep(delay)
+            active[name] -= 1
+            state.setdefault("result", {})[name] = True
+        return run
+
+    queue = IngestQueue([
+        Stage("slow", tracked("slow", 0.02), concurrency=2),
+        Stage("fast", tracked("fast", 0.001), concurrency=6),
+    ], workers=6)
+
+    async def run():
+        for i in range(12):
+            await queue.enqueue({"n": i})
+        await queue.start()
+        try:
+            return await wait_until_settled(queue)
+        finally:
+            await queue.stop()
+
+    try:
+        counts = asyncio.run(run())
+    finally:
+        restore_database(original)
+    assert counts["done"] == 12
+    assert peak["slow"] == 2
+    assert queue.stats()["completed"] == 12
+    print("✅ Per-stage concurrency limits: SUCCESS")
+
+
+def test_retry_and_failure():
+    print("Testing retries and failures...")
+    _, original = use_mock_database()
+    backoff = ingest_module.INGEST_RETRY_BACKOFF_SECONDS
+    ingest_module.INGEST_RETRY_BACKOFF_SECONDS = 0
+    calls = {}
+
+    def flaky(state):
+        payload = state["payload"]
+        calls[payload] = calls.get(payload, 0) + 1
+        if payload == "transient" and calls[payload] == 1:
+            raise claims.HTTPException(status_code=503, detail="provider unavailable")
+        if payload == "invalid":
+            raise ValueError("area must be a number")
+
+    queue = IngestQueue([Stage("extraction", flaky, concurrency=2)], workers=2)
+
+    async def run():
+        transient, _ = await queue.enqueue("transient")
+        invalid, _ = await queue.enqueue("invalid")
+        await queue.start()
+        try:
+            await wait_until_settled(queue)
+        finally:
+            await queue.stop()
+        return await queue.get(transient), await queue.get(invalid)
+
+    try:
+        transient, invalid = asyncio.run(run())
+    finally:
+        ingest_module.INGEST_RETRY_BACKOFF_SECONDS = backoff
+        restore_database(original)
+    assert transient["status"] == "done" and transient["attempts"] == 2
+    assert invalid["status"] == "failed" and invalid["attempts"] == 1
+    assert invalid["stage"] == "extraction" and "area must be a number" in invalid["error"]
+    assert calls == {"transient": 2, "invalid": 1}
+    print("✅ Retries and failures: SUCCESS")
+
+
+def test_failed_job_is_requeued():
+    print("Testing resubmission of a failed job...")
+    _, original = use_mock_database()
+    outage = {"active": True}
+
+    def extraction(state):
+        if outage["active"]:
+            raise ValueError("provider returned an invalid response")
+
+    queue = IngestQueue([Stage("extraction", extraction, concurrency=1)], workers=1)
+
+    async def run():
+        await queue.start()
+        try:
+            first, _ = await queue.enqueue("claim text", "key-1", "hash-1")
+            await wait_until_settled(queue)
+            failed = await queue.get(first)
+            outage["active"] = False
+            second, created = await queue.enqueue("claim text", "key-1", "hash-1")
+            await wait_until_settled(queue)
+            third, replayed = await queue.enqueue("claim text", "key-1", "hash-1")
+            return first, failed, second, created, third, replayed, await queue.get(first)
+        finally:
+            await queue.stop()
+
+    try:
+        first, failed, second, created, third, replayed, done = asyncio.run(run())
+    finally:
+        restore_database(original)
+    assert failed["status"] == "failed"
+    # Same tracking id, processed again
+    assert second == third == first and created is True and replayed is False
+    assert done["status"] == "done" and done["attempts"] == 1 and done["error"] is None
+    print("✅ Failed job resubmission: SUCCESS")
+
+
+def test_expired_lease_is_reclaimed():
+    print("Testing lease expiry...")
+    database, original = use_mock_database()
+    queue = IngestQueue([Stage("noop", lambda state: None, concurrency=1)], workers=1)
+
+    async def run():
+        # A worker claimed this job and died
+        now = datetime.now()
+        await database["ingest_queue"].insert_one({
+            "payload": {}, "status": "processing", "attempts": 1,
+            "created_at": now, "updated_at": now, "available_at": now,
+            "lease_expires_at": now - timedelta(seconds=1),
+        })
+        await queue.start()
+        try:
+            return await wait_until_settled(queue)
+        finally:
+            await queue.stop()
+
+    try:
+        counts = asyncio.run(run())
+    finally:
+        restore_database(original)
+    assert counts["done"] == 1
+    print("✅ Lease expiry: SUCCESS")
+
+
+def test_lease_renewed_during_long_stage():
+    print("Testing lease renewal and ownership...")
+    database, original = use_mock_database()
+    lease, poll = ingest_module.INGEST_LEASE_SECONDS, ingest_module.INGEST_POLL_SECONDS
+    ingest_module.INGEST_LEASE_SECONDS, ingest_module.INGEST_POLL_SECONDS = 0.15, 0.02
+    runs = []
+
+    async def slow_llm(state):
+        runs.append(state["ingest_id"])
+        await asyncio.sleep(0.5)
+
+    worker = IngestQueue([Stage("extraction", slow_llm, concurrency=1)], workers=1)
+    other_worker = IngestQueue([Stage("extraction", slow_llm, concurrency=1)], workers=1)
+
+    async def run():
+        await worker.enqueue("claim text")
+        await worker.start()
+        await asyncio.sleep(0.05)
+        # Polls throughout the stage, which outlasts several lease periods
+        await other_worker.start()
+        try:
+            counts = await wait_until_settled(worker)
+        finally:
+            await worker.stop()
+            await other_worker.stop()
+
+        # A worker whose lease was taken over does not overwrite the new owner's result
+        now = datetime.now()
+        stale = {"_id": (await database["ingest_queue"].insert_one({
+            "payload": "x", "status": "processing", "attempts": 1, "lease_owner": "worker-b",
+            "created_at": now, "updated_at": now, "available_at": now, "lease_expires_at": now,
+        })).inserted_id, "payload": "x", "attempts": 1, "lease_owner": "worker-a",
+            "created_at": now, "updated_at": now}
+        await worker._process(stale)
+        return counts, await database["ingest_queue"].find_one({"_id": stale["_id"]})
+
+    try:
+        counts, stale = asyncio.run(run())
+    finally:
+        ingest_module.INGEST_LEASE_SECONDS, ingest_module.INGEST_POLL_SECONDS = lease, poll
+        restore_database(original)
+    assert counts["done"] == 1 and len(runs) == 1
+    assert stale["status"] == "processing" and stale["lease_owner"] == "worker-b"
+    print("✅ Lease renewal and ownership: SUCCESS")
+
+
+def test_abandoned_job_fails_after_last_attempt():
+    print("Testing a job whose worker keeps dying...")
+    database, original = use_mock_database()
+    queue = IngestQueue([Stage("noop", lambda state: None, concurrency=1)], workers=1)
+
+    async def run():
+        now = datetime.now()
+        job_id = (await database["ingest_queue"].insert_one({
+            "payload": {}, "status": "processing", "attempts": ingest_module.INGEST_MAX_ATTEMPTS,
+            "created_at": now, "updated_at": now, "available_at": now,
+            "lease_expires_at": now - timedelta(seconds=1),
+        })).inserted_id
+        await queue.start()
+        try:
+            await wait_until_settled(queue)
+        finally:
+            await queue.stop()
+        return await queue.get(str(job_id))
+
+    try:
+        job = asyncio.run(run())
+    finally:
+        restore_database(original)
+    assert job["status"] == "failed" and job["attempts"] == ingest_module.INGEST_MAX_ATTEMPTS
+    print("✅ Abandoned job fails after its last attempt: SUCCESS")
+
+
+def test_stage_spans_share_the_job_trace():
+    print("Testing job traces...")
+    _, original = use_mock_database()
+    exported = []
+    original_export, original_rate = tracing.exporter.export, tracing.TRACE_SAMPLE_RATE
+    tracing.exporter.export = lambda finished: exported.append(finished.to_dict())
+    tracing.TRACE_SAMPLE_RATE = 1.0
+    queue = IngestQueue([
+        Stage("extraction", lambda state: None, concurrency=1),
+        Stage("insert", lambda state: None, concurrency=1),
+    ], workers=1)
+
+    async def run():
+        await queue.enqueue("claim text")
+        await queue.start()
+        try:
+            await wait_until_settled(queue)
+        finally:
+            await queue.stop()
+
+    try:
+        asyncio.run(run())
+    finally:
+        tracing.exporter.export, tracing.TRACE_SAMPLE_RATE = original_export, original_rate
+        restore_database(original)
+    spans = {s["name"]: s for s in exported if s["name"].startswith("ingest.") and s["name"] != "ingest.enqueue"}
+    job = spans["ingest.job"]
+    assert job["parent_span_id"] is None
+    for name in ("ingest.extraction", "ingest.insert"):
+        assert spans[name]["trace_id"] == job["trace_id"] and spans[name]["parent_span_id"] == job["span_id"]
+    print("✅ Job traces: SUCCESS")
+
+
+def test_queued_claim_checks_idempotency_key():
+    print("Testing queued claims against keys used by POST /claims/...")
+    database, original = use_mock_database()
+    submitted = {"claimant_name": "Sita Gond", "village": "Devpur", "district": "Mandla", "area": "1.5 ha"}
+
+    async def run():
+        await claims.ensure_claim_indexes()
+        for key in ("form-17", "form-18"):
+            created = await claims.process_and_create_claim(
+                claims.ClaimProcessingRequest(extracted_text=submitted), Response(), idempotency_key=key
+            )
+        same = await claims.enqueue_claim(claims.ClaimProcessingRequest(extracted_text=submitted), Response(), "form-18")
+        # The queue has not seen this key, so the conflict is only found at insert
+        other = await claims.enqueue_claim(claims.ClaimProcessingRequest(extracted_text={
+            **submitted, "claimant_name": "Ramesh Baiga"
+        }), Response(), "form-17")
+        await claims.ingest_queue.start()
+        try:
+            await wait_until_settled(claims.ingest_queue)
+        finally:
+            await claims.ingest_queue.stop()
+        return (created, await claims.get_ingest_status(same["ingest_id"]),
+                await claims.get_ingest_status(other["ingest_id"]), await database["claims"].count_documents({}))
+
+    try:
+        created, same, other, stored = asyncio.run(run())
+    finally:
+        restore_database(original)
+    assert same["status"] == "done" and same["result"]["claim_id"] == created["claim_id"]
+    assert other["status"] == "failed" and other["attempts"] == 1
+    assert "different claim" in other["error"]
+    assert stored == 2
+    print("✅ Queued claim idempotency: SUCCESS")
+
+
+if __name__ == "__main__":
+    test_claim_accepted_and_processed()
+    test_unknown_ingest_id()
+    test_stage_concurrency_limits()
+    test_retry_and_failure()
+    test_failed_job_is_requeued()
+    test_expired_lease_is_reclaimed()
+    test_lease_renewed_during_long_stage()
+    test_abandoned_job_fails_after_last_attempt()
+    test_stage_spans_share_the_job_trace()
+    test_queued_claim_checks_idempotency_key()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test JSON extraction from model output: fences, prose, arrays and truncation
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.llm_json import (
+    ExtractedClaimSchema,
+    InterventionSchema,
+    JSONScanner,
+    ParseStats,
+    extract_json,
+    parse_list,
+    parse_object,
+)
+
+FENCED_ARRAY = """Sure! Here are the interventions:
+
+```json
+[
+  {"title": "Check dam", "priority": "High", "confidence_score": "0.9", "notes": "uses {braces} and \\"quotes\\""},
+  {"title": "School repair", "priority": "Medium"}
+]
+```
+
+Let me know if you need more detail [or anything else]."""
+
+
+def test_fences_and_prose():
+    print("Testing fenced output with prose...")
+    value, complete = extract_json(FENCED_ARRAY)
+    assert complete
+    assert [item["title"] for item in value] == ["Check dam", "School repair"]
+    assert value[0]["notes"] == 'uses {braces} and "quotes"'
+
+    value, complete = extract_json('The claim is: {"claimant_name": "Karan Singh", "area": "2.5 ha"}. Thanks!')
+    assert complete and value == {"claimant_name": "Karan Singh", "area": "2.5 ha"}
+    assert extract_json("no json at all") == (None, False)
+    print("✅ Fences and prose: SUCCESS")
+
+
+def test_truncated_output():
+    print("Testing truncated output...")
+    value, complete = extract_json('[{"title": "Check dam"}, {"title": "School rep')
+    assert not complete
+    assert value == [{"title": "Check dam"}]
+
+    value, complete = extract_json('{"claimant_name": "Karan Singh", "village": "Devpur", "area": "2.')
+    assert not complete
+    assert value == {"claimant_name": "Karan Singh", "village": "Devpur", "area": "2."}
+
+    value, complete = extract_json('{"claimant_name": "Karan Singh", "village": "Devpur", "ar')
+    assert value == {"claimant_name": "Karan Singh", "village": "Devpur"}
+    print("✅ Truncated output: SUCCESS")
+
+
+def test_incremental_feed():
+    print("Testing incremental feed...")
+    scanner = JSONScanner()
+    emitted = []
+    for i in range(0, len(FENCED_ARRAY), 7):
+        emitted.extend(item["title"] for item in scanner.feed(FENCED_ARRAY[i:i + 7]))
+    assert emitted == ["Check dam", "School repair"]
+    assert scanner.finish()[1]
+    print("✅ Incremental feed: SUCCESS")
+
+
+def test_schema_validation_and_stats():
+    print("Testing schema validation...")
+    stats = ParseStats()
+    import app.services.llm_json as llm_json
+    original = llm_json.parse_stats
+    llm_json.parse_stats = stats
+    try:
+        items = parse_list(FENCED_ARRAY, InterventionSchema, "interventions")
+        assert items[0]["confidence_score"] == 0.9
+        assert items[1]["confidence_score"] is None
+
+        wrapped = parse_list('{"interventions": [{"title": "Check dam"}]}', InterventionSchema, "interventions")
+        assert [i["title"] for i in wrapped] == ["Check dam"]
+
+        claim = parse_object('```json\n{"claimant_name": "Karan Singh", "area": 2.5}\n```', ExtractedClaimSchema, "extraction")
+        assert claim["claimant_name"] == "Karan Singh" and claim["village"] is None
+
+        assert parse_object('{"claimant_name": ["not", "a", "string"]}', ExtractedClaimSchema, "extraction") is None
+        assert parse_object("I could not read the form.", ExtractedClaimSchema, "extraction") is None
+    finally:
+        llm_json.parse_stats = original
+
+    summary = stats.stats()
+    print(f"   {summary}")
+    assert summary["interventions"]["ok"] == 2
+    assert summary["extraction"] == {"ok": 1, "partial": 0, "failed": 2, "success_rate": 0.333}
+    print("✅ Schema validation: SUCCESS")
+
+
+if __name__ == "__main__":
+    test_fences_and_prose()
+    test_truncated_output()
+    test_incremental_feed()
+    test_schema_validation_and_stats()
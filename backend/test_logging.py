@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test structured logging: PII redaction, truncation, request ids and JSON output
+"""
+
+import io
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.services.log as log
+from app.services.log import (
+    ContextFilter, JSONFormatter, RequestIdMiddleware, StructuredQueueHandler, error_fields, request_id, summarize
+)
+
+
+def test_summarize_redacts_and_truncates():
+    print("Testing payload summaries...")
+    payload = {
+        "claimant_name": "Karan Singh",
+        "address": "Plot 56, Hilltop",
+        "village": "Devpur",
+        "notes": "x" * 1000,
+        "claims": list(range(50)),
+    }
+    summary = summarize(payload)
+    print(f"   {summary}")
+    assert summary["claimant_name"] == "[redacted]"
+    assert summary["address"] == "[redacted]"
+    assert summary["village"] == "Devpur"
+    assert len(summary["notes"]) < 250 and summary["notes"].endswith("(1000 chars)")
+    assert len(summary["claims"]) == log.MAX_ITEMS + 1
+    print("✅ Payload summaries: SUCCESS")
+
+
+def test_json_lines_with_request_id():
+    print("Testing JSON log lines...")
+    record = logging.LogRecord("app.routes.claims", logging.INFO, __file__, 1, "Claim stored", (), None)
+    record.claim_id = "abc123"
+    token = request_id.set("req-1")
+    try:
+        assert ContextFilter().filter(record)
+    finally:
+        request_id.reset(token)
+    line = json.loads(JSONFormatter().format(record))
+    print(f"   {line}")
+    assert line["message"] == "Claim stored"
+    assert line["level"] == "INFO"
+    assert line["request_id"] == "req-1"
+    assert line["claim_id"] == "abc123"
+    print("✅ JSON log lines: SUCCESS")
+
+
+def test_exceptions_through_the_queue():
+    print("Testing tracebacks through the log queue...")
+    log_queue = queue.Queue(-1)
+    output = io.StringIO()
+    stream_handler = logging.StreamHandler(output)
+    stream_handler.setFormatter(JSONFormatter())
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    logger = logging.getLogger("test.log.queue")
+    logger.propagate = False
+    logger.addHandler(StructuredQueueHandler(log_queue))
+    listener.start()
+    try:
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("Claim %s failed", "abc123")
+    finally:
+        listener.stop()
+        logger.handlers.clear()
+    line = json.loads(output.getvalue())
+    print(f"   {line['message']!r} + exception ({len(line['exception'])} chars)")
+    assert line["message"] == "Claim abc123 failed"
+    assert line["exception"].startswith("Traceback") and "ValueError: boom" in line["exception"]
+
+    # Errors quoting claim text or model output are logged by class and length
+    content = "Failed to parse AI response as JSON: Sita Gond, Devpur"
+    assert error_fields(ValueError(content)) == {"error_type": "ValueError", "error_chars": len(content)}
+    print("✅ Tracebacks through the log queue: SUCCESS")
+
+
+def test_debug_sampling():
+    print("Testing debug sampling...")
+    original = log.DEBUG_SAMPLE_RATE
+    log.DEBUG_SAMPLE_RATE = 0.0
+    try:
+        record = logging.LogRecord("x", logging.DEBUG, __file__, 1, "payload", (), None)
+        assert not ContextFilter().filter(record)
+        warning = logging.LogRecord("x", logging.WARNING, __file__, 1, "kept", (), None)
+        assert ContextFilter().filter(warning)
+    finally:
+        log.DEBUG_SAMPLE_RATE = original
+    print("✅ Debug sampling: SUCCESS")
+
+
+def test_request_id_middleware():
+    print("Testing request id middleware...")
+    app = FastAPI()
+    app.add_middleware(RequestIdMiddleware)
+
+    @app.get("/whoami")
+    async def whoami():
+        return {"request_id": request_id.get()}
+
+    client = TestClient(app)
+    response = client.get("/whoami", headers={"X-Request-ID": "trace-42"})
+    assert response.json()["request_id"] == "trace-42"
+    assert response.headers["x-request-id"] == "trace-42"
+
+    generated = client.get("/whoami")
+    assert len(generated.headers["x-request-id"]) == 32
+    assert generated.json()["request_id"] == generated.headers["x-request-id"]
+    print("✅ Request id middleware: SUCCESS")
+
+
+if __name__ == "__main__":
+    test_summarize_redacts_and_truncates()
+    test_json_lines_with_request_id()
+    test_exceptions_through_the_queue()
+    test_debug_sampling()
+    test_request_id_middleware()
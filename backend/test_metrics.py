@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test Prometheus metrics: route histograms, Mongo command timings, LLM and cache metrics
+"""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.services.metrics import PrometheusMiddleware, mongo_command_listener, observe_llm_call, register_cache
+from app.services.rate_limit import PRIORITY_BATCH, ProviderScheduler
+
+
+def sample(name, labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_route_histogram_uses_template():
+    print("Testing route latency histogram...")
+    app = FastAPI()
+    app.add_middleware(PrometheusMiddleware)
+
+    @app.get("/villages/{name}")
+    async def village(name: str):
+        return {"name": name}
+
+    labels = {"method": "GET", "route": "/villages/{name}", "status": "200"}
+    before = sample("http_request_duration_seconds_count", labels)
+    client = TestClient(app)
+    client.get("/villages/devpur")
+    client.get("/villages/kanha")
+    client.get("/missing")
+
+    assert sample("http_request_duration_seconds_count", labels) == before + 2
+    assert sample("http_request_duration_seconds_count", {"method": "GET", "route": "unmatched", "status": "404"}) >= 1
+    assert sample("http_requests_in_flight", {"method": "GET"}) == 0
+    print("✅ Route latency histogram: SUCCESS")
+
+
+def test_mongo_command_listener():
+    print("Testing Mongo command timings...")
+    labels = {"command": "find", "collection": "claims", "status": "ok"}
+    before = sample("mongodb_command_duration_seconds_count", labels)
+
+    started = SimpleNamespace(command_name="find", command={"find": "claims", "filter": {}}, connection_id=("localhost", 27017), request_id=1)
+    mongo_command_listener.started(started)
+    mongo_command_listener.succeeded(SimpleNamespace(command_name="find", connection_id=("localhost", 27017), request_id=1, duration_micros=2500))
+
+    assert sample("mongodb_command_duration_seconds_count", labels) == before + 1
+    assert sample("mongodb_command_duration_seconds_sum", labels) >= 0.0025
+    print("✅ Mongo command timings: SUCCESS")
+
+
+def test_llm_and_cache_metrics():
+    print("Testing LLM and cache metrics...")
+    observe_llm_call("openrouter", "test-model", "extraction", 1.5, "ok", 420)
+    assert sample("llm_tokens_total", {"provider": "openrouter", "model": "test-model", "task": "extraction"}) == 420
+    assert sample("llm_request_duration_seconds_count",
+                  {"provider": "openrouter", "model": "test-model", "task": "extraction", "outcome": "ok"}) == 1
+
+    register_cache("test_cache", lambda: {"entries": 3, "hits": 6, "misses": 2, "hit_ratio": 0.75})
+    assert sample("cache_hit_ratio", {"cache": "test_cache"}) == 0.75
+    assert sample("cache_hits_total", {"cache": "test_cache"}) == 6
+    print("✅ LLM and cache metrics: SUCCESS")
+
+
+def test_rate_limit_wait_histogram():
+    print("Testing rate limit wait metrics...")
+    scheduler = ProviderScheduler("metrics-test", rpm=60, tpm=100000)
+    interactive = {"provider": "metrics-test", "priority": "interactive"}
+    batch = {"provider": "metrics-test", "priority": "batch"}
+
+    async def run():
+        # The bucket starts full: the first call is granted at once, the next waits about a second
+        await scheduler.acquire(10)
+        scheduler.requests.level = 0
+        await scheduler.acquire(10, priority=PRIORITY_BATCH)
+
+    asyncio.run(run())
+    assert sample("llm_rate_limit_wait_seconds_count", interactive) == 1
+    assert sample("llm_rate_limit_wait_seconds_count", batch) == 1
+    assert sample("llm_rate_limit_wait_seconds_sum", batch) >= 0.9
+    assert sample("llm_rate_limit_wait_seconds_bucket", dict(batch, le="0.5")) == 0
+    print("✅ Rate limit wait metrics: SUCCESS")
+
+
+if __name__ == "__main__":
+    test_route_histogram_uses_template()
+    test_mongo_command_listener()
+    test_llm_and_cache_metrics()
+    test_rate_limit_wait_histogram()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Test latency-based model routing, failover and hedged requests
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+import app.services.model_router as router_module
+from app.services.model_router import ModelRouter, parse_routes
+from app.services.resilience import ProviderUnavailable, get_provider
+
+
+def make_router(spec):
+    router = ModelRouter()
+    router.routes["task"] = parse_routes(spec)
+    for candidate in router.routes["task"]:
+        candidate.api_key = "test-key"
+        provider = get_provider(candidate.provider)
+        provider.backoff_base = 0.001
+        provider.max_retries = 0
+        provider.breaker.record_success()
+    return router
+
+
+def test_parse_routes():
+    print("Testing route parsing...")
+    candidates = parse_routes("openrouter:google/gemini-2.0-flash-exp:free, aimlapi:gpt-4o-mini,bad")
+    assert [c.id for c in candidates] == ["openrouter:google/gemini-2.0-flash-exp:free", "aimlapi:gpt-4o-mini"]
+    assert candidates[0].model == "google/gemini-2.0-flash-exp:free"
+    assert candidates[1].base_url == "https://api.aimlapi.com/v1"
+    print("✅ Route parsing: SUCCESS")
+
+
+def test_prefers_fastest_healthy_model():
+    print("Testing latency-based ranking...")
+    router = make_router("router-a:slow,router-b:fast")
+    slow, fast = router.routes["task"]
+    for _ in range(10):
+        slow.record(True, 2.0)
+        fast.record(True, 0.2)
+    assert [c.id for c in router.rank("task")] == ["router-b:fast", "router-a:slow"]
+
+    # A fast model that keeps failing drops behind a healthy slow one
+    for _ in range(15):
+        fast.record(False)
+    assert [c.id for c in router.rank("task")] == ["router-a:slow", "router-b:fast"]
+    print("✅ Latency-based ranking: SUCCESS")
+
+
+def test_unhealthy_model_probed_after_cooldown():
+    print("Testing half-open probe of an unhealthy model...")
+    original_cooldown = router_module.PROBE_COOLDOWN_SECONDS
+    router_module.PROBE_COOLDOWN_SECONDS = 0.05
+    try:
+        router = make_router("router-p:primary,router-q:backup")
+        primary, backup = router.routes["task"]
+        for _ in range(10):
+            primary.record(False)
+            backup.record(True, 1.0)
+        assert [c.model for c in router.rank("task")] == ["backup", "primary"]
+
+        # After the cooldown one call probes it; the others keep using the backup
+        time.sleep(0.06)
+        assert [c.model for c in router.rank("task")] == ["primary", "backup"]
+        assert [c.model for c in router.rank("task")] == ["backup", "primary"]
+
+        calls = []
+
+        async def failing(candidate, timeout):
+            calls.append(candidate.model)
+            if candidate.model == "primary":
+                raise httpx.ConnectError("still down")
+            return candidate.model
+
+        # A failed probe restarts the cooldown
+        time.sleep(0.06)
+        assert asyncio.run(router.call("task", failing)) == "backup"
+        assert calls == ["primary", "backup"]
+        assert [c.model for c in router.rank("task")] == ["backup", "primary"]
+
+        async def recovered(candidate, timeout):
+            calls.append(candidate.model)
+            return candidate.model
+
+        # A successful probe makes it healthy again
+        time.sleep(0.06)
+        assert asyncio.run(router.call("task", recovered)) == "primary"
+        assert primary.healthy() and primary.error_rate() == 0.0
+        assert [c.model for c in router.rank("task")] == ["primary", "backup"]
+    finally:
+        router_module.PROBE_COOLDOWN_SECONDS = original_cooldown
+    print("✅ Half-open probe: SUCCESS")
+
+
+def test_failover_to_next_model():
+    print("Testing failover...")
+    router = make_router("router-c:broken,router-d:ok")
+    calls = []
+
+    async def send(candidate, timeout):
+        calls.append(candidate.model)
+        if candidate.model == "broken":
+            raise httpx.ConnectError("connection refused")
+        return candidate.model
+
+    assert asyncio.run(router.call("task", send)) == "ok"
+    assert calls == ["broken", "ok"]
+    assert router.routes["task"][0].error_rate() == 1.0
+    print("✅ Failover: SUCCESS")
+
+
+def test_skips_unconfigured_and_rejected_models():
+    print("Testing unconfigured and rejected models...")
+    router = make_router("router-i:no-key,router-j:rejects,router-k:ok")
+    no_key, rejects, ok = router.routes["task"]
+    no_key.api_key = None
+    calls = []
+
+    async def send(candidate, timeout):
+        calls.append((candidate.model, candidate.headers()["Authorization"]))
+        status = 401 if candidate.model == "rejects" else 200
+        return httpx.Response(status, text=candidate.model)
+
+    assert [c.id for c in router.rank("task")] == ["router-j:rejects", "router-k:ok"]
+    response = asyncio.run(router.call("task", send))
+    assert response.text == "ok"
+    assert calls == [("rejects", "Bearer test-key"), ("ok", "Bearer test-key")]
+    # A 401 is not a success: no latency sample, counted as an error
+    assert rejects.error_rate() == 1.0 and not rejects.latency.samples
+    assert ok.error_rate() == 0.0 and len(ok.latency.samples) == 1
+
+    router = make_router("router-l:no-key")
+    router.routes["task"][0].api_key = None
+    try:
+        asyncio.run(router.call("task", send))
+        assert False, "expected ProviderUnavailable"
+    except ProviderUnavailable as e:
+        assert e.detail == "no models configured"
+    print("✅ Unconfigured and rejected models: SUCCESS")
+
+
+def test_hedged_request_wins():
+    print("Testing hedged request...")
+    router = make_router("router-e:stalled,router-f:quick")
+    original = router_module.HEDGE_DELAY_SECONDS
+    router_module.HEDGE_DELAY_SECONDS = 0.05
+    cancelled = []
+
+    async def send(candidate, timeout):
+        if candidate.model == "stalled":
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(candidate.model)
+                raise
+        return candidate.model
+
+    try:
+        start = time.perf_counter()
+        result = asyncio.run(router.call("task", send, hedge=True))
+        elapsed = time.perf_counter() - start
+    finally:
+        router_module.HEDGE_DELAY_SECONDS = original
+
+    print(f"   answered by {result} in {elapsed:.2f}s")
+    assert result == "quick"
+    assert elapsed < 1.0
+    assert cancelled == ["stalled"]
+    assert router.hedged_calls == 1
+    assert router.routes["task"][1].hedge_wins == 1
+    print("✅ Hedged request: SUCCESS")
+
+
+def test_hedge_not_started_for_fast_primary():
+    print("Testing hedge skipped for fast primary...")
+    router = make_router("router-g:primary,router-h:backup")
+    calls = []
+
+    async def send(candidate, timeout):
+        calls.append(candidate.model)
+        return candidate.model
+
+    assert asyncio.run(router.call("task", send, hedge=True)) == "primary"
+    assert calls == ["primary"]
+    assert router.hedged_calls == 0
+    print("✅ Hedge skipped: SUCCESS")
+
+
+if __name__ == "__main__":
+    test_parse_routes()
+    test_prefers_fastest_healthy_model()
+    test_unhealthy_model_probed_after_cooldown()
+    test_failover_to_next_model()
+    test_skips_unconfigured_and_rejected_models()
+    test_hedged_request_wins()
+    test_hedge_not_started_for_fast_primary()
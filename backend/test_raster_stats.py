@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Test zonal raster statistics on small synthetic GeoTIFFs
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.raster_stats import AmbiguousVillage, RasterStatsService, zonal_means
+
+
+def square(x0, y0, size):
+    return {
+        "type": "Polygon",
+        "coordinates": [[[x0, y0], [x0 + size, y0], [x0 + size, y0 + size], [x0, y0 + size], [x0, y0]]]
+    }
+
+
+def write_raster(path, data, nodata=None):
+    # 10 x 10 pixels of 0.1 degree starting at (80E, 23N)
+    with rasterio.open(
+        path, "w", driver="GTiff", height=data.shape[0], width=data.shape[1], count=1,
+        dtype=data.dtype, crs="EPSG:4326", transform=from_origin(80.0, 23.0, 0.1, 0.1), nodata=nodata
+    ) as dst:
+        dst.write(data, 1)
+
+
+def build_fixture(directory):
+    land_cover = np.full((10, 10), 40, dtype="uint8")
+    land_cover[:, :5] = 10  # western half is forest
+    ndwi = np.zeros((10, 10), dtype="float32")
+    ndwi[:, 5:] = -0.5
+
+    write_raster(os.path.join(directory, "land_cover.tif"), land_cover)
+    write_raster(os.path.join(directory, "ndwi.tif"), ndwi, nodata=-9999)
+
+    # Villages strictly inside each half (pixel centres only)
+    boundaries = {
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "properties": {"village": "Devpur", "district": "Balaghat"},
+             "geometry": square(80.1, 22.2, 0.2)},
+            {"type": "Feature", "properties": {"village": "Kanha", "district": "Balaghat"},
+             "geometry": square(80.7, 22.2, 0.2)},
+            {"type": "Feature", "properties": {"village": "Sonpur", "district": "Mandla"},
+             "geometry": square(80.1, 22.6, 0.2)},
+        ]
+    }
+    boundaries_path = os.path.join(directory, "villages.geojson")
+    with open(boundaries_path, "w") as f:
+        json.dump(boundaries, f)
+    return boundaries_path, boundaries
+
+
+def make_service(directory, boundaries_path):
+    service = RasterStatsService()
+    service.land_cover_path = os.path.join(directory, "land_cover.tif")
+    service.ndwi_path = os.path.join(directory, "ndwi.tif")
+    service.boundaries_path = boundaries_path
+    return service
+
+
+def test_zonal_means():
+    print("Testing zonal means...")
+    with tempfile.TemporaryDirectory() as directory:
+        _, boundaries = build_fixture(directory)
+        geometries = [f["geometry"] for f in boundaries["features"][:2]]
+
+        forest = zonal_means(os.path.join(directory, "land_cover.tif"), geometries, "class_share", [10])
+        ndwi = zonal_means(os.path.join(directory, "ndwi.tif"), geometries, "mean")
+        print(f"   forest={forest} ndwi={ndwi}")
+
+        assert forest == [1.0, 0.0]
+        assert ndwi == [0.0, -0.5]
+    print("✅ Zonal means: SUCCESS")
+
+
+def test_village_and_district_stats():
+    print("Testing village and district stats...")
+    with tempfile.TemporaryDirectory() as directory:
+        boundaries_path, _ = build_fixture(directory)
+        service = make_service(directory, boundaries_path)
+
+        devpur = service.get_village_stats("Devpur", "Balaghat")
+        print(f"   Devpur: {devpur}")
+        assert devpur["forest_cover"] == 1.0
+        assert devpur["water_index"] == 0.5
+
+        district = service.get_district_stats("Balaghat")
+        print(f"   Balaghat: {district}")
+        assert set(district) == {"devpur", "kanha"}
+        assert district["kanha"]["water_index"] == 0.25
+
+        # Cached per raster version
+        assert service.get_village_stats("Devpur", "Balaghat") is devpur
+        assert service.get_village_stats("Nowhere") is None
+    print("✅ Village and district stats: SUCCESS")
+
+
+def test_cache_bounded_to_current_version():
+    print("Testing raster stats cache bounds...")
+    with tempfile.TemporaryDirectory() as directory:
+        boundaries_path, _ = build_fixture(directory)
+        service = make_service(directory, boundaries_path)
+        service.max_entries = 2
+
+        service.get_village_stats("Devpur", "Balaghat")
+        service.get_village_stats("Kanha", "Balaghat")
+        service.get_village_stats("Devpur", "Balaghat")
+        service.get_village_stats("Sonpur", "Mandla")
+        # Kanha was the least recently used
+        assert set(service._cache) == {("balaghat", "devpur"), ("mandla", "sonpur")}
+        assert service.stats()["entries"] == 2
+
+        # A replaced raster drops the stats computed from the old one
+        ndwi_path = os.path.join(directory, "ndwi.tif")
+        write_raster(ndwi_path, np.full((10, 10), 0.5, dtype="float32"), nodata=-9999)
+        os.utime(ndwi_path, ns=(os.stat(ndwi_path).st_atime_ns, os.stat(ndwi_path).st_mtime_ns + 10**9))
+        kanha = service.get_village_stats("Kanha", "Balaghat")
+        assert kanha["water_index"] == 0.75
+        assert set(service._cache) == {("balaghat", "kanha")}
+    print("✅ Raster stats cache bounds: SUCCESS")
+
+
+def test_ambiguous_village_name():
+    print("Testing village names shared by several districts...")
+    with tempfile.TemporaryDirectory() as directory:
+        boundaries_path, boundaries = build_fixture(directory)
+        boundaries["features"].append({"type": "Feature", "properties": {"village": "Devpur", "district": "Mandla"},
+                                       "geometry": square(80.7, 22.6, 0.2)})
+        with open(boundaries_path, "w") as f:
+            json.dump(boundaries, f)
+        service = make_service(directory, boundaries_path)
+
+        try:
+            service.get_village_stats("Devpur")
+            assert False, "ambiguous village name accepted"
+        except AmbiguousVillage as e:
+            assert e.districts == ["balaghat", "mandla"]
+        assert service.get_village_stats("Devpur", "Mandla")["forest_cover"] == 0.0
+        assert service.get_village_stats("Kanha")["forest_cover"] == 0.0
+    print("✅ Ambiguous village names: SUCCESS")
+
+
+if __name__ == "__main__":
+    test_zonal_means()
+    test_village_and_district_stats()
+    test_cache_bounded_to_current_version()
+    test_ambiguous_village_name()
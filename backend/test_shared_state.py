@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Test state shared between workers: SQLite-backed cache, invalidation and locks
+"""
+
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services import shared_state
+from app.services.cache import SharedTTLCache
+from app.services.shared_state import SQLiteBackend
+
+
+def temp_backend() -> SQLiteBackend:
+    return SQLiteBackend(os.path.join(tempfile.mkdtemp(), "shared.db"))
+
+
+def _worker_set(path, key, value):
+    # Runs in a separate process, like a second gunicorn worker
+    cache = SharedTTLCache("dss", SQLiteBackend(path), ttl_seconds=60)
+    asyncio.run(cache.set(key, value, tags=["devpur"]))
+
+
+def test_cache_shared_between_processes():
+    print("Testing cache shared between processes...")
+    backend = temp_backend()
+    cache = SharedTTLCache("dss", backend, ttl_seconds=60)
+
+    worker = multiprocessing.get_context("fork").Process(
+        target=_worker_set, args=(backend.path, "k1", [{"id": "scheme-1"}])
+    )
+    worker.start()
+    worker.join(10)
+    assert worker.exitcode == 0
+
+    async def run():
+        assert await cache.get("k1") == [{"id": "scheme-1"}]
+        assert await cache.get("missing") is None
+        assert cache.stats()["entries"] == 1
+        assert cache.stats()["hit_ratio"] == 0.5
+
+        # An invalidation from any worker removes the entry for all of them
+        other_worker = SharedTTLCache("dss", SQLiteBackend(backend.path), ttl_seconds=60)
+        assert await other_worker.invalidate_tag("devpur") == 1
+        assert await cache.get("k1") is None
+
+    asyncio.run(run())
+    print("✅ Cache shared between processes: SUCCESS")
+
+
+def test_cache_expiry_and_size_limit():
+    print("Testing shared cache expiry and size limit...")
+    backend = temp_backend()
+    cache = SharedTTLCache("dss", backend, ttl_seconds=60, max_entries=3)
+    short = SharedTTLCache("short", backend, ttl_seconds=0.05)
+
+    async def run():
+        for i in range(5):
+            await cache.set(f"k{i}", {"i": i}, tags=["village"])
+        assert cache.stats()["entries"] == 3
+        assert await cache.get("k0") is None and await cache.get("k4") == {"i": 4}
+
+        await short.set("k", 1)
+        await asyncio.sleep(0.1)
+        assert await short.get("k") is None
+
+        # Namespaces are independent
+        await cache.clear()
+        assert cache.stats()["entries"] == 0
+
+    asyncio.run(run())
+    print("✅ Shared cache expiry and size limit: SUCCESS")
+
+
+def test_cache_writes_wait_off_the_event_loop():
+    print("Testing shared cache writes while another worker holds the write lock...")
+    backend = temp_backend()
+    cache = SharedTTLCache("dss", backend, ttl_seconds=60)
+    other_worker = SQLiteBackend(backend.path)
+    locked, release = threading.Event(), threading.Event()
+
+    def hold_write_lock():
+        conn = other_worker.conn
+        conn.execute("BEGIN IMMEDIATE")
+        locked.set()
+        release.wait(5)
+        conn.execute("COMMIT")
+
+    async def run():
+        holder = threading.Thread(target=hold_write_lock)
+        holder.start()
+        locked.wait(5)
+        invalidation = asyncio.create_task(cache.invalidate_tag("devpur"))
+        # The loop keeps serving other requests while the invalidation waits
+        ticks = 0
+        for _ in range(5):
+            await asyncio.sleep(0.02)
+            ticks += 1
+        assert not invalidation.done()
+        release.set()
+        assert await invalidation == 0
+        holder.join()
+        return ticks
+
+    assert asyncio.run(run()) == 5
+    print("✅ Shared cache writes off the event loop: SUCCESS")
+
+
+def test_shared_lock_excludes_other_workers():
+    print("Testing shared locks...")
+    backend = temp_backend()
+    other_worker = SQLiteBackend(backend.path)
+
+    assert backend.try_lock("dss:k1", "worker-a", ttl_seconds=30)
+    assert not other_worker.try_lock("dss:k1", "worker-b", ttl_seconds=30)
+    backend.unlock("dss:k1", "worker-a")
+    assert other_worker.try_lock("dss:k1", "worker-b", ttl_seconds=0.05)
+    # A lock whose holder died expires
+    time.sleep(0.1)
+    assert backend.try_lock("dss:k1", "worker-a", ttl_seconds=30)
+
+    original = shared_state.backend
+    shared_state.backend = backend
+    order = []
+
+    async def holder():
+        async with shared_state.lock("dss:k2") as acquired:
+            assert acquired
+            order.append("first")
+            await asyncio.sleep(0.2)
+            order.append("first done")
+
+    async def waiter():
+        await asyncio.sleep(0.05)
+        async with shared_state.lock("dss:k2") as acquired:
+            assert acquired
+            order.append("second")
+
+    async def impatient():
+        await asyncio.sleep(0.05)
+        async with shared_state.lock("dss:k2", timeout=0.05) as acquired:
+            assert not acquired
+
+    async def run():
+        await asyncio.gather(holder(), waiter(), impatient())
+
+    try:
+        asyncio.run(run())
+    finally:
+        shared_state.backend = original
+    assert order == ["first", "first done", "second"]
+    print("✅ Shared locks: SUCCESS")
+
+
+def test_held_lock_is_renewed_off_the_event_loop():
+    print("Testing lock renewal...")
+    backend = temp_backend()
+    other_worker = SQLiteBackend(backend.path)
+    threads = set()
+    try_lock = backend.try_lock
+
+    def recording_try_lock(*args):
+        threads.add(threading.current_thread())
+        return try_lock(*args)
+
+    backend.try_lock = recording_try_lock
+    original = shared_state.backend
+    shared_state.backend = backend
+
+    async def run():
+        async with shared_state.lock("snapshot:claims", timeout=1, ttl=0.1) as acquired:
+            assert acquired
+            # Held for several TTLs: renewed, so other workers stay out
+            for _ in range(4):
+                await asyncio.sleep(0.1)
+                assert not other_worker.try_lock("snapshot:claims", "worker-b", ttl_seconds=30)
+        assert other_worker.try_lock("snapshot:claims", "worker-b", ttl_seconds=30)
+
+    try:
+        asyncio.run(run())
+    finally:
+        shared_state.backend = original
+    assert threads and threading.main_thread() not in threads
+    print("✅ Lock renewal: SUCCESS")
+
+
+def test_local_lock_without_backend():
+    print("Testing in-process locks...")
+    original = shared_state.backend
+    shared_state.backend = None
+    running = []
+    overlaps = []
+
+    async def task():
+        async with shared_state.lock("dss:k3") as acquired:
+            assert acquired
+            overlaps.append(len(running))
+            running.append(1)
+            await asyncio.sleep(0.01)
+            running.pop()
+
+    async def run():
+        await asyncio.gather(*(task() for _ in range(5)))
+
+    try:
+        asyncio.run(run())
+    finally:
+        shared_state.backend = original
+    assert overlaps == [0] * 5
+    assert "dss:k3" not in shared_state._local_locks
+    print("✅ In-process locks: SUCCESS")
+
+
+if __name__ == "__main__":
+    test_cache_shared_between_processes()
+    test_cache_expiry_and_size_limit()
+    test_cache_writes_wait_off_the_event_loop()
+    test_shared_lock_excludes_other_workers()
+    test_held_lock_is_renewed_off_the_event_loop()
+    test_local_lock_without_backend()
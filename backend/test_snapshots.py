@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Test the Parquet claims snapshot: incremental appends, recovery from an
+interrupted run, partition pruning, the Arrow IPC endpoint and the DSS
+batch analysis snapshot source
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pyarrow as pa
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+
+from app.routes import claims, dss
+from app.services import snapshots
+from app.services.claim_schema import compact_claim
+from app.services.eligibility import SCHEMES
+from app.services.snapshots import ClaimSnapshots
+from benchmarks.synthetic import generate_claims, generate_villages
+
+
+def use_snapshots(database):
+    original = snapshots.analytics_db, dss.analytics_db, claims.claim_snapshots, dss.claim_snapshots
+    store = ClaimSnapshots(os.path.join(tempfile.mkdtemp(), "claims"))
+    snapshots.analytics_db = dss.analytics_db = database
+    claims.claim_snapshots = dss.claim_snapshots = store
+    return store, original
+
+
+def restore_snapshots(original):
+    snapshots.analytics_db, dss.analytics_db, claims.claim_snapshots, dss.claim_snapshots = original
+
+
+def synthetic_claims(count, seed=5):
+    villages = generate_villages(12, seed=seed)
+    return [compact_claim(claim) for claim in generate_claims(count, villages, seed=seed + 1)]
+
+
+def parquet_files(store):
+    return sorted(
+        name for _, _, files in os.walk(store.base_dir) for name in files if name.endswith(".parquet")
+    )
+
+
+def test_incremental_snapshot():
+    print("Testing incremental claims snapshots...")
+    database = AsyncMongoMockClient()["snapshot_test"]
+    store, original = use_snapshots(database)
+    documents = synthetic_claims(40)
+
+    async def run():
+        await database["claims"].insert_many(documents[:30])
+        first = await store.run()
+        unchanged = await store.run()
+        # Inserted later, but with an _id from slightly before the watermark
+        late = dict(documents[30], _id=ObjectId.from_datetime(datetime.now() - timedelta(seconds=30)))
+        await database["claims"].insert_many([late] + documents[31:])
+        appended = await store.run()
+        return first, unchanged, appended
+
+    try:
+        first, unchanged, appended = asyncio.run(run())
+        table = store.read()
+    finally:
+        restore_snapshots(original)
+    assert first["mode"] == "full" and first["rows_written"] == 30
+    assert unchanged["mode"] == "incremental" and unchanged["rows_written"] == 0
+    assert appended["rows_written"] == 10 and appended["total_rows"] == 40
+    assert table.num_rows == 40 and len(set(table["claim_id"].to_pylist())) == 40
+    assert table.schema.field("village").type == pa.dictionary(pa.int32(), pa.string())
+    assert table.schema.field("area").type == pa.float64()
+    print("✅ Incremental claims snapshots: SUCCESS")
+
+
+def test_interrupted_run_and_rebuild():
+    print("Testing interrupted snapshot runs...")
+    database = AsyncMongoMockClient()["snapshot_test"]
+    store, original = use_snapshots(database)
+    documents = synthetic_claims(20)
+    write = store._write
+
+    def write_then_fail(*args):
+        write(*args)
+        raise OSError("disk full")
+
+    async def run():
+        await database["claims"].insert_many(documents[:10])
+        await store.run()
+        before = parquet_files(store)
+        await database["claims"].insert_many(documents[10:])
+        # Files written, then the run dies before its manifest update
+        store._write = write_then_fail
+        try:
+            await store.run()
+            assert False, "interrupted run succeeded"
+        except OSError:
+            pass
+        store._write = write
+        leftover = sorted(set(parquet_files(store)) - set(before))
+        # Readers follow the manifest, so the dead run's rows are not visible
+        during = store.read().num_rows
+        recovered = await store.run()
+        assert not set(leftover) & set(parquet_files(store))
+        await database["claims"].update_many({}, {"$set": {"status": "approved"}})
+        rebuilt = await store.run(full=True)
+        # The rebuild replaced the files in the manifest; the next run removes the old ones
+        await store.run()
+        return leftover, during, recovered, rebuilt
+
+    try:
+        leftover, during, recovered, rebuilt = asyncio.run(run())
+        table = store.read()
+    finally:
+        restore_snapshots(original)
+    assert leftover and during == 10
+    assert recovered["rows_written"] == 10 and recovered["total_rows"] == 20
+    assert rebuilt["mode"] == "full" and rebuilt["total_rows"] == 20
+    assert table.num_rows == 20 and set(table["status"].to_pylist()) == {"approved"}
+    assert len(parquet_files(store)) == len(store.manifest()["files"])
+    print("✅ Interrupted snapshot runs: SUCCESS")
+
+
+def test_runs_exclude_each_other():
+    print("Testing concurrent snapshot runs without a shared backend...")
+    database = AsyncMongoMockClient()["snapshot_test"]
+    store, original = use_snapshots(database)
+    other_worker = ClaimSnapshots(store.base_dir)
+    original_backend, original_wait = snapshots.shared_state.backend, snapshots.CLAIMS_SNAPSHOT_LOCK_SECONDS
+    snapshots.shared_state.backend = None
+
+    async def run():
+        await database["claims"].insert_many(synthetic_claims(30))
+        # Another process holds the lock file
+        handle = other_worker._try_file_lock()
+        snapshots.CLAIMS_SNAPSHOT_LOCK_SECONDS = 0.1
+        blocked = await store.run()
+        handle.close()
+        snapshots.CLAIMS_SNAPSHOT_LOCK_SECONDS = 5
+        return blocked, await asyncio.gather(store.run(), other_worker.run())
+
+    try:
+        blocked, (first, second) = asyncio.run(run())
+        table = store.read()
+    finally:
+        snapshots.shared_state.backend, snapshots.CLAIMS_SNAPSHOT_LOCK_SECONDS = original_backend, original_wait
+        restore_snapshots(original)
+    assert blocked is None
+    # One full build, then an incremental run that finds nothing new
+    assert sorted(run["rows_written"] for run in (first, second)) == [0, 30]
+    assert table.num_rows == 30 and len(set(table["claim_id"].to_pylist())) == 30
+    print("✅ Concurrent snapshot runs: SUCCESS")
+
+
+def test_partition_pruning_and_arrow_stream():
+    print("Testing snapshot reads and the Arrow stream...")
+    database = AsyncMongoMockClient()["snapshot_test"]
+    store, original = use_snapshots(database)
+    documents = synthetic_claims(60)
+    district = documents[0]["district"]
+    expected = sum(1 for d in documents if d["district"] == district)
+
+    async def run():
+        await database["claims"].insert_many(documents)
+        try:
+            await claims.stream_claims_snapshot()
+            assert False, "stream without a snapshot"
+        except claims.HTTPException as e:
+            assert e.status_code == 409
+        await store.run()
+        response = await claims.stream_claims_snapshot(district=district)
+        return b"".join([chunk async for chunk in response.body_iterator])
+
+    try:
+        body = asyncio.run(run())
+        sliced = store.read(district=district, columns=["village", "area"])
+    finally:
+        restore_snapshots(original)
+    streamed = pa.ipc.open_stream(body).read_all()
+    assert streamed.num_rows == sliced.num_rows == expected
+    assert set(streamed["district"].to_pylist()) == {district}
+    assert sliced.column_names == ["village", "area"]
+    print("✅ Snapshot reads and Arrow stream: SUCCESS")
+
+
+def test_dss_batch_from_snapshot():
+    print("Testing DSS batch analysis from the snapshot...")
+    database = AsyncMongoMockClient()["snapshot_test"]
+    store, original = use_snapshots(database)
+    documents = synthetic_claims(400)
+    district = max({d["district"] for d in documents}, key=lambda name: sum(d["district"] == name for d in documents))
+
+    async def run():
+        await database["claims"].insert_many(documents)
+        await store.run()
+        # Built-in schemes plus a rule on claim fields outside the village stats
+        schemes = [{"id": s["id"]} for s in SCHEMES] + [{"id": "review", "rules": [{
+            "id": "review-pending",
+            "when": {"all": [{"field": "status", "op": "ne", "value": "approved"},
+                             {"field": "is_anomaly", "op": "eq", "value": False}]},
+            "recommendation": {"title": "Field review", "priority": "Low"},
+        }]}]
+        from_database = await dss.analyze_district_batch(dss.DSSBatchRequest(district=district, schemes_data=schemes))
+        from_snapshot = await dss.analyze_district_batch(
+            dss.DSSBatchRequest(district=district, source="snapshot", schemes_data=schemes)
+        )
+        return from_database, from_snapshot
+
+    try:
+        from_database, from_snapshot = asyncio.run(run())
+    finally:
+        restore_snapshots(original)
+    assert from_snapshot["source"] == "snapshot"
+    assert from_snapshot["claims_analyzed"] == from_database["claims_analyzed"]
+    assert from_snapshot["villages_analyzed"] == from_database["villages_analyzed"] > 1
+
+    def ranked(result):
+        return sorted((row["village"], row["intervention"], row["eligible_holders"], row["score"])
+                      for row in result["interventions"])
+
+    assert ranked(from_snapshot) == ranked(from_database)
+    assert any(row["matched_rule"] == "review-pending" for row in from_snapshot["interventions"])
+    print("✅ DSS batch analysis from the snapshot: SUCCESS")
+
+
+if __name__ == "__main__":
+    test_incremental_snapshot()
+    test_interrupted_run_and_rebuild()
+    test_runs_exclude_each_other()
+    test_partition_pruning_and_arrow_stream()
+    test_dss_batch_from_snapshot()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test the in-memory village master index
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.village_index import VillageIndex, normalize_name
+
+ROWS = [
+    {"lgd_code": "435001", "village": "Devpur", "tehsil": "Shahdol", "district": "Shahdol",
+     "state": "Madhya Pradesh", "latitude": "23.29", "longitude": "81.36", "population": "1240"},
+    {"lgd_code": "435002", "village": "Devpur", "tehsil": "Baihar", "district": "Balaghat",
+     "state": "Madhya Pradesh", "latitude": "22.10", "longitude": "80.55", "population": "860"},
+    {"lgd_code": "435003", "village": "Kanha", "tehsil": "Baihar", "district": "Balaghat",
+     "state": "Madhya Pradesh", "latitude": "22.28", "longitude": "80.61", "population": ""},
+    {"lgd_code": "512010", "village": "Sonbhadra Khurd", "tehsil": "Robertsganj", "district": "Sonbhadra",
+     "state": "Uttar Pradesh", "latitude": "", "longitude": "", "population": "2010"},
+]
+
+
+def build_index():
+    index = VillageIndex(path="does-not-exist.csv")
+    index.load_rows(ROWS)
+    return index
+
+
+def test_normalize_name():
+    print("Testing name normalisation...")
+    assert normalize_name("  Sonbhadra-KHURD ") == "sonbhadra khurd"
+    assert normalize_name("Dévpur") == "devpur"
+    print("✅ Name normalisation: SUCCESS")
+
+
+def test_exact_lookup_with_hints():
+    print("Testing exact lookup...")
+    index = build_index()
+
+    match = index.lookup("devpur", district="Balaghat")
+    print(f"   {match}")
+    assert match["lgd_code"] == 435002
+    assert match["population"] == 860
+
+    # Tehsil hint alone disambiguates when the district was not extracted
+    assert index.lookup("Devpur", district="Unknown", tehsil="Shahdol")["lgd_code"] == 435001
+    assert index.lookup("Kanha")["population"] is None
+    print("✅ Exact lookup: SUCCESS")
+
+
+def test_fuzzy_lookup():
+    print("Testing fuzzy lookup...")
+    index = build_index()
+
+    match = index.lookup("Sonbhadra Khurdh")
+    print(f"   {match}")
+    assert match["village"] == "Sonbhadra Khurd"
+    assert match["latitude"] is None
+
+    assert index.lookup("Completely Different") is None
+    assert index.lookup("Unknown") is None
+    print("✅ Fuzzy lookup: SUCCESS")
+
+
+def test_hints_do_not_lift_weak_matches():
+    print("Testing location hints against the fuzzy threshold...")
+    index = build_index()
+    # Similar below the threshold; a matching district must not push them over
+    assert index.lookup("Deopur", district="Balaghat") is None
+    assert index.lookup("Kanhari", district="Balaghat", state="Madhya Pradesh") is None
+
+    # Between equally similar names the district decides
+    assert index.lookup("Devpura", district="Shahdol")["lgd_code"] == 435001
+    assert index.lookup("Devpura", district="Balaghat")["lgd_code"] == 435002
+    assert index.lookup("Devpura", district="Balaghat")["match_score"] == 0.8
+    print("✅ Location hints: SUCCESS")
+
+
+def test_conflicting_district():
+    print("Testing lookup with a conflicting district...")
+    from app.routes import claims
+
+    index = build_index()
+    # Same village name, but in another district or state than the claim states
+    assert index.lookup("Kanha", district="Dindori", state="Madhya Pradesh") is None
+    assert index.lookup("Sonbhadra Khurd", state="Madhya Pradesh") is None
+    assert index.lookup("kanha", district="balaghat")["lgd_code"] == 435003
+
+    original = claims.village_index
+    claims.village_index = index
+    try:
+        conflicting, conflicting_location = claims.map_extracted_claim(
+            {"claimant_name": "Sita Gond", "village": "Kanha", "district": "Dindori", "state": "Madhya Pradesh"}
+        )
+        missing, missing_location = claims.map_extracted_claim({"claimant_name": "Sita Gond", "village": "kanha"})
+    finally:
+        claims.village_index = original
+    assert conflicting_location is None
+    assert (conflicting["village"], conflicting["district"]) == ("Kanha", "Dindori")
+    # Only district/state the extraction missed are filled in
+    assert missing_location["lgd_code"] == 435003
+    assert (missing["village"], missing["district"], missing["state"]) == ("Kanha", "Balaghat", "Madhya Pradesh")
+    print("✅ Conflicting district: SUCCESS")
+
+
+def test_lookup_speed():
+    print("Testing lookup speed...")
+    index = build_index()
+    start = time.perf_counter()
+    for _ in range(1000):
+        index.lookup("Kanha", district="Balaghat")
+    per_lookup_us = (time.perf_counter() - start) * 1000
+    print(f"   Exact lookup: {per_lookup_us:.1f} µs")
+    print("✅ Lookup speed: SUCCESS")
+
+
+if __name__ == "__main__":
+    test_normalize_name()
+    test_exact_lookup_with_hints()
+    test_fuzzy_lookup()
+    test_hints_do_not_lift_weak_matches()
+    test_conflicting_district()
+    test_lookup_speed()